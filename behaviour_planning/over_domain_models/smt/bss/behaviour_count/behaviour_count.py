@@ -11,14 +11,18 @@ from unified_planning.plans import SequentialPlan
 
 from pypmt.apis import initialize_fluents
 from behaviour_planning.over_domain_models.smt.bss.behaviour_space.space_encoders.basic import BehaviourSpaceSMT
+from behaviour_planning.over_domain_models.smt.bss.task_cache import task_cache
+from behaviour_planning.over_domain_models.smt.registry import resolve_dims
 
 class BehaviourCountSMT:
     def __init__(self, domain, problem, bspace_cfg, planlist, is_oversubscription_planning=False, compilationlist=[['up_quantifiers_remover', CompilationKind.QUANTIFIERS_REMOVING], ['fast-downward-reachability-grounder', CompilationKind.GROUNDING]]):
         
         self.compilationlist = compilationlist
+        # the parsed/compiled tasks are reused across runs when a task-cache-dir is given.
+        self.task_cache = task_cache(bspace_cfg)
 
         # read the planning task.
-        planningtask = PDDLReader().parse_problem(domain, problem)
+        planningtask = PDDLReader().parse_problem(domain, problem) if self.task_cache is None else self.task_cache.parse(domain, problem)
         
         # compiled task.
         self.gr_result = self._prepare_task(planningtask, is_oversubscription_planning)
@@ -42,6 +46,7 @@ class BehaviourCountSMT:
 
         # initialize the behaviour space.
         self.bspace = BehaviourSpaceSMT(self.gr_result, bspace_cfg)
+        if self.task_cache is not None: self.bspace.log_msg.extend(self.task_cache.log_msg)
         # check if we are optimising on behaviour count.
         select_k = bspace_cfg.get('select-k', sys.maxsize)
         # compute behaviour count.
@@ -52,14 +57,11 @@ class BehaviourCountSMT:
             if ret is None: 
                 self.bspace.log_msg.append(f'Plan {i} is not satisfiable.')
                 continue
-            setattr(plan, 'behaviour', ' ^ '.join(list(map(lambda s : f'({str(s)})', self._flatten_expr(ret)))))
+            setattr(plan, 'behaviour', ret.pretty())
             self.selected_plans_list[ret].append(plan)
             self.colleted_behaviours.add(ret)
             if self.count() >= select_k: break
 
-    def _flatten_expr(self, expr): 
-        return [expr] if not (z3.is_and(expr) or z3.is_or(expr)) else [arg for child in expr.children() for arg in self._flatten_expr(child)]
-
     def _prepare_task(self, planningtask, is_oversubscription_planning):
         # initialize the fluents.        
         initialize_fluents(planningtask)
@@ -67,8 +69,14 @@ class BehaviourCountSMT:
         compilation_kinds = list(map(lambda e: e[1], self.compilationlist))
 
         # ground the problem.
-        with Compiler(names = compiler_names, compilation_kinds = compilation_kinds) as grounder:
-            gr_result = grounder.compile(planningtask)
+        if self.task_cache is not None:
+            gr_result = self.task_cache.compile(planningtask, self.compilationlist)
+        else:
+            with Compiler(names = compiler_names, compilation_kinds = compilation_kinds) as grounder:
+                gr_result = grounder.compile(planningtask)
+
+        # the optimal plan length proven by a cached seed plan of the grounded task, if any.
+        self.cached_optimal_plan_length = self.task_cache.optimal_plan_length(gr_result.problem) if self.task_cache is not None else None
        
         # add the utility mertic if the planning task is oversubscription.
         if is_oversubscription_planning:
@@ -86,6 +94,7 @@ class BehaviourCountSMT:
 
     def _update_bspace_cfg(self, bspace_cfg, is_oversubscription_planning):
         # update the behaviour space configuration parameters.
+        bspace_cfg['dims'] = resolve_dims(bspace_cfg['dims'])
         additional_information_updates = []
         for idx, (dim_class, dim_additional_information) in enumerate(bspace_cfg['dims']):
             extra_info = {}
@@ -94,6 +103,10 @@ class BehaviourCountSMT:
                     # 'optimal-plan-length': 0,
                     'cost-bound-factor' : 1.0,
                     'is-oversubscription': is_oversubscription_planning})
+                # the optimal plan length is given, or reused from the seed plans of previous runs.
+                optimal_plan_length = bspace_cfg.get('optimal-plan-length', self.cached_optimal_plan_length)
+                if 'optimal-plan-length' not in dim_additional_information and optimal_plan_length is not None:
+                    extra_info['optimal-plan-length'] = optimal_plan_length
                 additional_information_updates.append((idx, dim_additional_information | extra_info))
         
         for idx, dim_additional_information in additional_information_updates:
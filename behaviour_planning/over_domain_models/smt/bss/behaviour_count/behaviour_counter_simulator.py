@@ -1,6 +1,7 @@
 from collections import defaultdict
 from unified_planning.shortcuts import SequentialSimulator
 from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.qfuf_encoder import EncoderSequentialQFUF
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.common import object_actions_index
 from behaviour_planning.over_domain_models.smt.bss.behaviour_features_library.resources import parse_resource_file
 from behaviour_planning.over_domain_models.smt.bss.behaviour_features_library.functions import parse_functions_file
 
@@ -38,12 +39,23 @@ class MakespanOptimalCostSimulator(DimSimulator):
 class ResourceCountSimulator(DimSimulator):
     def __init__(self, task, addinfo):
         super().__init__(task, 'resource_count', {'resources_list': parse_resource_file(addinfo)})
-        self.addinfo['objects'] = set(map(str,filter(lambda e: e.name in set(map(lambda e: e['name'], self.addinfo['resources_list'].values())), self.task.all_objects)))
+        resource_names = set(map(lambda e: e['name'], self.addinfo['resources_list'].values()))
+        self.addinfo['objects'] = set(map(str,filter(lambda e: e.name in resource_names, self.task.all_objects)))
+        # the resources of the grounded actions (no parameters), from the same index as the encoders'.
+        self.grounded_action_resources = None
+
+    def _action_resources(self, action):
+        if len(action.actual_parameters) > 0: return set(map(str, action.actual_parameters)) & self.addinfo['objects']
+        if self.grounded_action_resources is None:
+            self.grounded_action_resources = defaultdict(set)
+            for resource, actions in object_actions_index([a.name for a in self.task.actions], self.addinfo['objects']).items():
+                for action_name in actions: self.grounded_action_resources[action_name].add(resource)
+        return self.grounded_action_resources.get(action.action.name, set())
     
     def plan_behaviour(self, plan):
         resource_usage = {o: 0 for o in self.addinfo['objects']}
         for action in plan.actions:
-            for used_resource in set.intersection(set(map(str, action.actual_parameters)), set(self.addinfo['objects'])):
+            for used_resource in self._action_resources(action):
                 resource_usage[used_resource] += 1
         return 'rc:' + str(len(list(filter(lambda e: e[1] > 0, resource_usage.items()))))
 
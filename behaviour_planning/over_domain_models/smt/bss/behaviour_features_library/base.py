@@ -41,4 +41,36 @@ class DimensionConstructorSMT:
         raise NotImplementedError
     
     def behaviour_expression(self, plan):
-        return self.var == self.discretize(self.value(plan))
\ No newline at end of file
+        return self.var == self.discretize(self.value(plan))
+
+    def decode(self, values):
+        """!
+        This function should record the dimension's values, read from a model in the order of
+        behaviour_vars(), in its domain. The domain keeps the values, they are printed by printable_domain.
+        """
+        self.var_domain.add(values[0])
+
+    def printable_domain(self):
+        """!
+        This function should return the dimension's domain as it is written with the results.
+        """
+        return [str(value) for value in self.var_domain]
+
+    def values_expression(self, values):
+        """!
+        This function should return the behaviour expression of the dimension's values read from a model.
+        """
+        return self.var == values[0]
+
+    def behaviour_vars(self):
+        """!
+        This function should return the variables whose values make up the dimension's behaviour.
+        """
+        return [self.var] if self.var is not None else []
+
+    def partition_cells(self, encoder, size=None):
+        """!
+        This function should return disjoint expressions over the dimension's variables that split its
+        values into cells, or an empty list if the dimension cannot be partitioned.
+        """
+        return []
\ No newline at end of file
@@ -15,6 +15,12 @@ class MakespanOptimalCostSMT(CostBoundSMT):
         # A better way to do this is to count how many steps are enabled rather than summing up the actions.
         selected_actions_vars = []
         for t in range(0, len(encoder)):
+            if encoder.finite_domain:
+                # count the active steps as a cardinality over boolean step variables.
+                var = z3.Bool(f'step_{t}_active', ctx=encoder.ctx)
+                selected_actions_vars.append(z3.If(var, z3.IntVal(1, ctx=encoder.ctx), z3.IntVal(0, ctx=encoder.ctx)))
+                self.encodings.append(var == z3.Or(encoder.get_actions_vars(t)))
+                continue
             var = z3.Int(f'step_{t}_cost', ctx=encoder.ctx)
             selected_actions_vars.append(var)
             self.encodings.append(var == z3.If(z3.Or(encoder.get_actions_vars(t)), z3.IntVal(1, ctx=encoder.ctx), z3.IntVal(0, ctx=encoder.ctx)))
@@ -22,6 +28,7 @@ class MakespanOptimalCostSMT(CostBoundSMT):
         self.actions_cost = z3.Int(self.name, ctx=encoder.ctx)
         self.var          = self.actions_cost
         self.encodings.append(self.actions_cost == z3.Sum(selected_actions_vars))
+        if encoder.finite_domain: self.encodings.append(self.actions_cost >= z3.IntVal(0, ctx=encoder.ctx))
 
         # bound the plan length variable to the makespan.
         self.encodings.append(self.actions_cost < z3.IntVal(len(encoder), ctx=encoder.ctx))
@@ -49,8 +56,14 @@ class MakespanOptimalCostSMT(CostBoundSMT):
         else:
             raise TypeError(f"Unknown type for plan: {type(plan)}")
         # Update domain value.
-        self.var_domain.add(str(retvalue))
+        self.var_domain.add(retvalue.as_long())
         return retvalue
 
     def discretize(self, value):
-        return value.as_long()
\ No newline at end of file
+        return value.as_long()
+
+    def partition_cells(self, encoder, size=None):
+        # one cell per plan length the encoding allows.
+        if not self.is_oversubscription: lengths = range(self.optimal_plan_length, len(encoder))
+        else: lengths = range(0, int(self.cost_bound_factor * self.optimal_plan_length) + 1)
+        return [self.var == z3.IntVal(length, ctx=encoder.ctx) for length in lengths]
\ No newline at end of file
@@ -1,18 +1,24 @@
 from collections import defaultdict
-import os
-from lark import Lark, Transformer, v_args
-import z3
 import z3
 from z3 import ModelRef
 from unified_planning.plans import SequentialPlan
 
 from behaviour_planning.over_domain_models.smt.bss.behaviour_features_library.base import DimensionConstructorSMT
+from behaviour_planning.over_domain_models.smt.bss.behaviour_features_library.parsers import parse_info_file
+
+# How a function's value is bucketed, set per function in the functions file (linear by default):
+# - linear: buckets of delta from min, the last one [max-delta, max]. The bucket is tied to the value by linear bounds
+#           (min + delta*b <= x < min + delta*(b+1)), so the encoding does not grow with the number of buckets.
+# - log:    buckets doubling in width from min ([min, min+delta), [min+delta, min+2delta), [min+2delta, min+4delta), ...),
+#           for heavy-tailed values, the bucket is the number of thresholds the value reaches.
+function_bucketings = ['linear', 'log']
 
 class FunctionsSMT(DimensionConstructorSMT):
     def __init__(self, encoder, additional_information):
         super().__init__('functions', encoder, parse_functions_file(additional_information))
             
     def __encode__(self, encoder):
+        assert not encoder.finite_domain, 'The functions dimension encodes real valued fluents, it does not support the finite-domain mode.'
         self.var_domain = defaultdict(dict)
         self.functions_vars = []
         for _, fn in self.additional_information.items():
@@ -21,13 +27,13 @@ class FunctionsSMT(DimensionConstructorSMT):
             # assert varname in encoder.up_fluent_to_z3, f'Function {varname} is not in the encoder.'
             # get the last element of the list
             z3var = encoder.up_fluent_to_z3[varname][-1]
-            # create the values boxes.
-            boxes = [z3.And(z3var >= z3.RealVal(i, ctx=encoder.ctx), z3var < z3.RealVal(i + delta, ctx=encoder.ctx)) for i in range(minval, maxval-delta, delta)]
-            
-            boxes.append(z3.And(z3var >= z3.RealVal(maxval-delta, ctx=encoder.ctx), z3var <= z3.RealVal(maxval, ctx=encoder.ctx)))
             function_dimension_var = z3.Int(f'{self.name}-box-{varname}', ctx=encoder.ctx)
-
-            self.encodings.extend([box == (function_dimension_var == z3.IntVal(idx, ctx=encoder.ctx)) for idx, box in enumerate(boxes)])
+            bucketing = fn.get('bucketing', 'linear')
+            assert bucketing in function_bucketings, f'Unknown bucketing {bucketing} for {varname}, expected one of {function_bucketings}.'
+            if bucketing == 'linear':
+                self._encode_linear_buckets(encoder, z3var, function_dimension_var, minval, maxval, delta)
+            else:
+                self._encode_log_buckets(encoder, z3var, function_dimension_var, minval, maxval, delta)
             self.encodings.append(function_dimension_var >= z3.IntVal(minval, ctx=encoder.ctx))
             self.encodings.append(function_dimension_var <= z3.IntVal(maxval, ctx=encoder.ctx))
             
@@ -36,6 +42,36 @@ class FunctionsSMT(DimensionConstructorSMT):
         
         assert len(self.functions_vars) > 0, 'Functions dimension has no functions vars found in the encoder.'
 
+    def _encode_linear_buckets(self, encoder, z3var, bucket_var, minval, maxval, delta):
+        """!
+        Ties the bucket to the value as the boxes [min + k*delta, min + (k+1)*delta) for k < n (n = the number of
+        regular boxes) and the last box [max-delta, max] do, in a constant number of constraints. As with the boxes,
+        a value in two boxes is infeasible and a value outside [min, max] leaves the bucket out of [0, n].
+        """
+        ctx = encoder.ctx
+        def real(value): return z3.RealVal(value, ctx=ctx)
+        boxes_cnt  = len(range(minval, maxval-delta, delta))
+        in_regular = z3.And(z3var >= real(minval), z3var < real(minval + boxes_cnt*delta))
+        in_last    = z3.And(z3var >= real(maxval-delta), z3var <= real(maxval))
+        bucket     = z3.ToReal(bucket_var)
+        if maxval-delta < minval + boxes_cnt*delta: self.encodings.append(z3.Not(z3.And(in_regular, in_last)))
+        self.encodings.append(z3.Implies(in_regular, z3.And(real(minval) + real(delta)*bucket <= z3var, z3var < real(minval) + real(delta)*(bucket + real(1)))))
+        self.encodings.append(z3.Implies(in_last, bucket_var == z3.IntVal(boxes_cnt, ctx=ctx)))
+        self.encodings.append(z3.Implies(z3.Not(z3.Or(in_regular, in_last)), z3.Or(bucket_var < z3.IntVal(0, ctx=ctx), bucket_var > z3.IntVal(boxes_cnt, ctx=ctx))))
+
+    def _encode_log_buckets(self, encoder, z3var, bucket_var, minval, maxval, delta):
+        """!
+        Ties the bucket to the value as the number of the thresholds min + delta*2^k (k >= 0, below max) the value
+        reaches, the last bucket ends at max. A value outside [min, max] leaves the bucket out of the buckets' range.
+        """
+        ctx = encoder.ctx
+        thresholds = []
+        while minval + delta*(1 << len(thresholds)) < maxval: thresholds.append(minval + delta*(1 << len(thresholds)))
+        in_range = z3.And(z3var >= z3.RealVal(minval, ctx=ctx), z3var <= z3.RealVal(maxval, ctx=ctx))
+        one, zero = z3.IntVal(1, ctx=ctx), z3.IntVal(0, ctx=ctx)
+        self.encodings.append(z3.Implies(in_range, bucket_var == z3.Sum([zero] + [z3.If(z3var >= z3.RealVal(threshold, ctx=ctx), one, zero) for threshold in thresholds])))
+        self.encodings.append(z3.Implies(z3.Not(in_range), z3.Or(bucket_var < zero, bucket_var > z3.IntVal(len(thresholds), ctx=ctx))))
+
     def value(self, plan):
         ret_value = []
         if isinstance(plan, ModelRef):
@@ -55,43 +91,15 @@ class FunctionsSMT(DimensionConstructorSMT):
     def behaviour_expression(self, plan):
         return self.discretize(self.value(plan))
 
-class ResourceTransformer(Transformer):
-    def resource_line(self, token):
-        return {
-            'name':  token[0].value,
-            'min':   int(token[1].value),
-            'max':   int(token[2].value),
-            'delta': int(token[3].value)
-        }
+    def behaviour_vars(self):
+        return [var for _, var in self.functions_vars]
 
-def parse_functions_file(inputfile):
-    def read_function_file(resource_input):
-        def construct_parser():
-            grammar = r'''
-                start: resource_line+
-                resource_line: "(:function" (NAME | NAME_WITH_PARENTHESIS) MIN MAX DELTA ")"
-                NAME: /[a-zA-Z_][\w-]*/
-                NAME_WITH_PARENTHESIS: /[a-zA-Z_]\w*\([^)]*\)/
-                MIN: /[0-9]+/
-                MAX: /[0-9]+/
-                DELTA: /[0-9]+/
-                %ignore /\s+/
-            '''
-            parser = Lark(grammar, parser='lalr', transformer=v_args(inline=True))
-            return parser
-        # readlines in reource_input
-        with open(resource_input, 'r') as f:
-            resource_input = f.readlines()
-        resource_input = ''.join(resource_input)
-        parser = construct_parser()
-        tree = parser.parse(resource_input)
-        transformer = ResourceTransformer()
-        resources = transformer.transform(tree)
-        return resources.children
+    def decode(self, values):
+        for (name, _), value in zip(self.functions_vars, values):
+            self.var_domain[name].add(value)
 
-    addition_informaion = defaultdict(dict)
-    if inputfile:
-        assert os.path.exists(inputfile), f'The function file {inputfile} does not exist.'
-        for resource in read_function_file(inputfile):
-            addition_informaion[resource['name']] = resource
-    return addition_informaion
+    def values_expression(self, values):
+        return z3.And([var == value for (_, var), value in zip(self.functions_vars, values)])
+
+def parse_functions_file(inputfile):
+    return parse_info_file(inputfile, 'function')
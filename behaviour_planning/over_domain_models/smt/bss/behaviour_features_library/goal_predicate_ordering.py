@@ -9,6 +9,7 @@ from behaviour_planning.over_domain_models.smt.bss.behaviour_features_library.la
 class GoalPredicatesOrderingSMT(LandmarkPredicatesOrderingSMT):
     
     def __init__(self, encoder, additional_information):
+        # the additional information may pick the ordering-encoding (pairwise or rank).
         super().__init__('subgoal', 
                          encoder, 
-                         {'landmark_vars_dict': encoder.goal_predicates_vars})
\ No newline at end of file
+                         dict(additional_information or {}) | {'landmark_vars_dict': encoder.goal_predicates_vars})
\ No newline at end of file
@@ -1,3 +1,4 @@
+import itertools
 from collections import defaultdict
 
 import z3
@@ -6,10 +7,19 @@ from unified_planning.plans import SequentialPlan
 
 from behaviour_planning.over_domain_models.smt.bss.behaviour_features_library.base import DimensionConstructorSMT
 
+# How the order of the landmarks' first achievements is encoded:
+# - pairwise: an ordering variable per pair of landmarks (is i achieved after j), O(L^2) variables and terms.
+# - rank: a bit-vector per landmark holding its position in the order of the first achievements, counted on "achieved
+#         by step t" ladders in O(L*T) terms. The ranks order the landmarks exactly as the pairwise variables do, so both
+#         encodings give the same behaviours.
+ordering_encodings = ['pairwise', 'rank']
+
 class LandmarkPredicatesOrderingSMT(DimensionConstructorSMT):
     
     def __init__(self, name, encoder, additional_information):
         self.landmark_predciates_vars = []
+        self.ordering_encoding = additional_information.get('ordering-encoding', 'pairwise')
+        assert self.ordering_encoding in ordering_encodings, f'Unknown ordering encoding {self.ordering_encoding}, expected one of {ordering_encodings}.'
         self.dummy_landmark_variable = z3.Bool(f'dummy-{name}-variable', ctx=encoder.ctx)
         self.dummy_landmark_expression = self.dummy_landmark_variable == z3.BoolVal(False, ctx=encoder.ctx)
         super().__init__(name, encoder, additional_information)
@@ -20,15 +30,36 @@ class LandmarkPredicatesOrderingSMT(DimensionConstructorSMT):
         """
         landmark_vars_dict = self.additional_information.get('landmark_vars_dict', [])
         assert len(landmark_vars_dict) > 0, 'LandmarkPredicatesOrderingSMT requires the landmark_vars_list to be provided in the additional_information.'
+        # the predicates that cannot hold yet (i.e., before their relaxed planning graph layer) are never first achieved.
+        unreachable_vars = encoder.unreachable_fluent_vars()
+        if self.ordering_encoding == 'rank': return self._encode_ranks(encoder, landmark_vars_dict, unreachable_vars)
         _landmark_z3_vars = []
         for _, landmark_vars_list in landmark_vars_dict.items():
-            landmark_name = str(landmark_vars_list[0])[:str(landmark_vars_list[0]).rfind('_')]
+            landmark_name = self._landmark_name(landmark_vars_list)
             landmark_z3_var = z3.Int(f'{self.name}-{landmark_name}', ctx=encoder.ctx)
             _landmark_z3_vars.append(landmark_z3_var)
+            first_step = next((idx for idx, predicate in enumerate(landmark_vars_list) if not predicate.get_id() in unreachable_vars), len(landmark_vars_list))
+            if first_step > 0:
+                self.encodings.append(z3.Or(landmark_z3_var == z3.IntVal(-100, ctx=encoder.ctx), landmark_z3_var > z3.IntVal(first_step, ctx=encoder.ctx)))
+            landmark_vars_list = landmark_vars_list[first_step:]
             for idx, predicate in enumerate(landmark_vars_list):
                 expr  = [predicate] + [z3.Not(predicate, ctx=encoder.ctx) for predicate in landmark_vars_list[:idx]]
-                self.encodings.append(z3.And(expr) == (landmark_z3_var == z3.IntVal(idx+1, ctx=encoder.ctx)))
+                self.encodings.append(z3.And(expr) == (landmark_z3_var == z3.IntVal(first_step+idx+1, ctx=encoder.ctx)))
             self.encodings.append(z3.And([z3.Not(predicate, ctx=encoder.ctx) for predicate in landmark_vars_list]) == (landmark_z3_var == z3.IntVal(-100, ctx=encoder.ctx)))
+            if encoder.finite_domain:
+                self.encodings.append(landmark_z3_var >= z3.IntVal(-100, ctx=encoder.ctx))
+                self.encodings.append(landmark_z3_var <= z3.IntVal(first_step+len(landmark_vars_list), ctx=encoder.ctx))
+
+        if encoder.finite_domain:
+            # compare the landmarks directly, the finite-domain solver does not take uninterpreted functions.
+            for i, landmark_i in enumerate(_landmark_z3_vars):
+                for j, landmark_j in enumerate(_landmark_z3_vars[i+1:]):
+                    ordering_var = z3.Int(f'{self.name}-predicate-ordering-{str(landmark_i)}__after__{str(landmark_j)}'.replace('(','_').replace(')',''), ctx=encoder.ctx)
+                    self.encodings.append(ordering_var == z3.If(landmark_i >= landmark_j, z3.IntVal(1, ctx=encoder.ctx), z3.IntVal(0, ctx=encoder.ctx)))
+                    self.encodings.append(ordering_var >= z3.IntVal(0, ctx=encoder.ctx))
+                    self.encodings.append(ordering_var <= z3.IntVal(1, ctx=encoder.ctx))
+                    self.landmark_predciates_vars.append(ordering_var)
+            return
 
         uf_gt = z3.Function(f'{self.name}PredicateOrderingFn', z3.IntSort(ctx=encoder.ctx), z3.IntSort(ctx=encoder.ctx), z3.BoolSort(ctx=encoder.ctx)) 
         for i, landmark_i in enumerate(_landmark_z3_vars):
@@ -40,19 +71,86 @@ class LandmarkPredicatesOrderingSMT(DimensionConstructorSMT):
                 self.encodings.append(ordering_var == uf_gt(landmark_i, landmark_j))
                 self.landmark_predciates_vars.append(ordering_var)
 
+    def _landmark_name(self, landmark_vars_list):
+        return str(landmark_vars_list[0])[:str(landmark_vars_list[0]).rfind('_')]
+
+    def _encode_ranks(self, encoder, landmark_vars_dict, unreachable_vars):
+        """!
+        Encodes a rank variable per landmark, its position when the landmarks are sorted by their first achievement
+        step (the unachieved ones first). Like the pairwise variables (i after j iff first(i) >= first(j) for i < j),
+        the landmarks first achieved at the same step are ordered by decreasing index, so the ranks are a permutation
+        and rank(i) > rank(j) iff the pairwise variable of (i, j) is 1.
+        """
+        ctx = encoder.ctx
+        landmarks = list(landmark_vars_dict.values())
+        # the counters are bit-vectors wide enough for L, so they never overflow and the behaviours are blocked on bits.
+        width = max(1, len(landmarks).bit_length())
+        one, zero = z3.BitVecVal(1, width, ctx=ctx), z3.BitVecVal(0, width, ctx=ctx)
+        def counter(name, expr):
+            var = z3.BitVec(name, width, ctx=ctx)
+            self.encodings.append(var == expr)
+            return var
+
+        names     = [self._landmark_name(landmark_vars_list) for landmark_vars_list in landmarks]
+        steps     = max(len(landmark_vars_list) for landmark_vars_list in landmarks)
+        # the ladders: achieved[i][t] holds once the landmark i held at any step up to t.
+        achieved  = []
+        for landmark_name, landmark_vars_list in zip(names, landmarks):
+            ladder = []
+            for t in range(steps):
+                ladder_var = z3.Bool(f'{self.name}-{landmark_name}-achieved-by-{t}', ctx=ctx)
+                previous   = ladder[-1] if len(ladder) > 0 else z3.BoolVal(False, ctx=ctx)
+                # the predicates that cannot hold yet are never first achieved, as in the pairwise encoding.
+                if t < len(landmark_vars_list) and not landmark_vars_list[t].get_id() in unreachable_vars:
+                    self.encodings.append(ladder_var == z3.Or(previous, landmark_vars_list[t]))
+                else:
+                    self.encodings.append(ladder_var == previous)
+                ladder.append(ladder_var)
+            achieved.append(ladder)
+
+        # the first achievement of every landmark, the unachieved landmarks are put at a step before the first one.
+        first = [[z3.Not(ladder[-1])] + [ladder[t] if t == 0 else z3.And(ladder[t], z3.Not(ladder[t-1])) for t in range(steps)] for ladder in achieved]
+        # the number of landmarks first achieved before every step.
+        before = [zero]
+        for t in range(steps):
+            before.append(counter(f'{self.name}-achieved-before-{t+1}', before[-1] + z3.Sum([z3.If(f[t], one, zero) for f in first])))
+        # the ties: the number of landmarks after i (by index) first achieved at the same step.
+        later = [zero] * (steps + 1)
+        ranks = [None] * len(landmarks)
+        for i in reversed(range(len(landmarks))):
+            # exactly one of the first achievements holds, a sum of ite terms is much easier on the solver than an
+            # implication per step.
+            ranks[i] = counter(f'{self.name}-{names[i]}-rank', z3.Sum([z3.If(first[i][t], before[t] + later[t], zero) for t in range(steps + 1)]))
+            if i > 0: later = [counter(f'{self.name}-{names[i]}-ties-{t}', later[t] + z3.If(first[i][t], one, zero)) for t in range(steps + 1)]
+        self.landmark_predciates_vars.extend(ranks)
+
+    def ordering_expressions(self):
+        """!
+        Returns the pairwise orderings (landmark i is achieved after or with landmark j, for i < j) as expressions over
+        the behaviour variables, in the order of the pairwise encoding's variables.
+        """
+        if self.ordering_encoding == 'pairwise':
+            return (var == z3.IntVal(1, ctx=var.ctx) for var in self.landmark_predciates_vars)
+        return (z3.UGT(rank_i, rank_j) for rank_i, rank_j in itertools.combinations(self.landmark_predciates_vars, 2))
+
+    def _pairwise_values(self, values):
+        # the ranks are printed as the pairwise orderings, so both encodings write the same behaviours.
+        if self.ordering_encoding == 'pairwise': return values
+        return tuple(int(rank_i > rank_j) for rank_i, rank_j in itertools.combinations(values, 2))
+
     def value(self, plan):
         ret_value = []
-        ret_value_str = []
+        ret_value_key = []
         if isinstance(plan, ModelRef):
             for predicate in self.landmark_predciates_vars:
                 predicate_value = plan.evaluate(predicate, model_completion = True)
                 ret_value.append(predicate == predicate_value)
-                ret_value_str.append(str(predicate_value.as_long()))
+                ret_value_key.append(predicate_value.as_long())
         elif isinstance(plan, SequentialPlan):
             assert False, 'Value function is not implemented for this dimension for a plan.'
         else:
             raise TypeError(f"Unknown type for plan: {type(plan)}")
-        self.var_domain.add(''.join(ret_value_str))
+        self.var_domain.add(tuple(ret_value_key))
         if len(ret_value) == 0: ret_value.append(self.dummy_landmark_expression)
         return z3.And(ret_value)
 
@@ -63,4 +161,23 @@ class LandmarkPredicatesOrderingSMT(DimensionConstructorSMT):
         return value
     
     def behaviour_expression(self, plan):
-        return self.discretize(self.value(plan))
\ No newline at end of file
+        return self.discretize(self.value(plan))
+
+    def behaviour_vars(self):
+        return self.landmark_predciates_vars
+
+    def decode(self, values):
+        self.var_domain.add(values)
+
+    def printable_domain(self):
+        return [''.join(map(str, self._pairwise_values(values))) for values in self.var_domain]
+
+    def values_expression(self, values):
+        if len(values) == 0: return z3.And([self.dummy_landmark_expression])
+        return z3.And([predicate == value for predicate, value in zip(self.landmark_predciates_vars, values)])
+
+    def partition_cells(self, encoder, size=None):
+        # fix the values of the first orderings, each ordering is either 0 or 1.
+        prefix = list(itertools.islice(self.ordering_expressions(), size if size is not None else 2))
+        if len(prefix) == 0: return []
+        return [z3.And([ordering if (cell >> i) & 1 else z3.Not(ordering) for i, ordering in enumerate(prefix)]) for cell in range(2 ** len(prefix))]
\ No newline at end of file
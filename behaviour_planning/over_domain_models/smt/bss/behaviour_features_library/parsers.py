@@ -0,0 +1,89 @@
+import os
+import copy
+from collections import defaultdict
+from functools import lru_cache
+
+# The grammars of the dimensions' information files, one (:KIND NAME MIN MAX DELTA ...) line per entry. The function
+# lines may end with their bucketing (see functions.py).
+_grammars = {
+    'resource': r'''
+        start: resource_line+
+        resource_line: "(:resource" (NAME | NAME_WITH_PARENTHESIS) MIN MAX DELTA ")"
+        NAME: /[a-zA-Z_][\w-]*/
+        NAME_WITH_PARENTHESIS: /[a-zA-Z_]\w*\([^)]*\)/
+        MIN: /[0-9]+/
+        MAX: /[0-9]+/
+        DELTA: /[0-9]+/
+        %ignore /\s+/
+    ''',
+    'function': r'''
+        start: resource_line+
+        resource_line: "(:function" (NAME | NAME_WITH_PARENTHESIS) MIN MAX DELTA BUCKETING? ")"
+        NAME: /[a-zA-Z_][\w-]*/
+        NAME_WITH_PARENTHESIS: /[a-zA-Z_]\w*\([^)]*\)/
+        MIN: /[0-9]+/
+        MAX: /[0-9]+/
+        DELTA: /[0-9]+/
+        BUCKETING: "linear" | "log"
+        %ignore /\s+/
+    ''',
+}
+
+# The parsed files by (kind, path), with the modification time and size they were parsed at.
+_parsed_files = {}
+
+def _line(kind, token):
+    line = {
+        'name':  token[0].value,
+        'min':   int(token[1].value),
+        'max':   int(token[2].value),
+        'delta': int(token[3].value)
+    }
+    if kind == 'function': line['bucketing'] = token[4].value if len(token) > 4 else 'linear'
+    return line
+
+@lru_cache(maxsize=None)
+def _parser(kind):
+    """!
+    Returns the LALR parser of the kind, built on first use. The lines are transformed while parsing, so no parse
+    tree is built.
+    """
+    from lark import Lark, Transformer
+
+    class InfoFileTransformer(Transformer):
+        def resource_line(self, token):
+            return _line(kind, token)
+
+        def start(self, lines):
+            return lines
+
+    return Lark(_grammars[kind], parser='lalr', transformer=InfoFileTransformer())
+
+def parse_info_file(inputfile, kind):
+    """!
+    Returns the entries of a resource or function file by name. The files are parsed once per modification, the
+    later calls get a copy of the memoized entries.
+
+    @param inputfile: the path of the file, an empty path gives no entries.
+    @param kind: resource or function.
+    """
+    assert kind in _grammars, f'Unknown information file kind {kind}, expected one of {list(_grammars)}.'
+    addition_informaion = defaultdict(dict)
+    if not inputfile: return addition_informaion
+    assert os.path.exists(inputfile), f'The {kind}s file {inputfile} does not exist.'
+    stat = os.stat(inputfile)
+    key  = (kind, os.path.abspath(inputfile))
+    version = (stat.st_mtime_ns, stat.st_size)
+    if key not in _parsed_files or _parsed_files[key][0] != version:
+        with open(inputfile, 'r') as f:
+            entries = _parser(kind).parse(f.read())
+        _parsed_files[key] = (version, {entry['name']: entry for entry in entries})
+    for name, entry in _parsed_files[key][1].items():
+        addition_informaion[name] = copy.copy(entry)
+    return addition_informaion
+
+def clear_parsed_files():
+    """!
+    Drops the memoized files, e.g. to time the parsing.
+    """
+    _parsed_files.clear()
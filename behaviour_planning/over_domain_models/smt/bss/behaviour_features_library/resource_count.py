@@ -19,6 +19,12 @@ class ResourceCountSMT(Resources):
         for resource, actions in self.resources_list.items():
             # Now create two real variables.
             # actions_count_z3_var = z3.Int(f'actions-count-for-object-{resource}', ctx=encoder.ctx)
+            if encoder.finite_domain:
+                # count the used resources as a cardinality over boolean variables.
+                resource_used_z3_var = z3.Bool(f'resource-{resource}-used', ctx=encoder.ctx)
+                self.encodings.append(resource_used_z3_var == z3.Or(actions))
+                resoruce_count_vars.append(z3.If(resource_used_z3_var, z3.IntVal(1, ctx=encoder.ctx), z3.IntVal(0, ctx=encoder.ctx)))
+                continue
             resource_used_z3_var = z3.Int(f'resource-{resource}-used', ctx=encoder.ctx) 
             # Add the constraints.
             # self.encodings.append(actions_count_z3_var == z3.Sum(actions))
@@ -31,6 +37,9 @@ class ResourceCountSMT(Resources):
             resoruce_count_vars.append(resource_used_z3_var)
 
         self.encodings.append(self.resoruces_count == z3.Sum(resoruce_count_vars))
+        if encoder.finite_domain:
+            self.encodings.append(self.resoruces_count >= z3.IntVal(0, ctx=encoder.ctx))
+            self.encodings.append(self.resoruces_count <= z3.IntVal(len(resoruce_count_vars), ctx=encoder.ctx))
 
     def value(self, plan):
         retvalue = None
@@ -40,8 +49,12 @@ class ResourceCountSMT(Resources):
             assert False, 'Value function is not implemented for this dimension for a plan.'
         else:
             raise TypeError(f"Unknown type for plan: {type(plan)}")
-        self.var_domain.add(str(retvalue))
+        self.var_domain.add(retvalue.as_long())
         return retvalue
 
     def discretize(self, value):
         return value
+
+    def partition_cells(self, encoder, size=None):
+        # one cell per number of used resources.
+        return [self.var == z3.IntVal(count, ctx=encoder.ctx) for count in range(0, len(self.resources_list) + 1)]
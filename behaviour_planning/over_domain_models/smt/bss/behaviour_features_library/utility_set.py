@@ -21,6 +21,8 @@ class UtilitySetSMT(UtilityDimension):
         self.var         = self.utility_var
 
         self.utility_vars = []
+        # the printed predicates of the domain only depend on the variable and its value, so they are printed once.
+        self.printed_values = {}
         for predicate_name, timestep_vars, _ in self.additional_information['goals-utilities']:
             utility_var = z3.Bool(f'utility-set({predicate_name})', encoder.ctx)
             self.utility_vars.append(utility_var)
@@ -30,17 +32,17 @@ class UtilitySetSMT(UtilityDimension):
         
     def value(self, plan):
         ret_value = []
-        ret_value_str = []
+        ret_value_key = []
         if isinstance(plan, ModelRef):
             for predicate in self.utility_vars:
                 predicate_value = plan.evaluate(predicate, model_completion = True)
                 ret_value.append(predicate == predicate_value)
-                ret_value_str.append(str(ret_value[-1]).replace('\n', ''))
+                ret_value_key.append(z3.is_true(predicate_value))
         elif isinstance(plan, SequentialPlan):
             assert False, 'Value function is not implemented for this dimension for a plan.'
         else:
             raise TypeError(f"Unknown type for plan: {type(plan)}")
-        self.var_domain.add(', '.join(ret_value_str))
+        self.var_domain.add(tuple(ret_value_key))
         return z3.And(ret_value)
 
     def discretize(self, value):
@@ -51,3 +53,23 @@ class UtilitySetSMT(UtilityDimension):
     
     def behaviour_expression(self, plan):
         return self.discretize(self.value(plan))
+
+    def behaviour_vars(self):
+        return self.utility_vars
+
+    def decode(self, values):
+        self.var_domain.add(values)
+
+    def printable_domain(self):
+        ret_values_str = []
+        for values in self.var_domain:
+            ret_value_str = []
+            for predicate, value in zip(self.utility_vars, values):
+                key = (predicate.get_id(), value)
+                if key not in self.printed_values: self.printed_values[key] = str(predicate == value).replace('\n', '')
+                ret_value_str.append(self.printed_values[key])
+            ret_values_str.append(', '.join(ret_value_str))
+        return ret_values_str
+
+    def values_expression(self, values):
+        return z3.And([predicate == value for predicate, value in zip(self.utility_vars, values)])
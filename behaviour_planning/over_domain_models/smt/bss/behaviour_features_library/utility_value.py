@@ -25,9 +25,15 @@ class UtilityValueSMT(UtilityDimension):
             utility_var = z3.Int(f'utility-({predicate_name})', encoder.ctx)
             self.utility_vars.append(utility_var)
             self.encodings.append(utility_var == z3.If(timestep_vars[-1], z3.IntVal(utility_value, encoder.ctx), z3.IntVal(0, encoder.ctx)))
+            if encoder.finite_domain:
+                self.encodings.append(utility_var >= z3.IntVal(min(0, utility_value.as_long()), encoder.ctx))
+                self.encodings.append(utility_var <= z3.IntVal(max(0, utility_value.as_long()), encoder.ctx))
 
         # set the utility variable to the sum of the utility values.
         self.encodings.append(self.utility_var == z3.Sum(self.utility_vars))
+        if encoder.finite_domain:
+            utility_values = [u.utility.as_long() for u in self.additional_information['goals-utilities']]
+            self.encodings.append(self.utility_var <= z3.IntVal(sum(filter(lambda u: u > 0, utility_values)), encoder.ctx))
         self.encodings.append(self.utility_var >  z3.IntVal(0, encoder.ctx))
     
     def value(self, plan):
@@ -39,7 +45,7 @@ class UtilityValueSMT(UtilityDimension):
         else:
             raise TypeError(f"Unknown type for plan: {type(plan)}")
         # Update domain value.
-        self.var_domain.add(str(retvalue))
+        self.var_domain.add(retvalue.as_long())
         return retvalue
 
     def discretize(self, value):
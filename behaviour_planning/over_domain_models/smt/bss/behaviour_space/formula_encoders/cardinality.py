@@ -0,0 +1,101 @@
+import math
+import itertools
+
+import z3
+
+# The at-most-one/exactly-one encodings that can be selected for the execution semantics.
+cardinality_encodings = ['pb', 'pairwise', 'sequential', 'commander', 'product', 'bimander', 'auto']
+
+# The auto mode picks the encoding from the number of grounded actions (i.e., the size of one step's constraint).
+AUTO_PAIRWISE_MAX_ACTIONS   = 8
+AUTO_SEQUENTIAL_MAX_ACTIONS = 2048
+
+# The group size of the commander and bimander encodings.
+COMMANDER_GROUP_SIZE = 3
+BIMANDER_GROUP_SIZE  = 2
+
+def resolve_encoding(encoding, actions_cnt):
+    """!
+    Returns the encoding to use for constraints over actions_cnt literals, i.e., resolves the auto mode.
+    """
+    assert encoding in cardinality_encodings, f'Unknown cardinality encoding {encoding}, supported encodings are {cardinality_encodings}.'
+    if encoding != 'auto': return encoding
+    if actions_cnt <= AUTO_PAIRWISE_MAX_ACTIONS: return 'pairwise'
+    if actions_cnt <= AUTO_SEQUENTIAL_MAX_ACTIONS: return 'sequential'
+    return 'pb'
+
+def _pairwise(lits, ctx):
+    return [z3.Or(z3.Not(a), z3.Not(b)) for a, b in itertools.combinations(lits, 2)]
+
+def _sequential(lits, prefix, ctx):
+    # Sinz's sequential counter, s_i is true once one of the first i+1 literals is true.
+    s = [z3.Bool(f'{prefix}_s{i}', ctx=ctx) for i in range(len(lits)-1)]
+    constraints = [z3.Implies(lits[0], s[0])]
+    for i in range(1, len(lits)-1):
+        constraints.append(z3.Implies(lits[i], s[i]))
+        constraints.append(z3.Implies(s[i-1], s[i]))
+        constraints.append(z3.Implies(lits[i], z3.Not(s[i-1])))
+    constraints.append(z3.Implies(lits[-1], z3.Not(s[-1])))
+    return constraints
+
+def _commander(lits, prefix, ctx):
+    # Klieber and Kwon's commander encoding, the commanders are constrained recursively.
+    if len(lits) <= COMMANDER_GROUP_SIZE + 1: return _pairwise(lits, ctx)
+    constraints = []
+    commanders  = []
+    for g in range(0, len(lits), COMMANDER_GROUP_SIZE):
+        group = lits[g:g+COMMANDER_GROUP_SIZE]
+        c = z3.Bool(f'{prefix}_c{len(commanders)}', ctx=ctx)
+        constraints.extend(_pairwise(group, ctx))
+        constraints.extend(z3.Implies(x, c) for x in group)
+        constraints.append(z3.Implies(c, z3.Or(group)))
+        commanders.append(c)
+    return constraints + _commander(commanders, f'{prefix}_c', ctx)
+
+def _product(lits, prefix, ctx):
+    # Chen's 2-product encoding, every literal is a cell of a p*q grid whose rows and columns are at-most-one.
+    if len(lits) <= 4: return _pairwise(lits, ctx)
+    p = math.ceil(math.sqrt(len(lits)))
+    q = math.ceil(len(lits) / p)
+    rows = [z3.Bool(f'{prefix}_r{i}', ctx=ctx) for i in range(p)]
+    cols = [z3.Bool(f'{prefix}_k{j}', ctx=ctx) for j in range(q)]
+    constraints = []
+    for idx, x in enumerate(lits):
+        constraints.append(z3.Implies(x, rows[idx // q]))
+        constraints.append(z3.Implies(x, cols[idx % q]))
+    return constraints + _product(rows, f'{prefix}_r', ctx) + _product(cols, f'{prefix}_k', ctx)
+
+def _bimander(lits, prefix, ctx):
+    # Nguyen and Mai's bimander encoding, every group is identified by the binary value of a few shared bits.
+    groups = [lits[g:g+BIMANDER_GROUP_SIZE] for g in range(0, len(lits), BIMANDER_GROUP_SIZE)]
+    bits = [z3.Bool(f'{prefix}_b{i}', ctx=ctx) for i in range(max(1, math.ceil(math.log2(len(groups)))))]
+    constraints = []
+    for g, group in enumerate(groups):
+        constraints.extend(_pairwise(group, ctx))
+        for i, b in enumerate(bits):
+            constraints.extend(z3.Implies(x, b if (g >> i) & 1 else z3.Not(b)) for x in group)
+    return constraints
+
+def at_most_one(lits, encoding, prefix, ctx):
+    """!
+    Returns a constraint that allows at most one of lits to be true using the given encoding. The auxiliary
+    variables are named after prefix, so it should be unique for every constraint sharing the context.
+    """
+    lits = list(lits)
+    if encoding == 'pb': return z3.PbLe([(var, 1) for var in lits], 1)
+    if len(lits) <= 1: return z3.BoolVal(True, ctx=ctx)
+    if encoding == 'pairwise':  constraints = _pairwise(lits, ctx)
+    if encoding == 'sequential': constraints = _sequential(lits, prefix, ctx)
+    if encoding == 'commander': constraints = _commander(lits, prefix, ctx)
+    if encoding == 'product':   constraints = _product(lits, prefix, ctx)
+    if encoding == 'bimander':  constraints = _bimander(lits, prefix, ctx)
+    return z3.And(constraints)
+
+def exactly_one(lits, encoding, prefix, ctx):
+    """!
+    Returns a constraint that makes exactly one of lits true using the given encoding.
+    """
+    lits = list(lits)
+    if encoding == 'pb': return z3.PbEq([(var, 1) for var in lits], 1)
+    if len(lits) == 0: return z3.BoolVal(False, ctx=ctx)
+    return z3.And(z3.Or(lits), at_most_one(lits, encoding, prefix, ctx))
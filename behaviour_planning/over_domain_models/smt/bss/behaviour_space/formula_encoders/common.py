@@ -1,7 +1,36 @@
+from collections import defaultdict
+
 import z3
 
+from unified_planning.plans import ActionInstance
+
 def flattern_list(list_of_lists):
-    return sum((flattern_list(sub) if isinstance(sub, list) else [sub] for sub in list_of_lists), [])
+    flat = []
+    for sub in list_of_lists:
+        if isinstance(sub, list): flat.extend(flattern_list(sub))
+        else: flat.append(sub)
+    return flat
+
+def object_actions_index(action_names, object_names):
+    """!
+    Returns the inverted index from every object's name to the grounded actions that take it as a parameter, in one
+    pass over the actions. The grounders name an action by its lifted name and parameters joined by '_', so an object
+    matches whole '_' separated tokens (rover1 does not match rover10) and an object whose name has '_' in it matches
+    its sequence of tokens. An object named like a token of the lifted action's name matches that action too.
+    """
+    objects = {tuple(name.split('_')): name for name in object_names}
+    span    = max(map(len, objects), default=0)
+    index   = defaultdict(list)
+    for action_name in action_names:
+        tokens  = action_name.split('_')
+        matched = set()
+        for start in range(len(tokens)):
+            for end in range(start+1, min(start+span, len(tokens))+1):
+                object_name = objects.get(tuple(tokens[start:end]), None)
+                if object_name is None or object_name in matched: continue
+                matched.add(object_name)
+                index[object_name].append(action_name)
+    return index
 
 def get_actions_vars(self, step):
     return list(map(lambda x: x[step], self.up_actions_to_z3.values()))
@@ -31,11 +60,95 @@ def enabled_actions_vars(self):
 def disable_actions_at_t(self, t):
     return [z3.Not(z3.Or(self.get_actions_vars(t)), ctx=self.ctx)]
 
+def selected_actions(self, model, horizon, first_only):
+    """!
+    Returns the action instances and variables that are true in the model for the steps up to the horizon,
+    ordered by step then by the encoder's actions (only the first action of every step if first_only).
+
+    Every step is read with one evaluation of a bit-vector term whose i-th bit is the i-th action's variable,
+    and the action instances come from a table that is built once, so a plan costs one z3 call per step.
+    """
+    if self.plan_actions is None:
+        self.plan_actions = [(action.name, ActionInstance(action)) for action in self]
+        self.step_actions_terms = []
+    if len(self.plan_actions) == 0: return []
+    one, zero = z3.BitVecVal(1, 1, ctx=self.ctx), z3.BitVecVal(0, 1, ctx=self.ctx)
+    while len(self.step_actions_terms) <= horizon:
+        t = len(self.step_actions_terms)
+        # the first argument of a concat is its most significant bit, so the actions are reversed.
+        bits = [z3.If(self.up_actions_to_z3[name][t], one, zero) for name, _ in reversed(self.plan_actions)]
+        self.step_actions_terms.append(bits[0] if len(bits) == 1 else z3.Concat(bits))
+    selected = []
+    for t in range(0, horizon+1):
+        bits = model.evaluate(self.step_actions_terms[t], model_completion=True).as_long()
+        while bits:
+            lowest = bits & -bits
+            name, action_instance = self.plan_actions[lowest.bit_length() - 1]
+            selected.append((action_instance, self.up_actions_to_z3[name][t]))
+            if first_only: break
+            bits ^= lowest
+    return selected
+
+def actions_using_object(self, object_name):
+    """!
+    Returns the names of the grounded actions that take the object as a parameter. The index is built on the first
+    call and shared by all the dimensions of the encoding.
+    """
+    if self.object_actions is None:
+        self.object_actions = object_actions_index(self.up_actions_to_z3.keys(), [str(o.name) for o in self.task.all_objects])
+    return self.object_actions.get(object_name, [])
+
 def actions_that_uses_resource(self, resource_name):
-    # Get grounded actions that has the resource_name in it.
-    actions_names = list(filter(lambda action: resource_name in action, self.up_actions_to_z3.keys()))
-    # For every action get all its vars across the time steps.
-    actions_vars = [self.get_all_action_vars(action) for action in actions_names]
-    # Flattern this list of lists.
-    actions_vars = flattern_list(actions_vars)
-    return actions_vars
+    # the vars of the grounded actions that use the resource, across the time steps.
+    return [var for action in self.actions_using_object(resource_name) for var in self.get_all_action_vars(action)]
+
+# The encodings of the first goal state and of the no-actions-after-goal constraints.
+goal_encodings = ['quadratic', 'linear', 'unary']
+
+def encode_first_goal_state(self, prev_goal_states_cnt, offset, unary_horizon):
+    """!
+    Linear size encoding of the first goal state: goal_reached_t holds once a goal state is reached by step t,
+    so a step is the first goal state when its goal state holds and the goal was not reached by the previous one.
+    With the unary horizon, the horizon is the sum of the one-hot first_goal_t variables instead of an Int
+    variable (horizon_var is updated to this sum).
+
+    Returns the new constraints and the constraints that only hold for the current horizon.
+    """
+    assertions = []
+    for idx in range(prev_goal_states_cnt, len(self.goal_states)):
+        goal_reached = z3.Bool(f'goal_reached_{idx}', ctx=self.ctx)
+        goal_state   = self.goal_states[idx]
+        if idx == 0:
+            first_goal_state = goal_state
+            assertions.append(goal_reached == goal_state)
+        else:
+            prev_goal_reached = z3.Bool(f'goal_reached_{idx-1}', ctx=self.ctx)
+            first_goal_state  = z3.And(goal_state, z3.Not(prev_goal_reached, ctx=self.ctx))
+            assertions.append(goal_reached == z3.Or(prev_goal_reached, goal_state))
+        if unary_horizon:
+            assertions.append(z3.Bool(f'first_goal_{idx}', ctx=self.ctx) == first_goal_state)
+        else:
+            assertions.append(first_goal_state == (self.horizon_var == z3.IntVal(idx+offset, ctx=self.ctx)))
+
+    # a goal state is reached within the horizon.
+    horizon_assertions = [z3.Bool(f'goal_reached_{len(self.goal_states)-1}', ctx=self.ctx)]
+    if unary_horizon:
+        self.horizon_var = z3.Sum([z3.If(z3.Bool(f'first_goal_{idx}', ctx=self.ctx), z3.IntVal(idx+offset, ctx=self.ctx), z3.IntVal(0, ctx=self.ctx)) for idx in range(len(self.goal_states))])
+        horizon_assertions.append(self.horizon_var > z3.IntVal(0, ctx=self.ctx))
+    return assertions, horizon_assertions
+
+def encode_no_actions_after_goal_state(self, prev_goal_states_cnt, prev_length):
+    """!
+    Linear size encoding of the no-actions-after-goal constraints: plan_active_t holds when an action is taken
+    at step t or later, so a goal state holds exactly when the plan is no longer active from the next step.
+    The chain is closed by the horizon, the next unrolling continues it.
+
+    Returns the new constraints and the constraints that only hold for the current horizon.
+    """
+    assertions = []
+    for t in range(prev_length, len(self)):
+        plan_active = z3.Bool(f'plan_active_{t}', ctx=self.ctx)
+        assertions.append(plan_active == z3.Or(self.get_actions_vars(t) + [z3.Bool(f'plan_active_{t+1}', ctx=self.ctx)]))
+    for t in range(prev_goal_states_cnt, len(self.goal_states)):
+        assertions.append(self.goal_states[t] == z3.Not(z3.Bool(f'plan_active_{t+1}', ctx=self.ctx), ctx=self.ctx))
+    return assertions, [z3.Not(z3.Bool(f'plan_active_{len(self)}', ctx=self.ctx), ctx=self.ctx)]
@@ -10,8 +10,9 @@ from unified_planning.model import InstantaneousAction
 from pypmt.encoders.SequentialQFUF import EncoderSequentialQFUF
 
 from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.smt_sequential_plan import SMTSequentialPlan
-from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.common import extend
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.common import extend, goal_encodings, encode_first_goal_state, encode_no_actions_after_goal_state
 from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.utilities import flattern_expression
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.reachability import unreachable_fluent_vars
 
 def get_actions_vars(self, step):
     # This function is used now by the makespan optimla dimension to compute the cost.
@@ -38,42 +39,28 @@ def encode_n(self, **kwargs):
 
     Parameters:
     formula_length (int): The length of the formula to encode.
+    incremental (bool): Keep the horizon dependent constraints in horizon_assertions instead of the assertions list, 
+                        so the formula can be extended later using extend_n.
 
     Returns:
     list: The list of assertions resulting from the encoding.
     """
     formula_length = kwargs.get('formula_length', None)
     assert formula_length is not None, 'formula_length is required to encode the formula.'
-    disable_after_goal_state_actions = kwargs.get('disable_after_goal_state_actions', False)
-    horizon_planning = kwargs.get('horizon_planning', False)
+    self.encode_kwargs = kwargs
 
     self.task_is_oversubscription_planning = len(list(filter(lambda metric: isinstance(metric, Oversubscription), self.task.quality_metrics))) > 0
 
     self.goal_states = []
     self.assertions = []
     self.goal_predicates_vars = defaultdict(dict)
+    self.horizon_assertions = defaultdict(list)
+    self.unrolled_length = 0
  
     # First creat a noop action and append it to the task.
-    nop_action = InstantaneousAction('nop')
-    self.task.actions.append(nop_action)
-    flatten_args = lambda expr: [expr] if not (z3.is_and(expr) or z3.is_or(expr)) else [arg for child in expr.children() for arg in flatten_args(child)]
-    for t in range(0, formula_length):
-        formula = self.encode(t)
-        nested_and = all([z3.is_and(p) for p in formula['goal'].children()])
-        nested_or  = all([z3.is_or(p) for p in formula['goal'].children()])
-        _fn = z3.And if nested_and else z3.Or
-        # strip the extra And if available in formula['goal']
-        # self.goal_states.append(_fn(flatten_args(formula['goal'])) if (nested_and or nested_or) else formula['goal'])
-        # self.goal_states.append(formula['goal'] if not 'And(' in str(formula['goal'].arg(0)) else formula['goal'].arg(0))
-        self.goal_states.append(flattern_expression(formula['goal']))
-        if t == 0: self.assertions.extend([formula['initial'], formula['typing']])
-        del formula['goal']
-        del formula['initial']
-        del formula['typing']
-        if 'objective' in formula: del formula['objective']
-        for k, v in formula.items():
-            if v is not None: self.assertions.append(v)
-    
+    self.nop_action = InstantaneousAction('nop')
+    self.task.actions.append(self.nop_action)
+
     # # append up_fluent_to_z3 to the encoder.
     # self.up_fluent_to_z3 = defaultdict(list)
     # grounded_up_fluents = [f for f, _ in self.ground_problem.initial_values.items()]
@@ -85,52 +72,108 @@ def encode_n(self, **kwargs):
     #     for t in range(0, formula_length):
     #         self.up_fluent_to_z3[fluent_name].append(z3_fluent(fluent_vars + [z3.IntVal(t, ctx=self.ctx)]))
 
-    # define the horizon variable.
-    self.horizon_var = z3.Int('horizon', ctx=self.ctx)
-    self.assertions.append(self.horizon_var >  z3.IntVal(0, ctx=self.ctx))
-    self.assertions.append(self.horizon_var <= z3.IntVal(formula_length, ctx=self.ctx))
-    
+    # define the horizon variable, the unary horizon defines it while unrolling the goal states.
+    if kwargs.get('goal_encoding', 'quadratic') != 'unary' or kwargs.get('horizon_planning', False):
+        self.horizon_var = z3.Int('horizon', ctx=self.ctx)
+        self.assertions.append(self.horizon_var >  z3.IntVal(0, ctx=self.ctx))
+
+    self.assertions.extend(self.extend_n(formula_length))
+
+    # unless we are asked for an incremental encoding, the horizon constraints are part of the formula.
+    if not kwargs.get('incremental', False):
+        self.assertions.extend(self.horizon_assertions.pop(formula_length))
+        if kwargs.get('horizon_planning', False): self.horizon_var = z3.IntVal(len(self)-1, ctx=self.ctx)
+
+    return self.assertions
+
+def extend_n(self, formula_length):
+    """!
+    Unrolls the formula up to formula_length steps, continuing from the steps that are already encoded.
+
+    Returns the new constraints that hold for any longer unrolling. The constraints that only hold for
+    this horizon (horizon bound, disabled last step, goal and no-actions-after-goal constraints) are
+    stored in horizon_assertions[formula_length] so that they can be guarded by a horizon literal.
+    """
+    disable_after_goal_state_actions = self.encode_kwargs.get('disable_after_goal_state_actions', False)
+    horizon_planning = self.encode_kwargs.get('horizon_planning', False)
+    goal_encoding = self.encode_kwargs.get('goal_encoding', 'quadratic')
+    assert goal_encoding in goal_encodings, f'Unknown goal encoding {goal_encoding}, supported encodings are {goal_encodings}.'
+    # the unary horizon only replaces the horizon variable when it is located by the first goal state.
+    unary_horizon = goal_encoding == 'unary' and not horizon_planning
+
+    assertions = []
+    prev_length = self.unrolled_length
+    prev_goal_states_cnt = len(self.goal_states)
+    for t in range(prev_goal_states_cnt, formula_length):
+        formula = self.encode(t)
+        # strip the extra And if available in formula['goal']
+        # self.goal_states.append(_fn(flatten_args(formula['goal'])) if (nested_and or nested_or) else formula['goal'])
+        # self.goal_states.append(formula['goal'] if not 'And(' in str(formula['goal'].arg(0)) else formula['goal'].arg(0))
+        self.goal_states.append(flattern_expression(formula['goal']))
+        if t == 0: assertions.extend([formula['initial'], formula['typing']])
+        del formula['goal']
+        del formula['initial']
+        del formula['typing']
+        if 'objective' in formula: del formula['objective']
+        for k, v in formula.items():
+            if v is not None: assertions.append(v)
+    self.unrolled_length = len(self)
+
     # extract goal predicates.
-    for goal_predicate in self.goal_states:
+    for goal_predicate in self.goal_states[prev_goal_states_cnt:]:
         for idx, predicate in enumerate(goal_predicate.children()):
             if not idx in self.goal_predicates_vars: self.goal_predicates_vars[idx] = []
             self.goal_predicates_vars[idx].append(predicate)
 
     # deny any empty steps.
-    nop_action_var = self.z3_actions_mapping[nop_action]
-    for t in range(0, len(self)-1):
+    nop_action_var = self.z3_actions_mapping[self.nop_action]
+    for t in range(max(0, prev_length-1), len(self)-1):
         prevent_gaps = z3.Implies(self.z3_action_variable(z3.IntVal(t, ctx=self.ctx))   == nop_action_var, 
                                   self.z3_action_variable(z3.IntVal(t+1, ctx=self.ctx)) == nop_action_var, ctx=self.ctx)
-        self.assertions.append(prevent_gaps)
+        assertions.append(prevent_gaps)
     
+    # the one-hot horizon is bounded by the formula length.
+    horizon_assertions = [self.horizon_var <= z3.IntVal(formula_length, ctx=self.ctx)] if not unary_horizon else []
+
     # disable actions for the last step.
-    self.assertions.append(self.z3_action_variable(z3.IntVal(formula_length, ctx=self.ctx)) == nop_action_var)
+    horizon_assertions.append(self.z3_action_variable(z3.IntVal(formula_length, ctx=self.ctx)) == nop_action_var)
 
     if horizon_planning:
-        self.horizon_var = z3.IntVal(len(self)-1, ctx=self.ctx)
+        # the horizon value is fixed by encode_n when the formula is not incremental.
+        if self.encode_kwargs.get('incremental', False): horizon_assertions.append(self.horizon_var == z3.IntVal(len(self)-1, ctx=self.ctx))
     else:
         # update the goal_states for oversubscription planning.
         _fn = z3.Or if self.task_is_oversubscription_planning else z3.And
-        self.goal_states = list(map(lambda x: _fn(x.children()), self.goal_states))
-
-        # encode possible goal states.
-        self.assertions.append(z3.PbGe([(g,1) for g in self.goal_states], 1))
+        self.goal_states[prev_goal_states_cnt:] = list(map(lambda x: _fn(x.children()), self.goal_states[prev_goal_states_cnt:]))
 
-        # locate the first goal state step.
         offset = 0 if self.task_is_oversubscription_planning else 1
-        for idx, goal_state in enumerate(self.goal_states):
-            pre_goal_states = [goal_state] + [z3.Not(s, ctx=self.ctx) for s in self.goal_states[:idx]]
-            self.assertions.append(z3.And(pre_goal_states) == (self.horizon_var == z3.IntVal(idx+offset, ctx=self.ctx)))
+        if goal_encoding != 'quadratic':
+            first_goal_assertions, first_goal_horizon_assertions = self.encode_first_goal_state(prev_goal_states_cnt, offset, unary_horizon)
+            assertions.extend(first_goal_assertions)
+            horizon_assertions.extend(first_goal_horizon_assertions)
+        else:
+            # encode possible goal states.
+            horizon_assertions.append(z3.PbGe([(g,1) for g in self.goal_states], 1))
+
+            # locate the first goal state step.
+            for idx in range(prev_goal_states_cnt, len(self.goal_states)):
+                pre_goal_states = [self.goal_states[idx]] + [z3.Not(s, ctx=self.ctx) for s in self.goal_states[:idx]]
+                assertions.append(z3.And(pre_goal_states) == (self.horizon_var == z3.IntVal(idx+offset, ctx=self.ctx)))
 
     # make sure that once a goal state is reached we don't get any more actions.
-    if not disable_after_goal_state_actions:
+    if not disable_after_goal_state_actions and goal_encoding != 'quadratic':
+        no_actions_assertions, no_actions_horizon_assertions = self.encode_no_actions_after_goal_state(prev_goal_states_cnt, prev_length)
+        assertions.extend(no_actions_assertions)
+        horizon_assertions.extend(no_actions_horizon_assertions)
+    elif not disable_after_goal_state_actions:
         for tstep, goal_state in enumerate(self.goal_states):
             after_goal_state_actions = []
             for t2 in range(tstep+1, len(self)):
                 after_goal_state_actions.append(self.z3_action_variable(z3.IntVal(t2, ctx=self.ctx)) == nop_action_var)
-            self.assertions.append(goal_state == z3.And(after_goal_state_actions))
+            horizon_assertions.append(goal_state == z3.And(after_goal_state_actions))
 
-    return self.assertions
+    self.horizon_assertions[formula_length] = horizon_assertions
+    return assertions
 
 def extract_plan(self, model, horizon):
     """!
@@ -215,12 +258,23 @@ setattr(EncoderSequentialQFUF, 'goal_predicates_vars', defaultdict(dict))
 # Store all assertions.
 setattr(EncoderSequentialQFUF, 'assertions', [])
 setattr(EncoderSequentialQFUF, 'encode_n', encode_n)
+setattr(EncoderSequentialQFUF, 'extend_n', extend_n)
+setattr(EncoderSequentialQFUF, 'horizon_assertions', defaultdict(list))
 setattr(EncoderSequentialQFUF, 'disable_actions_at_t', disable_actions_at_t)
 setattr(EncoderSequentialQFUF, 'enabled_actions_vars', enabled_actions_vars)
 setattr(EncoderSequentialQFUF, 'extend', extend)
 setattr(EncoderSequentialQFUF, 'convert', convert)
 setattr(EncoderSequentialQFUF, 'extract_plan', extract_plan)
+setattr(EncoderSequentialQFUF, 'encode_first_goal_state', encode_first_goal_state)
+setattr(EncoderSequentialQFUF, 'encode_no_actions_after_goal_state', encode_no_actions_after_goal_state)
 setattr(EncoderSequentialQFUF, 'horizon_var', None)
 setattr(EncoderSequentialQFUF, 'actions_that_uses_resource', actions_that_uses_resource)
 setattr(EncoderSequentialQFUF, 'task_is_oversubscription_planning', False)
+# Encode the dimensions over finite domains only (no unbounded integers or uninterpreted functions).
+setattr(EncoderSequentialQFUF, 'finite_domain', False)
+# The actions are identified by a function, so there are no cardinality constraints to encode.
+setattr(EncoderSequentialQFUF, 'cardinality_encoding', 'pb')
+# The relaxed planning graph layers do not bound the steps of this encoder, nothing is pruned.
+setattr(EncoderSequentialQFUF, 'fluent_layers', None)
+setattr(EncoderSequentialQFUF, 'unreachable_fluent_vars', unreachable_fluent_vars)
 setattr(EncoderSequentialQFUF, 'get_actions_vars', get_actions_vars)
\ No newline at end of file
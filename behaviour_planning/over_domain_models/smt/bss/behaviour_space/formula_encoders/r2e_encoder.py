@@ -11,9 +11,11 @@ from unified_planning.plans import ActionInstance
 from pypmt.encoders.R2E import EncoderRelaxed2Exists
 from pypmt.encoders.utilities import str_repr, varstr_repr
 
-from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.common import actions_that_uses_resource, disable_actions_at_t, enabled_actions_vars, get_actions_vars, extend, convert, get_all_action_vars
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.common import actions_that_uses_resource, actions_using_object, disable_actions_at_t, enabled_actions_vars, get_actions_vars, extend, convert, get_all_action_vars, goal_encodings, encode_first_goal_state, encode_no_actions_after_goal_state, selected_actions
 from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.smt_sequential_plan import SMTSequentialPlan
 from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.utilities import flattern_expression
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.reachability import unreachable_fluent_vars
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.cardinality import resolve_encoding, exactly_one
 
 def encode_n(self, **kwargs):
     """!
@@ -33,6 +35,8 @@ def encode_n(self, **kwargs):
 
     Parameters:
     formula_length (int): The length of the formula to encode.
+    incremental (bool): Keep the horizon dependent constraints in horizon_assertions instead of the assertions list, 
+                        so the formula can be extended later using extend_n.
 
     Returns:
     list: The list of assertions resulting from the encoding.
@@ -40,8 +44,7 @@ def encode_n(self, **kwargs):
 
     formula_length = kwargs.get('formula_length', None)
     assert formula_length is not None, 'formula_length is required to encode the formula.'
-    disable_after_goal_state_actions = kwargs.get('disable_after_goal_state_actions', False)
-    horizon_planning = kwargs.get('horizon_planning', False)
+    self.encode_kwargs = kwargs
 
     self.task_is_oversubscription_planning = len(list(filter(lambda metric: isinstance(metric, Oversubscription), self.task.quality_metrics))) > 0
     assert not self.task_is_oversubscription_planning, 'The relaxed to exists encoder does not support oversubscription planning.'
@@ -49,31 +52,58 @@ def encode_n(self, **kwargs):
     self.goal_states = []
     self.assertions = []
     self.goal_predicates_vars = defaultdict(dict)
-    flatten_args = lambda expr: [expr] if not (z3.is_and(expr) or z3.is_or(expr)) else [arg for child in expr.children() for arg in flatten_args(child)]
-    for t in range(0, formula_length):
+    self.horizon_assertions = defaultdict(list)
+    self.unrolled_length = 0
+
+    # define the horizon variable, the unary horizon defines it while unrolling the goal states.
+    if kwargs.get('goal_encoding', 'quadratic') != 'unary' or kwargs.get('horizon_planning', False):
+        self.horizon_var = z3.Int('horizon', ctx=self.ctx)
+        self.assertions.append(self.horizon_var >  z3.IntVal(0, ctx=self.ctx))
+
+    self.assertions.extend(self.extend_n(formula_length))
+
+    # unless we are asked for an incremental encoding, the horizon constraints are part of the formula.
+    if not kwargs.get('incremental', False):
+        self.assertions.extend(self.horizon_assertions.pop(formula_length))
+        if kwargs.get('horizon_planning', False): self.horizon_var = z3.IntVal(len(self)-1, ctx=self.ctx)
+
+    return self.assertions
+
+def extend_n(self, formula_length):
+    """!
+    Unrolls the formula up to formula_length steps, continuing from the steps that are already encoded.
+
+    Returns the new constraints that hold for any longer unrolling. The constraints that only hold for
+    this horizon (horizon bound, goal and no-actions-after-goal constraints) are stored in 
+    horizon_assertions[formula_length] so that they can be guarded by a horizon literal.
+    """
+    disable_after_goal_state_actions = self.encode_kwargs.get('disable_after_goal_state_actions', False)
+    horizon_planning = self.encode_kwargs.get('horizon_planning', False)
+    goal_encoding = self.encode_kwargs.get('goal_encoding', 'quadratic')
+    assert goal_encoding in goal_encodings, f'Unknown goal encoding {goal_encoding}, supported encodings are {goal_encodings}.'
+    # the unary horizon only replaces the horizon variable when it is located by the first goal state.
+    unary_horizon = goal_encoding == 'unary' and not horizon_planning
+
+    assertions = []
+    prev_length = self.unrolled_length
+    prev_goal_states_cnt = len(self.goal_states)
+    for t in range(prev_goal_states_cnt, formula_length):
         formula = self.encode(t)
-        nested_and = all([z3.is_and(p) for p in formula['goal'].children()])
-        nested_or  = all([z3.is_or(p) for p in formula['goal'].children()])
-        _fn = z3.And if nested_and else z3.Or
         # strip the extra And if available in formula['goal']
         # self.goal_states.append(_fn(flatten_args(formula['goal'])) if (nested_and or nested_or) else formula['goal'])
         # self.goal_states.append(formula['goal'] if not 'And(' in str(formula['goal'].arg(0)) else formula['goal'].arg(0))
         self.goal_states.append(flattern_expression(formula['goal']))
-        if t == 0: self.assertions.append(formula['initial'])
+        if t == 0: assertions.append(formula['initial'])
         del formula['goal']
         del formula['initial']
         if 'objective' in formula: del formula['objective']
         for k, v in formula.items():
-            if v is not None: self.assertions.append(v)
+            if v is not None: assertions.append(v)
+    self.unrolled_length = len(self)
 
-    # define the horizon variable.
-    self.horizon_var = z3.Int('horizon', ctx=self.ctx)
-    self.assertions.append(self.horizon_var >  z3.IntVal(0, ctx=self.ctx))
-    self.assertions.append(self.horizon_var <= z3.IntVal(formula_length, ctx=self.ctx))
-        
     # extract goal predicates.
-    for t, goal_predicate in enumerate(self.goal_states):
-        for idx, predicate in enumerate(goal_predicate.children()):
+    for t in range(prev_goal_states_cnt, len(self.goal_states)):
+        for idx, predicate in enumerate(self.goal_states[t].children()):
             if not idx in self.goal_predicates_vars: self.goal_predicates_vars[idx] = []
             # get predicate name.
             predicate_name = varstr_repr(predicate)
@@ -81,50 +111,65 @@ def encode_n(self, **kwargs):
             predicate_chain_vars = list(OrderedDict.fromkeys(self.chain_lookup[predicate_name]))
             self.goal_predicates_vars[idx].extend([self.up_fluent_to_z3[n][t+1] for n in predicate_chain_vars])
 
+    # the exactly-one constraints are encoded as selected, auto picks the encoding from the actions count.
+    encoding = self.cardinality_encoding = resolve_encoding(self.encode_kwargs.get('cardinality_encoding', 'pb'), len(self.up_actions_to_z3))
+
     # deny any empty steps.
-    t_minus_1_actions_vars = self.get_actions_vars(0)
-    for t in range(1, len(self)):
+    t_minus_1_actions_vars = self.get_actions_vars(max(0, prev_length-1))
+    for t in range(max(1, prev_length), len(self)):
         t_actions_vars = self.get_actions_vars(t)
-        self.assertions.append(z3.Implies(z3.Or(t_actions_vars), z3.PbEq([(a, 1) for a in t_minus_1_actions_vars], 1)))
+        assertions.append(z3.Implies(z3.Or(t_actions_vars), exactly_one(t_minus_1_actions_vars, encoding, f'eo_{t-1}', self.ctx)))
         t_minus_1_actions_vars = copy(t_actions_vars)
 
+    # the one-hot horizon is bounded by the formula length.
+    horizon_assertions = [self.horizon_var <= z3.IntVal(formula_length, ctx=self.ctx)] if not unary_horizon else []
+
     if horizon_planning:
-        self.horizon_var = z3.IntVal(len(self)-1, ctx=self.ctx)
+        # the horizon value is fixed by encode_n when the formula is not incremental.
+        if self.encode_kwargs.get('incremental', False): horizon_assertions.append(self.horizon_var == z3.IntVal(len(self)-1, ctx=self.ctx))
     else:
         # update the goal_states for oversubscription planning.
         _fn = z3.Or if self.task_is_oversubscription_planning else z3.And
-        self.goal_states = list(map(lambda x: _fn(x.children()), self.goal_states))
+        self.goal_states[prev_goal_states_cnt:] = list(map(lambda x: _fn(x.children()), self.goal_states[prev_goal_states_cnt:]))
         
-        # encode possible goal states.
-        self.assertions.append(z3.PbGe([(g,1) for g in self.goal_states], 1))
-
-        # locate the first goal state step.
         offset = 0 if self.task_is_oversubscription_planning else 1
-        for idx, goal_state in enumerate(self.goal_states):
-            pre_goal_states = [goal_state] + [z3.Not(s, ctx=self.ctx) for s in self.goal_states[:idx]]
-            self.assertions.append(z3.And(pre_goal_states) == (self.horizon_var == z3.IntVal(idx+offset, ctx=self.ctx)))
+        if goal_encoding != 'quadratic':
+            first_goal_assertions, first_goal_horizon_assertions = self.encode_first_goal_state(prev_goal_states_cnt, offset, unary_horizon)
+            assertions.extend(first_goal_assertions)
+            horizon_assertions.extend(first_goal_horizon_assertions)
+        else:
+            # encode possible goal states.
+            horizon_assertions.append(z3.PbGe([(g,1) for g in self.goal_states], 1))
+
+            # locate the first goal state step.
+            for idx in range(prev_goal_states_cnt, len(self.goal_states)):
+                pre_goal_states = [self.goal_states[idx]] + [z3.Not(s, ctx=self.ctx) for s in self.goal_states[:idx]]
+                assertions.append(z3.And(pre_goal_states) == (self.horizon_var == z3.IntVal(idx+offset, ctx=self.ctx)))
 
     # we need to check this, since in the case of appending plans, we could get plans that undo goal states to add more actions.
-    if not disable_after_goal_state_actions:
+    if not disable_after_goal_state_actions and goal_encoding != 'quadratic':
+        no_actions_assertions, no_actions_horizon_assertions = self.encode_no_actions_after_goal_state(prev_goal_states_cnt, prev_length)
+        assertions.extend(no_actions_assertions)
+        horizon_assertions.extend(no_actions_horizon_assertions)
+    elif not disable_after_goal_state_actions:
         # Force no actions to be taken after the first goal state.
         for t, goal_state in enumerate(self.goal_states):
             after_goal_state_actions = []
             for t2 in range(t+1, len(self)):
                 after_goal_state_actions.extend(self.get_actions_vars(t2))
-            self.assertions.append(goal_state == z3.PbEq([(var, 1) for var in after_goal_state_actions], 0, ctx=self.ctx))
+            horizon_assertions.append(goal_state == z3.PbEq([(var, 1) for var in after_goal_state_actions], 0, ctx=self.ctx))
 
-    return self.assertions
+    self.horizon_assertions[formula_length] = horizon_assertions
+    return assertions
 
 def extract_plan(self, model, horizon):
     plan = SequentialPlan([])
     selected_actions_vars = []
     if not model: return plan
     ## linearize partial-order plan
-    for t in range(0, horizon+1):
-        for action in self:
-            if z3.is_true(model[self.up_actions_to_z3[action.name][t]]):
-                plan.actions.append(ActionInstance(action))
-                selected_actions_vars.append(self.up_actions_to_z3[action.name][t])
+    for action_instance, action_var in self.selected_actions(model, horizon, first_only=False):
+        plan.actions.append(action_instance)
+        selected_actions_vars.append(action_var)
 
     for compilation_r in reversed(self.compilation_results):
         plan = plan.replace_action_instances(compilation_r.map_back_action_instance)
@@ -139,6 +184,8 @@ setattr(EncoderRelaxed2Exists, 'goal_predicates_vars', defaultdict(dict))
 # Store all assertions.
 setattr(EncoderRelaxed2Exists, 'assertions', [])
 setattr(EncoderRelaxed2Exists, 'encode_n', encode_n)
+setattr(EncoderRelaxed2Exists, 'extend_n', extend_n)
+setattr(EncoderRelaxed2Exists, 'horizon_assertions', defaultdict(list))
 setattr(EncoderRelaxed2Exists, 'extend', extend)
 setattr(EncoderRelaxed2Exists, 'get_actions_vars', get_actions_vars)
 setattr(EncoderRelaxed2Exists, 'enabled_actions_vars', enabled_actions_vars)
@@ -146,7 +193,23 @@ setattr(EncoderRelaxed2Exists, 'disable_actions_at_t', disable_actions_at_t)
 setattr(EncoderRelaxed2Exists, 'extend', extend)
 setattr(EncoderRelaxed2Exists, 'convert', convert)
 setattr(EncoderRelaxed2Exists, 'extract_plan', extract_plan)
+# The action instances and per step action terms read by extract_plan, built on the first extraction.
+setattr(EncoderRelaxed2Exists, 'plan_actions', None)
+setattr(EncoderRelaxed2Exists, 'step_actions_terms', None)
+setattr(EncoderRelaxed2Exists, 'selected_actions', selected_actions)
 setattr(EncoderRelaxed2Exists, 'get_all_action_vars', get_all_action_vars)
+setattr(EncoderRelaxed2Exists, 'encode_first_goal_state', encode_first_goal_state)
+setattr(EncoderRelaxed2Exists, 'encode_no_actions_after_goal_state', encode_no_actions_after_goal_state)
 setattr(EncoderRelaxed2Exists, 'horizon_var', None)
 setattr(EncoderRelaxed2Exists, 'actions_that_uses_resource', actions_that_uses_resource)
-setattr(EncoderRelaxed2Exists, 'task_is_oversubscription_planning', False)
\ No newline at end of file
+# The grounded actions of every object, built on the first lookup.
+setattr(EncoderRelaxed2Exists, 'object_actions', None)
+setattr(EncoderRelaxed2Exists, 'actions_using_object', actions_using_object)
+setattr(EncoderRelaxed2Exists, 'task_is_oversubscription_planning', False)
+# Encode the dimensions over finite domains only (no unbounded integers or uninterpreted functions).
+setattr(EncoderRelaxed2Exists, 'finite_domain', False)
+# The exactly-one encoding used to deny the empty steps.
+setattr(EncoderRelaxed2Exists, 'cardinality_encoding', 'pb')
+# The relaxed planning graph layers do not bound the steps of this encoder, nothing is pruned.
+setattr(EncoderRelaxed2Exists, 'fluent_layers', None)
+setattr(EncoderRelaxed2Exists, 'unreachable_fluent_vars', unreachable_fluent_vars)
@@ -0,0 +1,78 @@
+import z3
+
+from pypmt.encoders.utilities import str_repr
+
+# The encoders whose steps apply actions to the state of the previous step only, so an action/fluent cannot
+# appear before its relaxed planning graph layer.
+reachability_encoders = ['seq', 'forall']
+
+def _positive_atoms(expr):
+    # the relaxation only keeps the positive boolean fluents of a conjunction, anything else is assumed to hold.
+    if expr.is_and(): return [a for arg in expr.args for a in _positive_atoms(arg)]
+    if expr.is_fluent_exp() and expr.type.is_bool_type(): return [expr]
+    return []
+
+def _add_effects(action):
+    # conditional effects are relaxed as well, their condition is assumed to hold.
+    return [e.fluent for e in action.effects if e.fluent.type.is_bool_type() and not e.value.is_false()]
+
+def relaxed_planning_graph(problem):
+    """!
+    Computes the earliest layer of every grounded action and boolean fluent of the relaxed planning graph
+    (delete effects ignored). An action cannot be applied before the step of its layer and a fluent cannot
+    hold before the state of its layer; the unreachable ones have a None layer.
+
+    Returns the layers of the actions (keyed by action name) and of the fluents (keyed like up_fluent_to_z3).
+    """
+    fluent_layers = {str_repr(f): 0 for f, v in problem.initial_values.items() if v.is_bool_constant() and v.is_true()}
+    action_layers = {}
+    preconditions = {a.name: [str_repr(p) for pre in a.preconditions for p in _positive_atoms(pre)] for a in problem.actions}
+    layer = 0
+    while True:
+        new_actions = [a for a in problem.actions if a.name not in action_layers and all(p in fluent_layers for p in preconditions[a.name])]
+        if len(new_actions) == 0: break
+        for action in new_actions:
+            action_layers[action.name] = layer
+            for f in map(str_repr, _add_effects(action)):
+                if f not in fluent_layers: fluent_layers[f] = layer + 1
+        layer += 1
+    action_layers.update({a.name: None for a in problem.actions if a.name not in action_layers})
+    fluent_layers.update({str_repr(f): None for f, v in problem.initial_values.items() if v.is_bool_constant() and str_repr(f) not in fluent_layers})
+    return action_layers, fluent_layers
+
+def _unreachable(layers, name, vars):
+    # the variables before the layer, all of them when unreachable, none when the analysis does not know them.
+    if name not in layers or not all(z3.is_bool(v) for v in vars): return []
+    return vars[:len(vars) if layers[name] is None else layers[name]]
+
+def prune_unreachable(self):
+    """!
+    Returns the constraints that fix the action and fluent variables of the steps before their layer to false,
+    continuing from the variables that were pruned by the previous unrolling.
+    """
+    assertions = []
+    for name, vars in self.up_actions_to_z3.items():
+        assertions.extend(z3.Not(v, ctx=self.ctx) for v in _unreachable(self.action_layers, name, vars)[self.pruned_steps_cnt:])
+    for name, vars in self.up_fluent_to_z3.items():
+        assertions.extend(z3.Not(v, ctx=self.ctx) for v in _unreachable(self.fluent_layers, name, vars)[self.pruned_states_cnt:])
+    self.pruned_steps_cnt  = max(map(len, self.up_actions_to_z3.values()), default=0)
+    self.pruned_states_cnt = max(map(len, self.up_fluent_to_z3.values()), default=0)
+    return assertions
+
+def unreachable_fluent_vars(self):
+    """!
+    Returns the ids of the fluent variables that cannot hold (i.e., the ones before their fluent's layer).
+    """
+    if self.fluent_layers is None: return set()
+    return set(v.get_id() for name, vars in self.up_fluent_to_z3.items() for v in _unreachable(self.fluent_layers, name, vars))
+
+def pruning_stats(encoder):
+    """!
+    Returns the number of pruned action and fluent variables out of all of them.
+    """
+    actions = sum(len(_unreachable(encoder.action_layers, name, vars)) for name, vars in encoder.up_actions_to_z3.items())
+    fluents = sum(len(_unreachable(encoder.fluent_layers, name, vars)) for name, vars in encoder.up_fluent_to_z3.items())
+    return {
+        'actions': (actions, sum(map(len, encoder.up_actions_to_z3.values()))),
+        'fluents': (fluents, sum(map(len, encoder.up_fluent_to_z3.values())))
+    }
@@ -12,9 +12,11 @@ from unified_planning.engines.results import CompilerResult
 from pypmt.encoders.basic import EncoderSequential, EncoderForall
 from pypmt.encoders.utilities import str_repr
 
-from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.common import actions_that_uses_resource, disable_actions_at_t, enabled_actions_vars, get_actions_vars, extend, convert, get_all_action_vars
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.common import actions_that_uses_resource, actions_using_object, disable_actions_at_t, enabled_actions_vars, get_actions_vars, extend, convert, get_all_action_vars, goal_encodings, encode_first_goal_state, encode_no_actions_after_goal_state, selected_actions
 from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.smt_sequential_plan import SMTSequentialPlan
 from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.utilities import flattern_expression
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.reachability import prune_unreachable, unreachable_fluent_vars
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.cardinality import resolve_encoding, at_most_one, exactly_one
 
 # append some extra functions to the EncoderSequential.
 def encode_n(self, **kwargs):
@@ -35,115 +37,165 @@ def encode_n(self, **kwargs):
 
     Parameters:
     formula_length (int): The length of the formula to encode.
+    incremental (bool): Keep the horizon dependent constraints in horizon_assertions instead of the assertions list, 
+                        so the formula can be extended later using extend_n.
 
     Returns:
     list: The list of assertions resulting from the encoding.
     """
     formula_length = kwargs.get('formula_length', None)
     assert formula_length is not None, 'formula_length is required to encode the formula.'
-    disable_after_goal_state_actions = kwargs.get('disable_after_goal_state_actions', False)
-    horizon_planning = kwargs.get('horizon_planning', False)
-    skip_actions = kwargs.get('skip_actions', False)
+    self.encode_kwargs = kwargs
 
     self.task_is_oversubscription_planning = len(list(filter(lambda metric: isinstance(metric, Oversubscription), self.task.quality_metrics))) > 0
 
     self.goal_states = []
     self.assertions = []
     self.goal_predicates_vars = defaultdict(dict)
+    self.horizon_assertions = defaultdict(list)
+    self.unrolled_length = 0
+    self.pruned_steps_cnt = self.pruned_states_cnt = 0
 
-    flatten_args = lambda expr: [expr] if not (z3.is_and(expr) or z3.is_or(expr)) else [arg for child in expr.children() for arg in flatten_args(child)]
-    for t in range(0, formula_length):
+    # define the horizon variable, the unary horizon defines it while unrolling the goal states.
+    if kwargs.get('goal_encoding', 'quadratic') != 'unary' or kwargs.get('horizon_planning', False):
+        self.horizon_var = z3.Int('horizon', ctx=self.ctx)
+        self.assertions.append(self.horizon_var >  z3.IntVal(0, ctx=self.ctx))
+
+    self.assertions.extend(self.extend_n(formula_length))
+
+    # unless we are asked for an incremental encoding, the horizon constraints are part of the formula.
+    if not kwargs.get('incremental', False):
+        self.assertions.extend(self.horizon_assertions.pop(formula_length))
+        if kwargs.get('horizon_planning', False): self.horizon_var = z3.IntVal(len(self)-1, ctx=self.ctx)
+
+    return self.assertions
+
+def extend_n(self, formula_length):
+    """!
+    Unrolls the formula up to formula_length steps, continuing from the steps that are already encoded.
+
+    Returns the new constraints that hold for any longer unrolling. The constraints that only hold for
+    this horizon (horizon bound, disabled last step, goal and no-actions-after-goal constraints) are
+    stored in horizon_assertions[formula_length] so that they can be guarded by a horizon literal.
+    """
+    disable_after_goal_state_actions = self.encode_kwargs.get('disable_after_goal_state_actions', False)
+    horizon_planning = self.encode_kwargs.get('horizon_planning', False)
+    skip_actions = self.encode_kwargs.get('skip_actions', False)
+    goal_encoding = self.encode_kwargs.get('goal_encoding', 'quadratic')
+    assert goal_encoding in goal_encodings, f'Unknown goal encoding {goal_encoding}, supported encodings are {goal_encodings}.'
+    # the unary horizon only replaces the horizon variable when it is located by the first goal state.
+    unary_horizon = goal_encoding == 'unary' and not horizon_planning
+
+    assertions = []
+    prev_length = self.unrolled_length
+    prev_goal_states_cnt = len(self.goal_states)
+    for t in range(prev_goal_states_cnt, formula_length):
         formula = self.encode(t)
-        nested_and = all([z3.is_and(p) for p in formula['goal'].children()])
-        nested_or  = all([z3.is_or(p) for p in formula['goal'].children()])
-        _fn = z3.And if nested_and else z3.Or
         # strip the extra And if available in formula['goal']
         # This is a bug we need to fix this. 
         # self.goal_states.append(_fn(flattern_expression(formula['goal'])) if (nested_and or nested_or) else formula['goal'])
         # self.goal_states.append(formula['goal'] if not 'And(' in str(formula['goal'].arg(0)) else formula['goal'].arg(0))
         self.goal_states.append(flattern_expression(formula['goal']))
-        if t == 0: self.assertions.append(formula['initial'])
+        if t == 0: assertions.append(formula['initial'])
         del formula['goal']
         del formula['initial']
         del formula['sem']
         if 'objective' in formula: del formula['objective']
         for k, v in formula.items():
-            if v is not None: self.assertions.append(v)
-    
-    # define the horizon variable.
-    self.horizon_var = z3.Int('horizon', ctx=self.ctx)
-    self.assertions.append(self.horizon_var >  z3.IntVal(0, ctx=self.ctx))
-    self.assertions.append(self.horizon_var <= z3.IntVal(formula_length, ctx=self.ctx))
+            if v is not None: assertions.append(v)
+    self.unrolled_length = len(self)
+
+    # fix the variables of the steps the relaxed planning graph cannot reach yet.
+    if self.encode_kwargs.get('reachability_pruning', False): assertions.extend(self.prune_unreachable())
     
     # extract goal predicates.
-    for goal_predicate in self.goal_states:
+    for goal_predicate in self.goal_states[prev_goal_states_cnt:]:
         for idx, predicate in enumerate(goal_predicate.children()):
             if not idx in self.goal_predicates_vars: self.goal_predicates_vars[idx] = []
             self.goal_predicates_vars[idx].append(predicate)
     
+    # the at-most-one/exactly-one constraints are encoded as selected, auto picks the encoding from the actions count.
+    encoding = self.cardinality_encoding = resolve_encoding(self.encode_kwargs.get('cardinality_encoding', 'pb'), len(self.up_actions_to_z3))
+
     # deny any empty steps.
-    t_minus_1_actions_vars = self.get_actions_vars(0)
-    for t in range(1, len(self)-1):
+    t_minus_1_actions_vars = self.get_actions_vars(max(0, prev_length-2))
+    for t in range(max(1, prev_length-1), len(self)-1):
         t_actions_vars = self.get_actions_vars(t)
-        self.assertions.append(z3.Implies(z3.Or(t_actions_vars), z3.PbEq([(a, 1) for a in t_minus_1_actions_vars], 1)))
+        # the previous step is already at-most-one unless the execution semantics are skipped.
+        if encoding != 'pb' and not skip_actions:
+            assertions.append(z3.Implies(z3.Or(t_actions_vars), z3.Or(t_minus_1_actions_vars)))
+        else:
+            assertions.append(z3.Implies(z3.Or(t_actions_vars), exactly_one(t_minus_1_actions_vars, encoding, f'eo_{t-1}', self.ctx)))
         t_minus_1_actions_vars = copy(t_actions_vars)
 
     # add the extection sematics.
     if not skip_actions:
-        for t in range(0, len(self)-1):
+        for t in range(max(0, prev_length-1), len(self)-1):
             actions = list(map(lambda x: x[t], self.up_actions_to_z3.values()))
-            self.assertions.append(z3.PbLe([(var, 1) for var in actions], 1))
+            assertions.append(at_most_one(actions, encoding, f'amo_{t}', self.ctx))
+
+    # the one-hot horizon is bounded by the formula length.
+    horizon_assertions = [self.horizon_var <= z3.IntVal(formula_length, ctx=self.ctx)] if not unary_horizon else []
 
     # disable the actions in the last step of the formula.
     last_step_actions = list(map(lambda x: x[len(self)-1], self.up_actions_to_z3.values()))
     #self.assertions.append(z3.PbEq([(var, 1) for var in last_step_actions], 0, ctx=self.ctx))
-    self.assertions.append(z3.Not(z3.Or(last_step_actions), ctx=self.ctx))
+    horizon_assertions.append(z3.Not(z3.Or(last_step_actions), ctx=self.ctx))
 
     # encode possible goal states.
     if horizon_planning:
-        self.horizon_var = z3.IntVal(len(self)-1, ctx=self.ctx)
+        # the horizon value is fixed by encode_n when the formula is not incremental.
+        if self.encode_kwargs.get('incremental', False): horizon_assertions.append(self.horizon_var == z3.IntVal(len(self)-1, ctx=self.ctx))
     else:
         # update the goal_states for oversubscription planning.
         _fn = z3.Or if self.task_is_oversubscription_planning else z3.And
-        self.goal_states = list(map(lambda x: _fn(x.children()), self.goal_states))
-
-        # encode possible goal states.
-        self.assertions.append(z3.Or(self.goal_states))
+        self.goal_states[prev_goal_states_cnt:] = list(map(lambda x: _fn(x.children()), self.goal_states[prev_goal_states_cnt:]))
 
-        # locate the first goal state step.
         offset = 0 if self.task_is_oversubscription_planning else 1
-        for idx, goal_state in enumerate(self.goal_states):
-            pre_goal_states = [goal_state] if idx == 0 else [goal_state, z3.Not(z3.Or(self.goal_states[:idx]), ctx=self.ctx)]
-            self.assertions.append(z3.And(pre_goal_states) == (self.horizon_var == z3.IntVal(idx+offset, ctx=self.ctx)))
+        if goal_encoding != 'quadratic':
+            first_goal_assertions, first_goal_horizon_assertions = self.encode_first_goal_state(prev_goal_states_cnt, offset, unary_horizon)
+            assertions.extend(first_goal_assertions)
+            horizon_assertions.extend(first_goal_horizon_assertions)
+        else:
+            # encode possible goal states.
+            horizon_assertions.append(z3.Or(self.goal_states))
+
+            # locate the first goal state step.
+            for idx in range(prev_goal_states_cnt, len(self.goal_states)):
+                goal_state = self.goal_states[idx]
+                pre_goal_states = [goal_state] if idx == 0 else [goal_state, z3.Not(z3.Or(self.goal_states[:idx]), ctx=self.ctx)]
+                assertions.append(z3.And(pre_goal_states) == (self.horizon_var == z3.IntVal(idx+offset, ctx=self.ctx)))
 
     # we need to check this, since in the case of appending plans, 
     # we could get plans that undo goal states to add more actions.
-    if not disable_after_goal_state_actions:
+    if not disable_after_goal_state_actions and goal_encoding != 'quadratic':
+        no_actions_assertions, no_actions_horizon_assertions = self.encode_no_actions_after_goal_state(prev_goal_states_cnt, prev_length)
+        assertions.extend(no_actions_assertions)
+        horizon_assertions.extend(no_actions_horizon_assertions)
+    elif not disable_after_goal_state_actions:
         # force no actions to be taken after the first goal state.
         for t, goal_state in enumerate(self.goal_states):
             after_goal_state_actions = []
             for t2 in range(t+1, len(self)):
                 after_goal_state_actions.extend(self.get_actions_vars(t2))
             #self.assertions.append(goal_state == z3.PbEq([(var, 1) for var in after_goal_state_actions], 0, ctx=self.ctx))
-            self.assertions.append(goal_state == z3.Not(z3.Or(after_goal_state_actions), ctx=self.ctx))
+            horizon_assertions.append(goal_state == z3.Not(z3.Or(after_goal_state_actions), ctx=self.ctx))
 
-    return self.assertions
+    self.horizon_assertions[formula_length] = horizon_assertions
+    return assertions
 
 def extract_plan(self, model, horizon):
     plan = SequentialPlan([])
     selected_actions_vars = []
     if not model: return plan
     ## linearize partial-order plan
-    for t in range(0, horizon+1):
-        for action in self:
-            if z3.is_true(model[self.up_actions_to_z3[action.name][t]]):
-                plan.actions.append(ActionInstance(action))
-                selected_actions_vars.append(self.up_actions_to_z3[action.name][t])
-                break
+    for action_instance, action_var in self.selected_actions(model, horizon, first_only=True):
+        plan.actions.append(action_instance)
+        selected_actions_vars.append(action_var)
     return SMTSequentialPlan(plan, self.task, selected_actions_vars)
 
 def encode_execution_semantics(self):
-    return z3.PbLe([(var, 1) for var in list(map(lambda x: x[0], self.up_actions_to_z3.values()))], 1)
+    return at_most_one(list(map(lambda x: x[0], self.up_actions_to_z3.values())), self.cardinality_encoding, 'amo_0', self.ctx)
 
 # Update the encoder apis.
 # Store all goal states.
@@ -152,17 +204,39 @@ setattr(EncoderSequential, 'goal_predicates_vars', defaultdict(dict))
 # Store all assertions.
 setattr(EncoderSequential, 'assertions', [])
 setattr(EncoderSequential, 'encode_n', encode_n)
+setattr(EncoderSequential, 'extend_n', extend_n)
+setattr(EncoderSequential, 'horizon_assertions', defaultdict(list))
 setattr(EncoderSequential, 'enabled_actions_vars', enabled_actions_vars)
 setattr(EncoderSequential, 'get_actions_vars', get_actions_vars)
 setattr(EncoderSequential, 'disable_actions_at_t', disable_actions_at_t)
 setattr(EncoderSequential, 'extend', extend)
 setattr(EncoderSequential, 'convert', convert)
 setattr(EncoderSequential, 'extract_plan', extract_plan)
+# The action instances and per step action terms read by extract_plan, built on the first extraction.
+setattr(EncoderSequential, 'plan_actions', None)
+setattr(EncoderSequential, 'step_actions_terms', None)
+setattr(EncoderSequential, 'selected_actions', selected_actions)
 setattr(EncoderSequential, 'encode_execution_semantics', encode_execution_semantics)
 setattr(EncoderSequential, 'get_all_action_vars', get_all_action_vars)
+setattr(EncoderSequential, 'encode_first_goal_state', encode_first_goal_state)
+setattr(EncoderSequential, 'encode_no_actions_after_goal_state', encode_no_actions_after_goal_state)
 setattr(EncoderSequential, 'horizon_var', None)
 setattr(EncoderSequential, 'actions_that_uses_resource', actions_that_uses_resource)
+# The grounded actions of every object, built on the first lookup.
+setattr(EncoderSequential, 'object_actions', None)
+setattr(EncoderSequential, 'actions_using_object', actions_using_object)
 setattr(EncoderSequential, 'task_is_oversubscription_planning', False)
+# Encode the dimensions over finite domains only (no unbounded integers or uninterpreted functions).
+setattr(EncoderSequential, 'finite_domain', False)
+# The at-most-one/exactly-one encoding used for the execution semantics.
+setattr(EncoderSequential, 'cardinality_encoding', 'pb')
+# The relaxed planning graph layers of the actions and fluents, set when the unreachable variables are pruned.
+setattr(EncoderSequential, 'action_layers', None)
+setattr(EncoderSequential, 'fluent_layers', None)
+setattr(EncoderSequential, 'pruned_steps_cnt', 0)
+setattr(EncoderSequential, 'pruned_states_cnt', 0)
+setattr(EncoderSequential, 'prune_unreachable', prune_unreachable)
+setattr(EncoderSequential, 'unreachable_fluent_vars', unreachable_fluent_vars)
 
 
 setattr(EncoderForall, 'goal_states', [])
@@ -170,14 +244,36 @@ setattr(EncoderForall, 'goal_predicates_vars', defaultdict(dict))
 # Store all assertions.
 setattr(EncoderForall, 'assertions', [])
 setattr(EncoderForall, 'encode_n', encode_n)
+setattr(EncoderForall, 'extend_n', extend_n)
+setattr(EncoderForall, 'horizon_assertions', defaultdict(list))
 setattr(EncoderForall, 'enabled_actions_vars', enabled_actions_vars)
 setattr(EncoderForall, 'get_actions_vars', get_actions_vars)
 setattr(EncoderForall, 'disable_actions_at_t', disable_actions_at_t)
 setattr(EncoderForall, 'extend', extend)
 setattr(EncoderForall, 'convert', convert)
 setattr(EncoderForall, 'extract_plan', extract_plan)
+# The action instances and per step action terms read by extract_plan, built on the first extraction.
+setattr(EncoderForall, 'plan_actions', None)
+setattr(EncoderForall, 'step_actions_terms', None)
+setattr(EncoderForall, 'selected_actions', selected_actions)
 setattr(EncoderForall, 'encode_execution_semantics', encode_execution_semantics)
 setattr(EncoderForall, 'get_all_action_vars', get_all_action_vars)
+setattr(EncoderForall, 'encode_first_goal_state', encode_first_goal_state)
+setattr(EncoderForall, 'encode_no_actions_after_goal_state', encode_no_actions_after_goal_state)
 setattr(EncoderForall, 'horizon_var', None)
 setattr(EncoderForall, 'actions_that_uses_resource', actions_that_uses_resource)
+# The grounded actions of every object, built on the first lookup.
+setattr(EncoderForall, 'object_actions', None)
+setattr(EncoderForall, 'actions_using_object', actions_using_object)
 setattr(EncoderForall, 'task_is_oversubscription_planning', False)
+# Encode the dimensions over finite domains only (no unbounded integers or uninterpreted functions).
+setattr(EncoderForall, 'finite_domain', False)
+# The at-most-one/exactly-one encoding used for the execution semantics.
+setattr(EncoderForall, 'cardinality_encoding', 'pb')
+# The relaxed planning graph layers of the actions and fluents, set when the unreachable variables are pruned.
+setattr(EncoderForall, 'action_layers', None)
+setattr(EncoderForall, 'fluent_layers', None)
+setattr(EncoderForall, 'pruned_steps_cnt', 0)
+setattr(EncoderForall, 'pruned_states_cnt', 0)
+setattr(EncoderForall, 'prune_unreachable', prune_unreachable)
+setattr(EncoderForall, 'unreachable_fluent_vars', unreachable_fluent_vars)
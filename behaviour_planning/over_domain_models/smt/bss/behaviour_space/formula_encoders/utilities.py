@@ -3,4 +3,33 @@ import z3
 def flattern_expression(expr):
     if len(expr.children()) == 1 and (z3.is_and(expr) or z3.is_or(expr)):
         return flattern_expression(expr.arg(0))
-    return expr if (z3.is_and(expr) or z3.is_or(expr)) else z3.And([expr])
\ No newline at end of file
+    return expr if (z3.is_and(expr) or z3.is_or(expr)) else z3.And([expr])
+
+def to_smt2(exprs, ctx):
+    """!
+    Serialises a list of expressions as an SMT-LIB2 benchmark (declarations and assertions).
+    """
+    solver = z3.Solver(ctx=ctx)
+    solver.add(exprs)
+    return solver.to_smt2()
+
+def formula_size(exprs, ctx):
+    """!
+    Returns the number of distinct sub-expressions of a list of expressions.
+    """
+    goal = z3.Goal(ctx=ctx)
+    goal.add(exprs)
+    return z3.Z3_goal_num_exprs(ctx.ref(), goal.goal)
+
+def uninterpreted_constants(exprs):
+    """!
+    Returns the uninterpreted constants the expressions mention, indexed by their ids.
+    """
+    constants, visited, stack = {}, set(), list(exprs)
+    while len(stack) > 0:
+        e = stack.pop()
+        if e.get_id() in visited: continue
+        visited.add(e.get_id())
+        if z3.is_const(e) and e.decl().kind() == z3.Z3_OP_UNINTERPRETED: constants[e.get_id()] = e
+        stack.extend(e.children())
+    return constants
@@ -1,3 +1,4 @@
+import os
 import time
 from collections import defaultdict
 
@@ -5,62 +6,294 @@ import z3
 
 from unified_planning.plans import SequentialPlan
 
-from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.seq_encoder import EncoderSequential, EncoderForall
-from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.r2e_encoder import EncoderRelaxed2Exists
-from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.qfuf_encoder import EncoderSequentialQFUF
-
 from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.smt_sequential_plan import SMTSequentialPlan
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.reachability import reachability_encoders, relaxed_planning_graph, pruning_stats
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.space_encoders.portfolio import SolverPortfolio
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.space_encoders.partition import PartitionedEnumeration
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.space_encoders.preprocessing import preprocess
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.space_encoders.solvers import BehaviourSpaceSolver, PreprocessedSolver
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.space_encoders.symmetry import symmetry_breaking_modes, symmetry_breaking_encoders, ObjectSymmetries, LexLeaderConstraints
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.space_encoders.decoding import BehaviourDecoder
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.space_encoders.encoding_cache import cacheable_encoders, encoding_cache_key, load_encoding, store_encoding
+from behaviour_planning.over_domain_models.smt.bss.behaviour_features_library.cost_bound_dims import CostBoundSMT
 from behaviour_planning.over_domain_models.smt.bss.behaviour_features_library.cost_bound_makespan_optimal import MakespanOptimalCostSMT
+from behaviour_planning.over_domain_models.smt.registry import encoders, resolve_dims
 
 
-encoder_map = {
-    'seq': EncoderSequential,
-    'forall': EncoderForall,
-    'r2e': EncoderRelaxed2Exists,
-    'qfuf': EncoderSequentialQFUF
-}
+# How the FBI loop hands the forbidden behaviours/plans to the solver:
+# - assume: rebuild them as assumptions on every check (the solver keeps nothing between checks).
+# - assert: assert every constraint once inside a solver scope that is popped when the loop ends.
+# - indicator: assert every constraint once guarded by an activation literal that is retired when the loop ends.
+blocking_modes = ['assume', 'assert', 'indicator']
 
 class BehaviourSpaceSMT:
 
     def __init__(self, task, cfg=defaultdict(dict)) -> None:
         self.task    = task.problem
         self.encodername = cfg.get('encoder', 'seq')
-        self.encoder = encoder_map[self.encodername](self.task)
+        # the encoder's module (and its pypmt encoder) is only imported when it is used.
+        self.encoder = encoders.get(self.encodername)(self.task)
         self.run_plan_validation    = cfg.get('run-plan-validation', False)
+        self.blocking               = cfg.get('blocking', 'assume')
+        assert self.blocking in blocking_modes, f'Unknown blocking mode {self.blocking}, supported modes are {blocking_modes}.'
         
-        self._behaviour_frequency = defaultdict(dict)
+        # the behaviours found so far interned by their values, and the number of plans per behaviour.
+        self.behaviours = {}
+        self._behaviour_counts = defaultdict(int)
         self._plans = []
 
+        # The finite-domain mode keeps the formula propositional (bounded counts, no uninterpreted functions)
+        # and hands it to z3's finite-domain solver.
+        self.finite_domain = cfg.get('finite-domain', False)
+        self.solver_logic  = 'QF_FD' if self.finite_domain else None
+        assert not (self.finite_domain and self.encodername == 'qfuf'), 'The qfuf encoder uses uninterpreted functions, it does not support the finite-domain mode.'
+        self.encoder.finite_domain = self.finite_domain
+
+        # The formula is either unrolled up to the upper bound at once, or unrolled incrementally starting 
+        # from the initial horizon, in which case the horizon dependent constraints are guarded by a literal.
+        self.upper_bound         = cfg.get('upper-bound', 50)
+        self.incremental_horizon = cfg.get('incremental-horizon', False)
+        self.horizon             = min(cfg.get('initial-horizon', self.upper_bound), self.upper_bound) if self.incremental_horizon else self.upper_bound
+        self.horizon_literal     = None
+        # The plans can be restricted to fewer steps than the formula has, see bound_plan_length.
+        self.plan_length_bound       = None
+        self.plan_length_assumptions = []
+        assert not (self.finite_domain and self.incremental_horizon), 'The finite-domain mode needs the bounds of the whole formula, it cannot be combined with the incremental horizon.'
+
         args = {
-            'formula_length': cfg.get('upper-bound', 50), 
+            'formula_length': self.horizon, 
             'disable_after_goal_state_actions': cfg.get('disable-after-goal-state-actions', False),
             'horizon_planning': cfg.get('horizon-planning', False),
-            'skip_actions' : cfg.get('skip-actions', False)
+            'skip_actions' : cfg.get('skip-actions', False),
+            'incremental': self.incremental_horizon,
+            'cardinality_encoding': cfg.get('cardinality-encoding', 'pb'),
+            'goal_encoding': cfg.get('goal-encoding', 'quadratic'),
+            'reachability_pruning': cfg.get('reachability-pruning', False)
         }
 
-        self.encoder.encode_n(**args)
-        
-        self.dims  = cfg.get('dims', [])
-        
-        self.dims  = [d(self.encoder, additional_information) for d, additional_information in self.dims]
-
-        # convert the list to dict with keys as the names of the dimensions.
-        self.dims = {d.__class__.__name__: d for d in self.dims}
-        # add the dimensions encodings
-        for name, _dim in self.dims.items():
-            self.encoder.extend(_dim.encodings)
-        
-        # Create the solver.
-        self.solver = z3.Solver(ctx=self.encoder.ctx)
-        self.solver.add(self.encoder.assertions)
-
         # Logged messages.
         self.log_msg  = []
         self.sat_time = []
+        self.last_check = None
+        # the outcome of the last check (sat, unsat, timeout, unknown or error) and the count of every outcome.
+        self.last_outcome   = None
+        self.check_outcomes = defaultdict(int)
+
+        self.dims_cfg = resolve_dims(cfg.get('dims', []))
+
+        # The action/fluent variables of the steps before their relaxed planning graph layer are fixed to false.
+        if args['reachability_pruning']:
+            assert self.encodername in reachability_encoders, f'The reachability pruning is only supported by the {reachability_encoders} encoders.'
+            start_time = time.time()
+            self.encoder.action_layers, self.encoder.fluent_layers = relaxed_planning_graph(self.task)
+            layers = [l for l in self.encoder.action_layers.values() if l is not None]
+            self.log_msg.append(f'The relaxed planning graph has {max(layers, default=-1)+1} layers, {len(self.encoder.action_layers)-len(layers)} actions are unreachable ({round(time.time() - start_time, 2)}s).')
+
+        # The encoded space can be reloaded from the cache directory instead of encoding it again.
+        cache_path = None
+        if cfg.get('cache-dir', None) is not None and self.encodername in cacheable_encoders and not self.incremental_horizon:
+            cache_path = os.path.join(cfg['cache-dir'], encoding_cache_key(self.task, self.encodername, dict(args, finite_domain=self.finite_domain), self.dims_cfg))
+
+        start_time = time.time()
+        if cache_path is not None and os.path.isdir(cache_path):
+            self.encoder.encode_kwargs = args
+            load_encoding(cache_path, self.encoder)
+            # the cached assertions already include the dimensions' encodings.
+            self.dims = self._build_dims()
+            self.log_msg.append(f'Behaviour space cache hit ({os.path.basename(cache_path)}), loaded in {round(time.time() - start_time, 2)}s.')
+        else:
+            self.encoder.encode_n(**args)
+            self.dims = self._build_dims()
+
+            # add the dimensions encodings, they depend on the horizon when the formula is incremental.
+            if not self.incremental_horizon:
+                for name, _dim in self.dims.items():
+                    self.encoder.extend(_dim.encodings)
+
+            if cache_path is not None:
+                store_encoding(cache_path, self.encoder)
+                self.log_msg.append(f'Behaviour space cache miss ({os.path.basename(cache_path)}), encoded and stored in {round(time.time() - start_time, 2)}s.')
+        
+        self.log_msg.append(f'The execution semantics use the {self.encoder.cardinality_encoding} cardinality encoding.')
+        if args['reachability_pruning']:
+            stats = pruning_stats(self.encoder)
+            self.log_msg.append(f'Reachability pruning fixed {stats["actions"][0]}/{stats["actions"][1]} action and {stats["fluents"][0]}/{stats["fluents"][1]} fluent variables.')
+
+        if self.finite_domain:
+            assert all(z3.is_bool(v) for vars in self.encoder.up_fluent_to_z3.values() for v in vars), 'The finite-domain mode only supports propositional tasks.'
+
+        # The base formula can go through a pipeline of z3 tactics once before the enumeration starts.
+        self.preprocessing = cfg.get('preprocessing', [])
+        assert not (self.preprocessing and self.incremental_horizon), 'The preprocessing needs the whole formula, it cannot be combined with the incremental horizon.'
+        self.preprocessed_goal = preprocess(self.encoder.assertions, self.preprocessing, self._interface_vars(), self.ctx, self.log_msg) if self.preprocessing else None
+
+        # Symmetric plans (i.e., the same plan over interchangeable objects) can be cut off by lex-leader constraints.
+        # The objects' symmetries are only detected once the constraints are first used.
+        self.compilation_result = task
+        self.symmetry_breaking  = cfg.get('symmetry-breaking', 'plan')
+        assert self.symmetry_breaking in symmetry_breaking_modes, f'Unknown symmetry breaking mode {self.symmetry_breaking}, supported modes are {symmetry_breaking_modes}.'
+        if self.symmetry_breaking != 'never' and not self.encodername in symmetry_breaking_encoders:
+            self.log_msg.append(f'Symmetry breaking is disabled, it is only supported by the {symmetry_breaking_encoders} encoders.')
+            self.symmetry_breaking = 'never'
+        self.symmetries = None
+        self.symmetry_assertions = []
+        self._symmetry_breaking_active = False
+
+        # Create the solver.
+        self.solver = self._create_solver()
 
         # Solver state.
         self.solver_push_cnt = 0
 
+        # Race the checks on a pool of differently configured solvers if requested.
+        portfolio = cfg.get('portfolio', 0)
+        self.portfolio = SolverPortfolio(portfolio, self.ctx, self.solver_logic) if portfolio else None
+
+        # Enumerate the behaviours in parallel over disjoint cells of the dimensions' values if requested.
+        partition_workers = cfg.get('partition-workers', 0)
+        self.partition = PartitionedEnumeration(self, partition_workers, cfg.get('partition-dims', None)) if partition_workers else None
+
+        # Blocking constraints state.
+        self._blocking_assumptions = []
+        self._blocking_indicator   = None
+        self._blocking_scopes_cnt  = 0
+
+        # Assertions that should outlive the solver scope they were added in.
+        self._persistent_assertions = []
+        # The literals standing for the non propositional assumptions in the finite-domain mode.
+        self._assumption_literals = {}
+        # The model of the last replay, its solver scope is gone by the time the plan is extracted.
+        self._replayed_model = None
+        if self.incremental_horizon: self._guard_horizon()
+
+    def _create_solver(self):
+        if self.preprocessed_goal is not None:
+            solver = PreprocessedSolver(self.preprocessed_goal, self.ctx, self.solver_logic)
+        else:
+            solver = BehaviourSpaceSolver(self.ctx, self.solver_logic)
+            solver.add(self.encoder.assertions)
+        solver.add(self.symmetry_assertions)
+        return solver
+
+    def _interface_vars(self):
+        # the variables the constraints added after the encoding talk about.
+        interface_vars = [v for vars in self.encoder.up_actions_to_z3.values() for v in vars]
+        interface_vars.extend([v for dim in self.dims.values() for v in dim.behaviour_vars()])
+        if z3.is_const(self.encoder.horizon_var): interface_vars.append(self.encoder.horizon_var)
+        return interface_vars
+
+    def _build_dims(self):
+        dims = [d(self.encoder, additional_information) for d, additional_information in self.dims_cfg]
+        # convert the list to dict with keys as the names of the dimensions.
+        dims = {d.__class__.__name__: d for d in dims}
+        self.decoder = BehaviourDecoder(dims, self.ctx, self.behaviours)
+        return dims
+
+    def _add_persistent(self, assertions):
+        self.solver.add(assertions)
+        if self.solver_push_cnt > 0: self._persistent_assertions.append([self.solver_push_cnt, assertions])
+
+    def _guard_horizon(self):
+        self.horizon_literal = z3.Bool(f'horizon-{self.horizon}', ctx=self.ctx)
+        horizon_assertions = self.encoder.horizon_assertions[self.horizon] + [e for dim in self.dims.values() for e in dim.encodings]
+        self._add_persistent([z3.Implies(self.horizon_literal, e, ctx=self.ctx) for e in horizon_assertions])
+
+    def extend_horizon(self):
+        """!
+        Unrolls the formula for one more step on the existing solver. The constraints of the previous horizon
+        are retired and the dimensions are encoded again for the new horizon, their variables keep the same
+        names so the already found behaviours remain forbidden. Returns False once the upper bound is reached.
+        """
+        if not self.incremental_horizon or self.horizon >= self.upper_bound: return False
+        if self.plan_length_bound is not None and self.horizon >= self.plan_length_bound: return False
+        self._add_persistent([z3.Not(self.horizon_literal, ctx=self.ctx)])
+        self.encoder.horizon_assertions.pop(self.horizon, None)
+        self.horizon += 1
+        step_assertions = self.encoder.extend_n(self.horizon)
+        self.encoder.extend(step_assertions)
+        self._add_persistent(step_assertions)
+        if self.symmetries is not None:
+            symmetry_assertions = self.symmetries.extend()
+            self.symmetry_assertions.extend(symmetry_assertions)
+            self._add_persistent(symmetry_assertions)
+        previous_dims = self.dims
+        self.dims = self._build_dims()
+        for name, dim in self.dims.items():
+            dim.var_domain = previous_dims[name].var_domain
+            dim.logs       = previous_dims[name].logs + dim.logs
+        self._guard_horizon()
+        self.log_msg.append(f'The horizon has been extended to {self.horizon}.')
+        return True
+
+    def propositional_assumptions(self, assumptions):
+        """!
+        The finite-domain solver only takes literals as assumptions, any other assumption is replaced by a literal
+        that implies it. The literals are created once per expression and survive the solver scopes, so only the
+        reused expressions (e.g., the blocking constraints) should go through here, see replay_model.
+        """
+        if not self.finite_domain: return list(assumptions)
+        literals = []
+        for expr in assumptions:
+            if z3.is_const(expr) or (z3.is_not(expr) and z3.is_const(expr.arg(0))):
+                literals.append(expr)
+                continue
+            if not expr.get_id() in self._assumption_literals:
+                # keep the expression alive so its id is not reused.
+                literal = z3.Bool(f'assumption-{len(self._assumption_literals)}', ctx=self.ctx)
+                self._assumption_literals[expr.get_id()] = (expr, literal)
+                self._add_persistent([z3.Implies(literal, expr, ctx=self.ctx)])
+            literals.append(self._assumption_literals[expr.get_id()][1])
+        return literals
+
+    def replay_model(self, model, assumptions=[]):
+        """!
+        Checks the model's values under the assumptions in a scope of its own, so nothing of the one-off model
+        stays on the solver. The replayed model is the one the next extract_plan uses.
+        """
+        # the assumptions' literals are persistent, so they are created before our scope.
+        assumptions = self.propositional_assumptions(list(assumptions))
+        self.solver.push()
+        try:
+            self.solver.add(model)
+            is_sat = self.solver.check(assumptions) == z3.sat
+            self._replayed_model = self.solver.model() if is_sat else None
+        finally:
+            self.solver.pop()
+        return is_sat
+
+    def horizon_assumptions(self):
+        return ([self.horizon_literal] if self.horizon_literal is not None else []) + self.plan_length_assumptions
+
+    def bound_plan_length(self, bound):
+        """!
+        Restricts the following checks to the plans of at most bound steps, and the cost bound dimensions to at most
+        bound, or lifts the restriction when bound is None. This answers a smaller quality bound on a behaviour space
+        that was encoded for a larger one.
+        """
+        self.plan_length_bound = bound
+        self.plan_length_assumptions = []
+        if bound is None: return
+        bound = z3.IntVal(bound, ctx=self.ctx)
+        self.plan_length_assumptions.append(self.encoder.horizon_var <= bound)
+        self.plan_length_assumptions.extend(dim.var <= bound for dim in self.dims.values() if isinstance(dim, CostBoundSMT))
+
+    def use_symmetry_breaking(self, plan_mode):
+        """!
+        Activates the symmetry breaking constraints for the following checks if the configured mode asks for them
+        while enumerating plans (plan_mode) or behaviours. Symmetric plans can have different behaviours, so they
+        are only cut off while enumerating behaviours in the always mode.
+        """
+        self._symmetry_breaking_active = self.symmetry_breaking == 'always' or (plan_mode and self.symmetry_breaking == 'plan')
+        if not self._symmetry_breaking_active or self.symmetries is not None: return
+        detected = ObjectSymmetries(self.compilation_result)
+        self.log_msg.extend(detected.logs())
+        self.symmetries = LexLeaderConstraints(self.encoder, detected.generators)
+        self.symmetry_assertions = self.symmetries.extend()
+        self._add_persistent(self.symmetry_assertions)
+
+    def symmetry_assumptions(self):
+        return [self.symmetries.literal] if self._symmetry_breaking_active and len(self.symmetries.generators) > 0 else []
+
     def __len__(self) -> list:
         return [(name, len(dim)) for name, dim in self.dims.items()]
     
@@ -71,15 +304,65 @@ class BehaviourSpaceSMT:
     def _push(self):
         self.solver_push_cnt += 1
         self.solver.push()
+        # the workers must have the assertions of the outer scope before entering the new one.
+        if self.portfolio is not None: self.portfolio.sync(self.solver.assertions()), self.portfolio.push()
     
     def _pop(self):
         if self.solver_push_cnt > 0:
             self.solver.pop()
             self.solver_push_cnt -= 1
+            if self.portfolio is not None: self.portfolio.pop()
+            # add back the assertions that were meant to outlive the popped scope.
+            for entry in self._persistent_assertions:
+                if entry[0] <= self.solver_push_cnt: continue
+                self.solver.add(entry[1])
+                entry[0] = self.solver_push_cnt
+            self._persistent_assertions = [entry for entry in self._persistent_assertions if entry[0] > 0]
+
+    @property
+    def blocking_assumptions(self):
+        return self._blocking_assumptions
+
+    def open_blocking_scope(self):
+        """!
+        Starts a new set of blocking constraints, which lives until close_blocking_scope is called.
+        """
+        self._blocking_assumptions = []
+        self._blocking_scopes_cnt += 1
+        if self.blocking == 'assert':
+            self._push()
+        elif self.blocking == 'indicator':
+            self._blocking_indicator = z3.Bool(f'blocking-scope-{self._blocking_scopes_cnt}', ctx=self.ctx)
+            self._blocking_assumptions.append(self._blocking_indicator)
+
+    def block(self, expr):
+        """!
+        Adds a blocking constraint to the current scope. Only the assume mode pays for the constraint
+        on every check, the other modes hand it to the solver once.
+        """
+        if self.blocking == 'assume':
+            self._blocking_assumptions.append(expr)
+        elif self.blocking == 'assert':
+            self.solver.add(expr)
+        else:
+            self.solver.add(z3.Implies(self._blocking_indicator, expr))
+
+    def close_blocking_scope(self):
+        if self.blocking == 'assert':
+            self._pop()
+        elif self.blocking == 'indicator' and self._blocking_indicator is not None:
+            # Retire the indicator so its guarded constraints become satisfied for good.
+            self.solver.add(z3.Not(self._blocking_indicator, ctx=self.ctx))
+            self._blocking_indicator = None
+        self._blocking_assumptions = []
 
     def reset(self):
-        self.solver = z3.Solver(ctx=self.encoder.ctx)
-        self.solver.add(self.encoder.assertions)
+        self.solver = self._create_solver()
+        self.solver_push_cnt = 0
+        self._persistent_assertions = []
+        self._assumption_literals = {}
+        if self.incremental_horizon: self._guard_horizon()
+        if self.portfolio is not None: self.portfolio.reset()
         self.log_msg.append('The solver has been reset.')
 
     def extract_plan(self):
@@ -87,13 +370,14 @@ class BehaviourSpaceSMT:
         This function should update the plan with its behaviour and any extra information 
         extracted from the model.
         """
-        model = self.solver.model()
+        model = self._replayed_model if self._replayed_model is not None else self.solver.model()
+        self._replayed_model = None
         # Evaluate the horizon.
         horizon = model.evaluate(self.encoder.horizon_var, model_completion = True).as_long()
         # Extract the plan.
         plan = self.encoder.extract_plan(model, horizon)
         # We need to extract the behaviour from the model.
-        behaviour = self.infer_behaviour(model)
+        behaviour = self.decode_behaviour(model)
         # Update the plan with its behaviour.
         setattr(plan, "behaviour", behaviour)
         # Update its id.
@@ -108,9 +392,7 @@ class BehaviourSpaceSMT:
             return None
         
         # Count the frequency of the behaviour.
-        behaviour_str = str(behaviour)
-        if not behaviour_str in self._behaviour_frequency: self._behaviour_frequency[behaviour_str] = 0
-        self._behaviour_frequency[behaviour_str] += 1
+        self._behaviour_counts[behaviour] += 1
         
         # Append the plan to the list of plans.
         self._plans.append(plan)
@@ -124,25 +406,60 @@ class BehaviourSpaceSMT:
         if memorylimit is not None and not isinstance(self.solver, z3.Optimize):
             self.solver.set('max_memory', memorylimit)
         
+        assumption = self.propositional_assumptions(list(assumption) + self.horizon_assumptions() + self.symmetry_assumptions())
         start_time = time.time()
         is_formula_satisfiable = None
+        self._replayed_model = None
+        self.last_check = z3.unknown
+        self.last_outcome = None
         try:
-            is_formula_satisfiable = self.solver.check(assumption) == z3.sat
+            if self.portfolio is not None:
+                is_formula_satisfiable = self._portfolio_check(assumption, timeout, memorylimit)
+            else:
+                self.last_check = self.solver.check(assumption)
+                is_formula_satisfiable = self.last_check == z3.sat
         except Exception as e:
             is_formula_satisfiable = False
+            self.last_outcome = 'error'
             self.log_msg.append(f'An error occured while checking the satisfiability of the formula: {e}')
         finally:
             end_time = time.time()
+            if self.last_outcome is None: self.last_outcome = self._check_outcome(end_time - start_time, timeout)
+            self.check_outcomes[self.last_outcome] += 1
             time_taken = round(end_time - start_time, 2)
             self.sat_time.append(f'{is_formula_satisfiable}, {time_taken}, {self.compute_behaviour_count()}')
             assert is_formula_satisfiable is not None, 'The satisfiability of the formula is not determined.'
             return is_formula_satisfiable
     
+    def _check_outcome(self, time_taken, timeout):
+        # an unknown answer is a timeout when the solver says so or the check used all of its time.
+        if self.last_check == z3.sat: return 'sat'
+        if self.last_check == z3.unsat: return 'unsat'
+        reason = self.solver.reason_unknown() if self.portfolio is None else ''
+        if 'timeout' in reason or 'canceled' in reason: return 'timeout'
+        if timeout is not None and time_taken * 1000 >= timeout: return 'timeout'
+        return 'unknown'
+
+    def _portfolio_check(self, assumption, timeout, memorylimit):
+        self.portfolio.sync(self.solver.assertions())
+        status, model = self.portfolio.check(list(assumption), timeout, memorylimit)
+        self.last_check = status
+        if status != z3.sat: return False
+        # Replay the winner's model on our solver so the model is available for the plan extraction.
+        return self.replay_model(model, assumption)
+
+    def close(self):
+        if self.portfolio is not None: self.portfolio.close()
+
+    def decode_behaviour(self, model):
+        """!
+        Returns the model's behaviour as the values of the dimensions' variables, see BehaviourDecoder.
+        """
+        return self.decoder.decode(model) if len(self.dims) > 0 else None
+
     def infer_behaviour(self, model):
-        behaviour_vars = []
-        for dimname, dim in self.dims.items():
-            behaviour_vars.append(dim.behaviour_expression(model))
-        return z3.And(list(filter(lambda e: e is not  None, behaviour_vars))) if len(behaviour_vars) > 0 else None
+        behaviour = self.decode_behaviour(model)
+        return behaviour.expression() if behaviour is not None else None
 
     def plan_behaviour(self, plan:SequentialPlan, i=1, return_plan=True):
         """!
@@ -151,17 +468,23 @@ class BehaviourSpaceSMT:
         """
         assert isinstance(plan, SequentialPlan), 'The plan is not of type SequentialPlan.'
         # Get the plan's behaviour before returning its number.
-        satres = self.solver.check(self.encoder.convert(plan)) == z3.sat
+        self._replayed_model = None
+        satres = self.solver.check(self.propositional_assumptions(self.encoder.convert(plan) + self.horizon_assumptions())) == z3.sat
         if not satres:
             self.log_msg.append(f'The behaviour space is not satisfiable after appending plan {i}')
             return None
         # self.log_msg.append(f'Plan {i} has been added to the behaviour space.')
         if return_plan: return self.extract_plan()
         # this is the case when we don't want to return the plan but the behaviour itself.
-        return self.infer_behaviour(self.solver.model())
+        return self.decode_behaviour(self.solver.model())
     
+    @property
+    def _behaviour_frequency(self):
+        # the behaviours are only printed when the statistics are written out.
+        return {str(behaviour): count for behaviour, count in self._behaviour_counts.items()}
+
     def compute_behaviour_count(self):
-        return len(self._behaviour_frequency.keys())
+        return len(self._behaviour_counts)
     
     def compute_dimensions_count(self):
         retdetails = defaultdict(dict)
@@ -170,8 +493,10 @@ class BehaviourSpaceSMT:
         return retdetails
     
     def logs(self):
-        # collect the dimensions' logs.
-        for _, dim in self.dims.items():
-            self.log_msg.extend(dim.logs)
-        return self.log_msg
+        # collect the dimensions' logs, the logs are built on every call so collecting them twice repeats nothing.
+        logs = self.log_msg + [msg for dim in self.dims.values() for msg in dim.logs]
+        if self.portfolio is not None: logs += self.portfolio.logs()
+        if self.partition is not None: logs += self.partition.logs()
+        outcomes = ', '.join(f'{self.check_outcomes[outcome]} {outcome}' for outcome in ['sat', 'unsat', 'timeout', 'unknown', 'error'])
+        return logs + [f'Solver checks: {outcomes}.']
     
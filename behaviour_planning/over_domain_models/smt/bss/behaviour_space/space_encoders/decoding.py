@@ -0,0 +1,95 @@
+import itertools
+
+import z3
+
+# every decoder declares its own tuple sort, the names have to be unique within a context.
+_decoder_ids = itertools.count()
+
+def _flatten(expr):
+    return [expr] if not (z3.is_and(expr) or z3.is_or(expr)) else [arg for child in expr.children() for arg in _flatten(child)]
+
+class Behaviour:
+    """!
+    A behaviour decoded from a model: the values of the dimensions' variables as a tuple of ints/bools. The
+    behaviours are interned in the behaviour space's table, so a behaviour is one shared object identified by
+    its values and id, its expression and printed form are only built when they are asked for.
+    """
+    __slots__ = ('id', 'values', 'decoder', '_expression', '_printed')
+
+    def __init__(self, id, values, decoder) -> None:
+        self.id      = id
+        self.values  = values
+        self.decoder = decoder
+        self._expression = None
+        self._printed    = None
+
+    def expression(self):
+        """!
+        Returns the conjunction of the dimensions' behaviour expressions, i.e., the expression to forbid.
+        """
+        if self._expression is None: self._expression = self.decoder.expression(self.values)
+        return self._expression
+
+    def pretty(self):
+        """!
+        Returns the behaviour as printed with the plans, i.e., the dimensions' predicates joined by ^.
+        """
+        if self._printed is None: self._printed = ' ^ '.join(f'({str(e)})' for e in _flatten(self.expression()))
+        return self._printed
+
+    def __eq__(self, other):
+        return isinstance(other, Behaviour) and self.values == other.values
+
+    def __hash__(self):
+        return hash(self.values)
+
+    def __str__(self):
+        return str(self.expression())
+
+    def __repr__(self):
+        return f'Behaviour{self.values}'
+
+    # a behaviour is immutable and interned, the copies of the plans share it.
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+class BehaviourDecoder:
+    """!
+    Reads the behaviour variables of all the dimensions from a model in one pass. The variables are collected
+    once into a single tuple term, so a model is evaluated once per plan instead of once per variable.
+    """
+    def __init__(self, dims, ctx, table) -> None:
+        self.table  = table
+        self.slices = []
+        behaviour_vars = []
+        for dim in dims.values():
+            dim_vars = dim.behaviour_vars()
+            self.slices.append((dim, len(behaviour_vars), len(behaviour_vars) + len(dim_vars)))
+            behaviour_vars.extend(dim_vars)
+        self.is_bool = [z3.is_bool(v) for v in behaviour_vars]
+        self.term = None
+        if len(behaviour_vars) > 0:
+            _, constructor, _ = z3.TupleSort(f'behaviour-{next(_decoder_ids)}', [v.sort() for v in behaviour_vars], ctx=ctx)
+            self.term = constructor(*behaviour_vars)
+
+    def decode(self, model):
+        """!
+        Returns the interned behaviour of the model and records new values in the dimensions' domains.
+        """
+        values = ()
+        if self.term is not None:
+            decoded = model.evaluate(self.term, model_completion=True)
+            values  = tuple(z3.is_true(v) if is_bool else v.as_long() for v, is_bool in zip(decoded.children(), self.is_bool))
+        behaviour = self.table.get(values, None)
+        if behaviour is not None: return behaviour
+        # the domains only change with a new behaviour.
+        for dim, start, end in self.slices: dim.decode(values[start:end])
+        behaviour = self.table[values] = Behaviour(len(self.table), values, self)
+        return behaviour
+
+    def expression(self, values):
+        expressions = [dim.values_expression(values[start:end]) for dim, start, end in self.slices]
+        return z3.And(list(filter(lambda e: e is not None, expressions)))
@@ -0,0 +1,111 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+import z3
+
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.utilities import to_smt2
+
+# Only the encoders whose state is fully described by their variables maps and goal states can be restored.
+cacheable_encoders = ['seq', 'forall']
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''): digest.update(chunk)
+    return digest.hexdigest()
+
+def _describe_additional_information(additional_information):
+    # file based information (e.g. resources files) is identified by its content rather than its path.
+    if isinstance(additional_information, str) and os.path.isfile(additional_information):
+        return {'file-sha256': file_digest(additional_information)}
+    if isinstance(additional_information, dict):
+        return {k: _describe_additional_information(v) for k, v in sorted(additional_information.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(additional_information, (list, tuple)):
+        return [_describe_additional_information(v) for v in additional_information]
+    return str(additional_information)
+
+def encoding_cache_key(task, encodername, encode_args, dims_cfg):
+    """!
+    Returns the content hash of everything the encoded behaviour space depends on: the grounded task,
+    the encoder and its arguments, the dimensions with their additional information, and z3's version.
+    """
+    key = {
+        'task': str(task),
+        'encoder': encodername,
+        'encode-args': {k: str(v) for k, v in sorted(encode_args.items())},
+        'dims': [[f'{d.__module__}.{d.__name__}', _describe_additional_information(info)] for d, info in dims_cfg],
+        'z3': z3.get_version_string()
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+
+def _symbols(encoder):
+    """!
+    Lists the encoder's symbols in a fixed order with the layout needed to rebuild its maps.
+    """
+    symbols = []
+    layout  = {'actions': [], 'fluents': [], 'goal-predicates': []}
+    for name, vars in encoder.up_actions_to_z3.items():
+        layout['actions'].append([name, len(vars)])
+        symbols.extend(vars)
+    for name, vars in encoder.up_fluent_to_z3.items():
+        layout['fluents'].append([name, len(vars)])
+        symbols.extend(vars)
+    layout['goal-states'] = len(encoder.goal_states)
+    symbols.extend(encoder.goal_states)
+    for idx, vars in encoder.goal_predicates_vars.items():
+        layout['goal-predicates'].append([idx, len(vars)])
+        symbols.extend(vars)
+    symbols.append(encoder.horizon_var)
+    layout['formula-length'] = len(encoder)
+    layout['is-oversubscription'] = encoder.task_is_oversubscription_planning
+    layout['cardinality-encoding'] = encoder.cardinality_encoding
+    return symbols, layout
+
+def store_encoding(path, encoder):
+    """!
+    Stores the encoder's assertions and symbols under path. The directory is written next to its final
+    location and moved in place, so concurrent runs never see a partially written entry.
+    """
+    symbols, layout = _symbols(encoder)
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmpdir = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+    try:
+        with open(os.path.join(tmpdir, 'assertions.smt2'), 'w') as f:
+            f.write(to_smt2(encoder.assertions, encoder.ctx))
+        # symbols are stored as trivial equalities so that non boolean terms can be written as assertions.
+        with open(os.path.join(tmpdir, 'symbols.smt2'), 'w') as f:
+            f.write(to_smt2([s == s for s in symbols], encoder.ctx))
+        with open(os.path.join(tmpdir, 'layout.json'), 'w') as f:
+            json.dump(layout, f)
+        os.rename(tmpdir, path)
+    except OSError:
+        # another run stored the same entry first.
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+def load_encoding(path, encoder):
+    """!
+    Restores the state that encode_n would have built on the encoder from a cached entry.
+    """
+    with open(os.path.join(path, 'layout.json'), 'r') as f:
+        layout = json.load(f)
+    with open(os.path.join(path, 'symbols.smt2'), 'r') as f:
+        symbols = [e.arg(0) for e in z3.parse_smt2_string(f.read(), ctx=encoder.ctx)]
+    with open(os.path.join(path, 'assertions.smt2'), 'r') as f:
+        encoder.assertions = list(z3.parse_smt2_string(f.read(), ctx=encoder.ctx))
+
+    symbols = iter(symbols)
+    _take = lambda n: [next(symbols) for _ in range(n)]
+
+    encoder.up_actions_to_z3 = {name: _take(n) for name, n in layout['actions']}
+    encoder.up_fluent_to_z3  = {name: _take(n) for name, n in layout['fluents']}
+    encoder.goal_states      = _take(layout['goal-states'])
+    encoder.goal_predicates_vars = {idx: _take(n) for idx, n in layout['goal-predicates']}
+    encoder.horizon_var      = _take(1)[0]
+    # len(encoder) reports the encoder's formula_length.
+    encoder.formula_length   = layout['formula-length']
+    encoder.task_is_oversubscription_planning = layout['is-oversubscription']
+    encoder.cardinality_encoding = layout['cardinality-encoding']
@@ -0,0 +1,174 @@
+import time
+import itertools
+import multiprocessing as mp
+from multiprocessing.connection import wait
+
+import z3
+
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.utilities import to_smt2
+
+def _check(solver, timeout, deadline):
+    # every check is cut to the time left before the cell's deadline, None once it has passed.
+    if deadline is not None:
+        time_left = int((deadline - time.time()) * 1000)
+        if time_left <= 0: return None
+        timeout = time_left if timeout is None else min(timeout, time_left)
+    if timeout is not None: solver.set('timeout', timeout)
+    return solver.check()
+
+def _outcome(solver, status):
+    # the same outcomes the behaviour space reports for its own checks.
+    if status is None: return 'timeout'
+    if status == z3.unsat: return 'unsat'
+    reason = solver.reason_unknown()
+    return 'timeout' if 'timeout' in reason or 'canceled' in reason else 'unknown'
+
+def _partition_worker(conn, formula, key_symbols, behaviour_cnt, timeout, memorylimit, logic):
+    """!
+    Enumerates the behaviours of the cells it is handed, in its own context. Every found behaviour is
+    sent back as the values of the key symbols (the behaviour variables followed by the action variables)
+    and blocked before the next check, a cell is done once it has no unseen behaviour left or its
+    deadline has passed.
+    """
+    ctx = z3.Context()
+    solver = z3.SolverFor(logic, ctx=ctx) if logic is not None else z3.Solver(ctx=ctx)
+    solver.add(z3.parse_smt2_string(formula, ctx=ctx))
+    # the symbols are shipped as trivial equalities, see to_smt2.
+    key_symbols = [e.arg(0) for e in z3.parse_smt2_string(key_symbols, ctx=ctx)]
+    behaviour_vars = key_symbols[:behaviour_cnt]
+    if memorylimit is not None: solver.set('max_memory', memorylimit)
+    while True:
+        try:
+            cmd, payload = conn.recv()
+        except EOFError:
+            break
+        if cmd == 'stop': break
+        cell_id, cell, deadline = payload
+        solver.push()
+        solver.add(z3.parse_smt2_string(cell, ctx=ctx))
+        status = _check(solver, timeout, deadline)
+        while status == z3.sat:
+            model = solver.model()
+            values = [model.eval(s, model_completion=True) for s in key_symbols]
+            conn.send(('model', cell_id, to_smt2([s == v for s, v in zip(key_symbols, values)], ctx)))
+            if conn.poll() and conn.recv()[0] == 'stop': return
+            # without behaviour variables every plan is its own behaviour.
+            blocked = zip(behaviour_vars, values[:behaviour_cnt]) if behaviour_cnt > 0 else zip(key_symbols, values)
+            solver.add(z3.Not(z3.And([s == v for s, v in blocked]), ctx=ctx))
+            status = _check(solver, timeout, deadline)
+        outcome = _outcome(solver, status)
+        solver.pop()
+        conn.send(('done', cell_id, outcome))
+
+class PartitionedEnumeration:
+    """!
+    Splits the behaviour space into disjoint cells using the values of some of its dimensions and enumerates
+    every cell in its own worker process. The workers only send back the values of the behaviour and action
+    variables, the main solver replays them to extract the plans, so the behaviours and plans are the same
+    objects the sequential loop would build.
+    """
+    def __init__(self, bspace, workers, dims=None) -> None:
+        assert workers > 0, 'The number of partition workers should be positive.'
+        self.bspace  = bspace
+        self.workers = workers
+        # a dimension is given either by its name or by its name and its cell size (e.g. the ordering prefix).
+        self.partition_dims = [d if isinstance(d, (list, tuple)) else [d, None] for d in dims] if dims is not None else None
+        self.log_msg = []
+        # how the last enumeration ended: sat when it found the required plans, unsat when every cell is
+        # exhausted, otherwise the timeout/unknown/error outcome of the cells that did not finish.
+        self.last_outcome = None
+
+    def cells(self):
+        """!
+        Returns the cartesian product of the partitioned dimensions' cells, followed by the cell that
+        covers the values none of them mention.
+        """
+        encoder = self.bspace.encoder
+        if self.partition_dims is not None:
+            for name, _ in self.partition_dims: assert name in self.bspace.dims, f'Unknown partition dimension {name}.'
+            dims_cells = [self.bspace.dims[name].partition_cells(encoder, size) for name, size in self.partition_dims]
+        else:
+            # default to the first dimension that can be partitioned.
+            dims_cells = [next(filter(len, (d.partition_cells(encoder) for d in self.bspace.dims.values())), [])]
+        dims_cells = [cells for cells in dims_cells if len(cells) > 0]
+        if len(dims_cells) == 0: return [z3.BoolVal(True, ctx=self.bspace.ctx)]
+        cells = [z3.And(list(cell)) for cell in itertools.product(*dims_cells)]
+        return cells + [z3.Not(z3.Or(cells), ctx=self.bspace.ctx)]
+
+    def enumerate(self, assumptions, required, timeout=None, memorylimit=None, deadline=None):
+        """!
+        Yields the plans of the unseen behaviours under the given assumptions (i.e., the blocking
+        constraints) until required plans are found, every cell has reported or the deadline (time.time())
+        passes. The cells that did not end unsat are kept in last_outcome.
+        """
+        bspace = self.bspace
+        behaviour_vars = [v for dim in bspace.dims.values() for v in dim.behaviour_vars()]
+        action_vars = [v for vars in bspace.encoder.up_actions_to_z3.values() for v in vars]
+        assumptions = list(assumptions) + bspace.horizon_assumptions() + bspace.symmetry_assumptions()
+        formula = to_smt2(list(bspace.solver.assertions()) + assumptions, bspace.ctx)
+        key_symbols = to_smt2([s == s for s in behaviour_vars + action_vars], bspace.ctx)
+        pending = [(cell_id, to_smt2([cell], bspace.ctx), deadline) for cell_id, cell in enumerate(self.cells())]
+        self.log_msg.append(f'Partitioned the behaviour space into {len(pending)} cells over {self.workers} workers.')
+
+        mpctx = mp.get_context('spawn')
+        workers = {}
+        for _ in range(min(self.workers, len(pending))):
+            parent_conn, child_conn = mpctx.Pipe()
+            process = mpctx.Process(target=_partition_worker, args=(child_conn, formula, key_symbols, len(behaviour_vars), timeout, memorylimit, bspace.solver_logic), daemon=True)
+            process.start()
+            workers[parent_conn] = process
+            parent_conn.send(('cell', pending.pop(0)))
+
+        found = 0
+        seen_behaviours = set()
+        unfinished = []
+        self.last_outcome = None
+        try:
+            busy = set(workers.keys())
+            while len(busy) > 0 and found < required:
+                if deadline is not None and time.time() >= deadline:
+                    self.log_msg.append(f'The partitioned enumeration stopped at its deadline with {len(busy) + len(pending)} cells left.')
+                    self.last_outcome = 'timeout'
+                    break
+                for conn in wait(list(busy), None if deadline is None else max(0, deadline - time.time())):
+                    try:
+                        msg, cell_id, payload = conn.recv()
+                    except EOFError:
+                        busy.discard(conn)
+                        unfinished.append('error')
+                        self.log_msg.append('A partition worker exited unexpectedly.')
+                        continue
+                    if msg == 'done':
+                        if payload != 'unsat':
+                            unfinished.append(payload)
+                            self.log_msg.append(f'Cell {cell_id} stopped with {payload}.')
+                        if len(pending) > 0: conn.send(('cell', pending.pop(0)))
+                        else: busy.discard(conn)
+                        continue
+                    # replay the worker's model on the main solver to extract the plan.
+                    model = list(z3.parse_smt2_string(payload, ctx=bspace.ctx))
+                    if not bspace.replay_model(model, assumptions):
+                        self.log_msg.append(f'Could not replay a model of cell {cell_id}.')
+                        continue
+                    plan = bspace.extract_plan()
+                    if plan is None or plan.behaviour in seen_behaviours: continue
+                    seen_behaviours.add(plan.behaviour)
+                    found += 1
+                    yield plan
+                    if found >= required: break
+            if self.last_outcome is None:
+                if found >= required: self.last_outcome = 'sat'
+                elif len(unfinished) == 0 and len(pending) == 0: self.last_outcome = 'unsat'
+                else: self.last_outcome = 'timeout' if 'timeout' in unfinished else (unfinished + ['error'])[0]
+        finally:
+            for conn, process in workers.items():
+                try:
+                    conn.send(('stop', None))
+                except (BrokenPipeError, OSError):
+                    pass
+            for conn, process in workers.items():
+                process.join(1)
+                if process.is_alive(): process.terminate()
+
+    def logs(self):
+        return self.log_msg
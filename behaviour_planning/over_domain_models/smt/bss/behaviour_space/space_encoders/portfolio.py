@@ -0,0 +1,171 @@
+import threading
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from collections import Counter
+
+import z3
+
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.utilities import to_smt2, uninterpreted_constants
+
+# The solver configurations the portfolio draws from when only the number of workers is given.
+default_portfolio_configs = [
+    {'name': 'default',       'params': {}},
+    {'name': 'seed-1',        'params': {'smt.random_seed': 1, 'sat.random_seed': 1}},
+    {'name': 'arith-simplex', 'params': {'smt.arith.solver': 2, 'smt.random_seed': 2}},
+    {'name': 'restart-luby',  'params': {'smt.restart_strategy': 1, 'smt.random_seed': 3}},
+    {'name': 'phase-random',  'params': {'smt.phase_selection': 5, 'smt.random_seed': 4}},
+    {'name': 'no-relevancy',  'params': {'smt.relevancy': 0, 'smt.random_seed': 5}},
+]
+
+def _portfolio_worker(conn, params, logic):
+    """!
+    Keeps a copy of the behaviour space formula in its own process and answers the check requests
+    sent by the portfolio. The check runs in a thread so that a cancel request can interrupt it.
+    """
+    for name, value in params.items(): z3.set_param(name, value)
+    ctx = z3.Context()
+    solver = z3.SolverFor(logic, ctx=ctx) if logic is not None else z3.Solver(ctx=ctx)
+    # only the formula's constants are sent back, not the auxiliary ones the solver introduces.
+    declared = set()
+    while True:
+        try:
+            cmd, payload = conn.recv()
+        except EOFError:
+            # the main process is gone.
+            break
+        if cmd == 'stop': break
+        # each payload is parsed on its own, constants with the same name and sort are shared.
+        elif cmd == 'add':
+            assertions = z3.parse_smt2_string(payload, ctx=ctx)
+            declared.update(c.decl().name() for c in uninterpreted_constants(assertions).values())
+            solver.add(assertions)
+        elif cmd == 'push': solver.push()
+        elif cmd == 'pop': solver.pop()
+        elif cmd == 'reset': solver.reset(), declared.clear()
+        elif cmd == 'check':
+            assumptions_str, timeout, memorylimit = payload
+            assumptions = list(z3.parse_smt2_string(assumptions_str, ctx=ctx)) if assumptions_str else []
+            if timeout is not None: solver.set('timeout', timeout)
+            if memorylimit is not None: solver.set('max_memory', memorylimit)
+            result = {}
+            def _check():
+                try:
+                    result['status'] = solver.check(assumptions)
+                except z3.Z3Exception as e:
+                    result['status'] = z3.unknown
+                    result['error'] = str(e)
+            checker = threading.Thread(target=_check)
+            checker.start()
+            cancelled = False
+            while checker.is_alive():
+                if not cancelled and conn.poll(0.01) and conn.recv()[0] == 'cancel':
+                    cancelled = True
+                    ctx.interrupt()
+                checker.join(0.01)
+            # a cancelled worker lost the race, nobody needs its model.
+            model_str = None
+            if result['status'] == z3.sat and not cancelled:
+                model = solver.model()
+                model_str = to_smt2([d() == model[d] for d in model.decls() if d.arity() == 0 and d.name() in declared], ctx)
+            conn.send((str(result['status']), model_str, result.get('error', None)))
+        # a 'cancel' that arrives after the check has finished is simply dropped.
+
+class SolverPortfolio:
+    """!
+    Races several differently configured z3 solvers, each in its own process, on the same formula.
+    The workers keep their formula between checks and only receive the new assertions, so the main
+    solver stays the reference copy: the winning model is replayed on it (as assumptions) so the plan
+    and behaviour extraction keep working on the main solver's model.
+    """
+    def __init__(self, cfg, ctx, logic=None) -> None:
+        if isinstance(cfg, int):
+            assert 0 < cfg <= len(default_portfolio_configs), f'The portfolio size should be between 1 and {len(default_portfolio_configs)}.'
+            cfg = default_portfolio_configs[:cfg]
+        assert isinstance(cfg, list) and len(cfg) > 0, 'The portfolio should be a number of workers or a list of solver configurations.'
+        self.configs = [{'name': c.get('name', f'worker-{i}'), 'params': c.get('params', {}), 'logic': c.get('logic', logic)} for i, c in enumerate(cfg)]
+        self.ctx = ctx
+        self.workers = []
+        self.shipped_cnt = 0
+        self.shipped_stack = []
+        self.wins = Counter()
+        self.errors = []
+
+    def _start(self):
+        mpctx = mp.get_context('spawn')
+        for config in self.configs:
+            parent_conn, child_conn = mpctx.Pipe()
+            process = mpctx.Process(target=_portfolio_worker, args=(child_conn, config['params'], config['logic']), daemon=True)
+            process.start()
+            self.workers.append((config['name'], process, parent_conn))
+
+    def _send(self, cmd, payload=None):
+        for _, _, conn in self.workers: conn.send((cmd, payload))
+
+    def sync(self, assertions):
+        """!
+        Ships the assertions added to the main solver since the last sync.
+        """
+        if len(self.workers) == 0: self._start()
+        assertions = list(assertions)
+        assert len(assertions) >= self.shipped_cnt, 'The portfolio is out of sync with the main solver.'
+        if len(assertions) == self.shipped_cnt: return
+        self._send('add', to_smt2(assertions[self.shipped_cnt:], self.ctx))
+        self.shipped_cnt = len(assertions)
+
+    def push(self):
+        self._send('push')
+        self.shipped_stack.append(self.shipped_cnt)
+
+    def pop(self):
+        self._send('pop')
+        self.shipped_cnt = self.shipped_stack.pop()
+
+    def reset(self):
+        if len(self.workers) == 0: return
+        self._send('reset')
+        self.shipped_cnt = 0
+        self.shipped_stack = []
+
+    def check(self, assumptions, timeout=None, memorylimit=None):
+        """!
+        Returns the status of the first worker that answers sat/unsat (or unknown when all of them
+        give up) together with the model of the winner as a list of equalities over the main context.
+        """
+        assumptions_str = to_smt2(assumptions, self.ctx) if len(assumptions) > 0 else ''
+        self._send('check', (assumptions_str, timeout, memorylimit))
+        pending = {conn: name for name, _, conn in self.workers}
+        winner = None
+        while len(pending) > 0 and winner is None:
+            for conn in wait(list(pending.keys())):
+                status, model_str, error = conn.recv()
+                name = pending.pop(conn)
+                if error is not None: self.errors.append(f'{name}: {error}')
+                if status in ['sat', 'unsat']:
+                    winner = (name, status, model_str)
+                    break
+        # stop the rest of the workers and drain their answers.
+        for conn in pending: conn.send(('cancel', None))
+        for conn in pending: conn.recv()
+        if winner is None: return z3.unknown, None
+        name, status, model_str = winner
+        self.wins[name] += 1
+        if status == 'unsat': return z3.unsat, None
+        return z3.sat, list(z3.parse_smt2_string(model_str, ctx=self.ctx))
+
+    def close(self):
+        for _, process, conn in self.workers:
+            try:
+                conn.send(('stop', None))
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(1)
+            if process.is_alive(): process.terminate()
+        # the workers are started again on the next sync and receive the whole formula.
+        self.workers = []
+        self.shipped_cnt = 0
+        self.shipped_stack = []
+
+    def logs(self):
+        logs = [f'Portfolio wins: {", ".join(f"{name}={cnt}" for name, cnt in self.wins.most_common())}']
+        logs.extend([f'Portfolio worker error: {e}' for e in self.errors])
+        return logs
@@ -0,0 +1,36 @@
+import time
+
+import z3
+
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders.utilities import formula_size, uninterpreted_constants
+
+def _constants(exprs):
+    return set(uninterpreted_constants(exprs).keys())
+
+def preprocess(assertions, pipeline, interface_vars, ctx, log_msg):
+    """!
+    Runs the pipeline's tactics one after the other on the formula and returns the resulting goal. The solver
+    keeps receiving constraints over the interface variables (blocked behaviours and plans), so a step that
+    eliminates any of them is undone, otherwise these constraints would no longer reach the formula.
+    """
+    supported_tactics = z3.tactics(ctx)
+    for step in pipeline: assert step in supported_tactics, f'Unknown preprocessing tactic {step}.'
+
+    goal = z3.Goal(ctx=ctx)
+    goal.add(assertions)
+    interface_ids = _constants(interface_vars) & _constants(assertions)
+    size_before = formula_size(assertions, ctx)
+    start_time = time.time()
+    for step in pipeline:
+        result = z3.Tactic(step, ctx)(goal)
+        if len(result) != 1:
+            log_msg.append(f'Preprocessing tactic {step} is skipped, it split the formula into {len(result)} goals.')
+            continue
+        eliminated = interface_ids - _constants([result[0].as_expr()])
+        if len(eliminated) > 0 and not result[0].inconsistent():
+            log_msg.append(f'Preprocessing tactic {step} is skipped, it eliminated {len(eliminated)} behaviour/action variables.')
+            continue
+        goal = result[0]
+    time_taken = round(time.time() - start_time, 2)
+    log_msg.append(f'Preprocessing ({", ".join(pipeline)}) reduced the formula from {size_before} to {formula_size([goal.as_expr()], ctx)} expressions in {time_taken}s.')
+    return goal
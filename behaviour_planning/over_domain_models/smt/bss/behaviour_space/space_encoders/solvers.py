@@ -0,0 +1,45 @@
+import z3
+
+class BehaviourSpaceSolver(z3.Solver):
+    """!
+    A z3 solver for the given logic, or z3's default solver when no logic is given. The finite-domain
+    solver reports its internal clauses from assertions() (with auxiliary variables, and changing after
+    every check), so the assertions are also recorded as they were added for the portfolio and the
+    partition workers which receive the formula.
+    """
+    def __init__(self, ctx, logic=None) -> None:
+        if logic is None: super().__init__(ctx=ctx)
+        else: super().__init__(z3.Z3_mk_solver_for_logic(ctx.ref(), z3.to_symbol(logic, ctx)), ctx=ctx)
+        self.recorded = z3.Solver(ctx=ctx) if logic is not None else None
+
+    def assert_exprs(self, *args):
+        if self.recorded is not None: self.recorded.assert_exprs(*args)
+        super().assert_exprs(*args)
+
+    def push(self):
+        if self.recorded is not None: self.recorded.push()
+        super().push()
+
+    def pop(self, num=1):
+        if self.recorded is not None: self.recorded.pop(num)
+        super().pop(num)
+
+    def reset(self):
+        if self.recorded is not None: self.recorded.reset()
+        super().reset()
+
+    def assertions(self):
+        return self.recorded.assertions() if self.recorded is not None else super().assertions()
+
+class PreprocessedSolver(BehaviourSpaceSolver):
+    """!
+    A solver over the preprocessed formula whose models are converted back to the original formula,
+    so the eliminated variables are still assigned when the plans and behaviours are extracted.
+    """
+    def __init__(self, goal, ctx, logic=None) -> None:
+        super().__init__(ctx, logic)
+        self.goal = goal
+        self.add(goal.as_expr())
+
+    def model(self):
+        return self.goal.convert_model(super().model())
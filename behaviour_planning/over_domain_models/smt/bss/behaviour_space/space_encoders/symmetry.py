@@ -0,0 +1,128 @@
+import time
+from collections import defaultdict
+
+import z3
+
+from unified_planning.plans import ActionInstance
+from unified_planning.model.metrics import MinimizeSequentialPlanLength, MinimizeActionCosts, Oversubscription
+
+# When the symmetry breaking constraints are active: never, only while enumerating plans, or always.
+symmetry_breaking_modes = ['never', 'plan', 'always']
+
+# The encoders with one boolean variable per grounded action and step.
+symmetry_breaking_encoders = ['seq', 'forall', 'r2e']
+
+def _action_signature(action, substitution):
+    preconditions = sorted(str(p.substitute(substitution)) for p in action.preconditions)
+    effects = sorted(str((e.kind, e.fluent.substitute(substitution), e.value.substitute(substitution), e.condition.substitute(substitution))) for e in action.effects)
+    return preconditions, effects
+
+class ObjectSymmetries:
+    """!
+    Detects the interchangeable objects of the grounded task, i.e., objects of the same type whose swap maps the
+    initial state, the goals, the quality metrics and the grounded actions onto themselves. Swapping two
+    interchangeable objects maps every plan to another plan, so the classes of interchangeable objects give the
+    symmetry generators (the swaps of consecutive objects of a class) as permutations of the grounded actions.
+    """
+    def __init__(self, compilation_result) -> None:
+        self.problem = compilation_result.problem
+        self.em = self.problem.environment.expression_manager
+        self.log_msg = []
+        self.generators = []
+        self.classes = []
+
+        start_time = time.time()
+        if not all(isinstance(m, (MinimizeSequentialPlanLength, MinimizeActionCosts, Oversubscription)) for m in self.problem.quality_metrics):
+            self.log_msg.append('Symmetry detection is skipped, the task has an unsupported quality metric.')
+            return
+
+        # the grounded actions are identified by their lifted action and its parameters.
+        self.lifted = {}
+        for action in self.problem.actions:
+            lifted_action = compilation_result.map_back_action_instance(ActionInstance(action))
+            self.lifted[action.name] = (lifted_action.action.name, tuple(p.object() for p in lifted_action.actual_parameters))
+        self.grounded   = {lifted: name for name, lifted in self.lifted.items()}
+        self.actions    = {a.name: a for a in self.problem.actions}
+        self.signatures = {a.name: _action_signature(a, {}) for a in self.problem.actions}
+        self.initial_values = {str(f): str(v) for f, v in self.problem.initial_values.items()}
+        self.goals = sorted(str(g) for g in self.problem.goals)
+
+        # swaps of objects are transitive, so it is enough to compare every object with one object per class.
+        classes_per_type = defaultdict(list)
+        for obj in self.problem.all_objects:
+            for cls in classes_per_type[obj.type]:
+                if self._is_symmetry(cls[0], obj) is not None:
+                    cls.append(obj)
+                    break
+            else:
+                classes_per_type[obj.type].append([obj])
+        self.classes = [cls for classes in classes_per_type.values() for cls in classes if len(cls) > 1]
+        self.generators = [self._is_symmetry(a, b) for cls in self.classes for a, b in zip(cls, cls[1:])]
+        self.log_msg.append(f'Symmetry detection found {len(self.generators)} generators over {len(self.classes)} classes of interchangeable objects in {round(time.time() - start_time, 2)}s.')
+
+    def _is_symmetry(self, a, b):
+        """!
+        Returns the permutation of the grounded actions induced by swapping a and b, or None when the swap
+        is not a symmetry of the task.
+        """
+        substitution = {self.em.ObjectExp(a): self.em.ObjectExp(b), self.em.ObjectExp(b): self.em.ObjectExp(a)}
+        swap = lambda o: b if o == a else a if o == b else o
+        for f, v in self.problem.initial_values.items():
+            if self.initial_values.get(str(f.substitute(substitution))) != str(v.substitute(substitution)): return None
+        if sorted(str(g.substitute(substitution)) for g in self.problem.goals) != self.goals: return None
+        for metric in self.problem.quality_metrics:
+            if isinstance(metric, Oversubscription):
+                utilities = {str(g): str(u) for g, u in metric.goals.items()}
+                if any(utilities.get(str(g.substitute(substitution))) != str(u) for g, u in metric.goals.items()): return None
+        permutation = {}
+        for name, (lifted_name, parameters) in self.lifted.items():
+            image = self.grounded.get((lifted_name, tuple(map(swap, parameters))), None)
+            if image is None or _action_signature(self.actions[name], substitution) != self.signatures[image]: return None
+            permutation[name] = image
+        for metric in self.problem.quality_metrics:
+            if isinstance(metric, MinimizeActionCosts):
+                if any(str(metric.get_action_cost(self.actions[name])) != str(metric.get_action_cost(self.actions[image])) for name, image in permutation.items()): return None
+        return permutation
+
+    def logs(self):
+        return self.log_msg
+
+class LexLeaderConstraints:
+    """!
+    Lex-leader symmetry breaking over the action variables ordered by step then by action: a solution is kept
+    only if it is not greater than its image under every generator. The constraints are guarded by a literal,
+    so they only apply while it is assumed, and they are extended step by step with the formula.
+    """
+    def __init__(self, encoder, generators) -> None:
+        self.encoder    = encoder
+        self.generators = generators
+        self.literal    = z3.Bool('symmetry-breaking', ctx=encoder.ctx)
+        self.encoded_steps = 0
+        # per generator, the variable stating that the compared pairs so far are equal.
+        self.prefix_equal  = [z3.BoolVal(True, ctx=encoder.ctx) for _ in generators]
+        self.pairs_cnt     = [0 for _ in generators]
+
+    def extend(self):
+        """!
+        Returns the constraints of the steps that were unrolled since the last call.
+        """
+        ctx = self.encoder.ctx
+        actions = sorted(self.encoder.up_actions_to_z3.keys())
+        order   = {name: idx for idx, name in enumerate(actions)}
+        steps   = min(map(len, self.encoder.up_actions_to_z3.values()), default=0)
+        constraints = []
+        for g, permutation in enumerate(self.generators):
+            # every swapped pair is compared once, at the position of its first variable.
+            pairs = [(name, image) for name, image in permutation.items() if order[name] < order[image]]
+            pairs.sort(key=lambda pair: order[pair[0]])
+            for t in range(self.encoded_steps, steps):
+                for name, image in pairs:
+                    x = self.encoder.up_actions_to_z3[name][t]
+                    y = self.encoder.up_actions_to_z3[image][t]
+                    constraints.append(z3.Implies(z3.And(self.literal, self.prefix_equal[g]), z3.Implies(x, y)))
+                    prefix_equal = z3.Bool(f'symmetry-{g}-equal-{self.pairs_cnt[g]}', ctx=ctx)
+                    constraints.append(prefix_equal == z3.And(self.prefix_equal[g], x == y))
+                    self.prefix_equal[g] = prefix_equal
+                    self.pairs_cnt[g] += 1
+        self.encoded_steps = steps
+        return constraints
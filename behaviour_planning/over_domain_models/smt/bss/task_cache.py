@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import tempfile
+import dataclasses
+from functools import partial
+
+import unified_planning as up
+from unified_planning.io import PDDLReader
+from unified_planning.plans import ActionInstance, SequentialPlan
+from unified_planning.shortcuts import Compiler
+from unified_planning.engines import PlanGenerationResultStatus
+
+from behaviour_planning.over_domain_models.smt.bss.behaviour_space.space_encoders.encoding_cache import file_digest
+
+def _rebind_action_instance(task, map_back, action_instance):
+    # the cached map-back lifts to the cached copy of the task, the lifted action is rebuilt on the caller's task.
+    lifted = map_back(action_instance)
+    if lifted is None: return None
+    em = task.environment.expression_manager
+    parameters = [em.ObjectExp(task.object(p.object().name)) if p.is_object_exp() else em.auto_promote(p.constant_value())[0] for p in lifted.actual_parameters]
+    return ActionInstance(task.action(lifted.action.name), parameters)
+
+def _map_back_plan(map_back, plan):
+    # the plan_back_conversion UP derives from the map-back, see CompilerResult.
+    return plan.replace_action_instances(map_back)
+
+class TaskCache:
+    """!
+    On-disk cache of the parsed and compiled (e.g. grounded) planning tasks. The entries are keyed by the content of
+    the PDDL files or of the task, and by the compilation list, so a renamed or moved file still hits. A compiled
+    entry is the whole CompilerResult, i.e., the problem and its map-back function. The entries are pickled with
+    their unified_planning environment, the same way the Parallel engine copies problems, and every load returns
+    a fresh copy the caller can modify; the map-back of a loaded entry lifts the plans to the caller's task.
+
+    The seed plans are cached per task and planner configuration, with their status, and the optimal plan length
+    per task when the planner proved it.
+
+    The cache is evicted after every store: the entries older than max_age_days go first, then the least recently
+    used ones until the cache fits in max_size_mb.
+    """
+    def __init__(self, cachedir, max_size_mb=10240, max_age_days=30) -> None:
+        self.cachedir     = cachedir
+        self.max_size     = None if max_size_mb  is None else max_size_mb * (1 << 20)
+        self.max_age      = None if max_age_days is None else max_age_days * 24 * 3600
+        self.log_msg      = []
+        os.makedirs(self.cachedir, exist_ok=True)
+
+    def _key(self, kind, content):
+        key = {'kind': kind, 'content': content, 'unified-planning': up.__version__}
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _task_digest(self, task):
+        return hashlib.sha256(str(task).encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cachedir, f'{key}.pkl')
+
+    def _load(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # a corrupted entry or one written by incompatible versions is dropped and computed again.
+            self._remove(path)
+            return None
+        # the modification time marks the last use for the eviction.
+        os.utime(path, None)
+        return value
+
+    def _store(self, key, value):
+        """!
+        Writes the entry next to its final location and moves it in place, so concurrent runs never see a
+        partially written entry.
+        """
+        fd, tmppath = tempfile.mkstemp(dir=self.cachedir, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmppath, self._path(key))
+        except Exception as e:
+            # unpicklable tasks are simply not cached.
+            self._remove(tmppath)
+            self.log_msg.append(f'Task cache could not store {key}: {e}')
+            return
+        self.evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        """!
+        Removes the entries older than the maximum age, then the least recently used ones above the maximum size.
+        """
+        entries = []
+        for name in os.listdir(self.cachedir):
+            if not name.endswith('.pkl'): continue
+            try:
+                stat = os.stat(os.path.join(self.cachedir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, os.path.join(self.cachedir, name)))
+        entries.sort()
+        now = time.time()
+        if self.max_age is not None:
+            for mtime, _, path in filter(lambda e: now - e[0] > self.max_age, entries): self._remove(path)
+            entries = list(filter(lambda e: now - e[0] <= self.max_age, entries))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.max_size is None or total <= self.max_size: break
+            self._remove(path)
+            total -= size
+
+    def parse(self, domainfile, problemfile):
+        """!
+        Returns the task parsed from the PDDL files.
+        """
+        key  = self._key('parse', [file_digest(domainfile), file_digest(problemfile)])
+        task = self._load(key)
+        if task is not None: return task
+        task = PDDLReader().parse_problem(domainfile, problemfile)
+        self._store(key, task)
+        return task
+
+    def compile(self, task, compilationlist):
+        """!
+        Returns the CompilerResult of running the compilation list on the task.
+        """
+        names = [name for name, _ in compilationlist]
+        compilationkinds = [kind for _, kind in compilationlist]
+        key    = self._key('compile', [self._task_digest(task), list(map(str, names)), list(map(str, compilationkinds))])
+        result = self._load(key)
+        if result is not None:
+            self.log_msg.append(f'Task cache hit ({key}).')
+            map_back = partial(_rebind_action_instance, task, result.map_back_action_instance)
+            return dataclasses.replace(result, map_back_action_instance=map_back, plan_back_conversion=partial(_map_back_plan, map_back))
+        start_time = time.time()
+        with Compiler(names=names, compilation_kinds=compilationkinds) as compiler:
+            result = compiler.compile(task)
+        self._store(key, result)
+        self.log_msg.append(f'Task cache miss ({key}), compiled in {round(time.time() - start_time, 2)}s.')
+        return result
+
+    def seed_plan(self, task, planner_cfg, solve):
+        """!
+        Returns the seed plan of the task, its status and the key of its cache entry (None when it was solved now).
+
+        @param planner_cfg: the planner's name and parameters, part of the key.
+        @param solve: called on a miss with the task, returns the plan (or None) and the planner's status. Only the
+                      definite outcomes (a plan or a proof of unsolvability) are stored, not the timeouts/errors.
+        """
+        key   = self._key('seed-plan', [self._task_digest(task), {k: str(v) for k, v in sorted(planner_cfg.items())}])
+        entry = self._load(key)
+        if entry is not None:
+            self.log_msg.append(f'Seed plan cache hit ({key}), status {entry["status"]}.')
+            plan = None if entry['plan'] is None else SequentialPlan([ActionInstance(task.action(name), [task.object(o) for o in parameters]) for name, parameters in entry['plan']])
+            return plan, PlanGenerationResultStatus[entry['status']], key
+        start_time = time.time()
+        plan, status = solve(task)
+        if plan is not None or status == PlanGenerationResultStatus.UNSOLVABLE_PROVEN:
+            # the plan is stored by the names of its actions and objects.
+            actions = None if plan is None else [[a.action.name, [str(p.object().name) for p in a.actual_parameters]] for a in plan.actions]
+            self._store(key, {'plan': actions, 'length': None if plan is None else len(plan.actions), 'status': status.name})
+        if plan is not None and status == PlanGenerationResultStatus.SOLVED_OPTIMALLY:
+            self._store(self._key('optimal-plan-length', self._task_digest(task)), len(plan.actions))
+        self.log_msg.append(f'Seed plan cache miss ({key}), solved in {round(time.time() - start_time, 2)}s with status {status.name}.')
+        return plan, status, None
+
+    def optimal_plan_length(self, task):
+        """!
+        Returns the optimal plan length of the task proven by any cached seed plan, or None.
+        """
+        return self._load(self._key('optimal-plan-length', self._task_digest(task)))
+
+    def remove(self, key):
+        """!
+        Drops an entry, e.g. a seed plan that is not valid for the encoding.
+        """
+        self._remove(self._path(key))
+
+def task_cache(cfg):
+    """!
+    Returns the task cache configured by task-cache-dir, task-cache-max-size-mb and task-cache-max-age-days, or
+    None when no directory is given.
+    """
+    if cfg.get('task-cache-dir', None) is None: return None
+    return TaskCache(cfg['task-cache-dir'], cfg.get('task-cache-max-size-mb', 10240), cfg.get('task-cache-max-age-days', 30))
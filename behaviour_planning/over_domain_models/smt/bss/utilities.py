@@ -47,7 +47,7 @@ def compute_behaviour_space_statistics_smt(_diverseplans, _bspace):
                 else:
                     retstats['dims-domains'][_dim.name][key] = value
         elif isinstance(_dim.var_domain, set):
-            retstats['dims-domains'][_dim.name] = list(_dim.var_domain)
+            retstats['dims-domains'][_dim.name] = _dim.printable_domain()
         else:
             retstats['dims-domains'][_dim.name] = list(_dim.var_domain)
         
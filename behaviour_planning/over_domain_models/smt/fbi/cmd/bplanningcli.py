@@ -2,9 +2,6 @@ import sys
 import json
 import os
 
-from unified_planning.io import PDDLReader
-
-from behaviour_planning.over_domain_models.smt.fbi.planner.planner import ForbidBehaviourIterativeSMT
 from .argparser import create_parser
 from .utilities import process_args
 
@@ -19,6 +16,10 @@ def main(args=None):
     parser = create_parser()
     args = parser.parse_args(args)
     bspace_cfg, planner_cfg = process_args(args)
+
+    # the planner (unified_planning, z3, pypmt) is only imported once the arguments are parsed, so --help stays fast.
+    from unified_planning.io import PDDLReader
+    from behaviour_planning.over_domain_models.smt.fbi.planner.planner import ForbidBehaviourIterativeSMT
     
     # Read the planning task.
     task = PDDLReader().parse_problem(args.domain, args.problem)
@@ -0,0 +1,33 @@
+import time
+
+class TimeBudget:
+    """!
+    Splits a wall-clock budget between the behaviour discovery and the plan filling of the FBI loop. The
+    behaviour discovery stops at its share of the budget, the plan filling gets whatever is left, and every
+    solver check is cut to the time left before the deadline of its phase.
+    """
+    def __init__(self, start_time, total=None, behaviour_fraction=1.0, deadline=None) -> None:
+        assert total is None or total > 0, 'The time budget should be positive.'
+        assert 0.0 < behaviour_fraction <= 1.0, 'The behaviour budget fraction should be in (0, 1].'
+        self.start_time = start_time
+        self.behaviour_fraction = behaviour_fraction
+        deadlines = [d for d in [deadline, None if total is None else start_time + total] if d is not None]
+        self.deadline = min(deadlines) if len(deadlines) > 0 else None
+
+    def behaviour_deadline(self, only_phase):
+        """!
+        Returns the deadline of the behaviour discovery, all the budget when no plans are filled afterwards.
+        """
+        if self.deadline is None or only_phase: return self.deadline
+        return self.start_time + self.behaviour_fraction * (self.deadline - self.start_time)
+
+    def expired(self, deadline=None):
+        deadline = self.deadline if deadline is None else deadline
+        return deadline is not None and time.time() >= deadline
+
+    def check_timeout(self, solver_timeout, deadline):
+        """!
+        Returns the timeout (ms) of a solver check, i.e., the solver timeout cut to the time left.
+        """
+        if deadline is None: return solver_timeout
+        return max(1, min(solver_timeout, int((deadline - time.time()) * 1000)))
@@ -0,0 +1,179 @@
+import time
+import heapq
+import itertools
+
+from unified_planning.plans import ActionInstance, SequentialPlan
+from unified_planning.engines import PlanGenerationResultStatus
+
+# The heuristics of the greedy best-first search, all of them over the delete relaxation with unit costs.
+gbfs_heuristics = ['ff', 'add']
+
+def _literals(expr):
+    """!
+    Returns the positive and negative atoms of a conjunction of (negated) boolean fluents, or None when the
+    expression is a false constant.
+    """
+    if expr.is_bool_constant(): return ([], []) if expr.is_true() else None
+    if expr.is_and():
+        positive, negative = [], []
+        for arg in expr.args:
+            literals = _literals(arg)
+            if literals is None: return None
+            positive.extend(literals[0])
+            negative.extend(literals[1])
+        return positive, negative
+    if expr.is_fluent_exp() and expr.type.is_bool_type(): return [expr], []
+    if expr.is_not() and expr.arg(0).is_fluent_exp(): return [], [expr.arg(0)]
+    assert False, f'The greedy best-first search only supports conjunctions of boolean fluents, got {expr}.'
+
+class GreedyBestFirstSearch:
+    """!
+    A greedy best-first search on a grounded STRIPS task (boolean fluents, negative preconditions and goals, no
+    conditional effects), run in-process to find a seed plan quickly. The states are bitsets over the task's
+    atoms and the search is guided by h^FF or h^add, both computed on the delete relaxation. The plans are not
+    optimal, h^max gives an admissible lower bound on the optimal plan length instead.
+    """
+    def __init__(self, problem) -> None:
+        assert not problem.kind.has_state_invariants() and not problem.kind.has_trajectory_constraints(), 'The greedy best-first search does not support state invariants or trajectory constraints.'
+        self.problem = problem
+        self.atoms   = {}
+        def bits(atoms): return sum(1 << self._atom(a) for a in atoms)
+
+        self.actions = []
+        for action in problem.actions:
+            literals = ([], [])
+            for precondition in action.preconditions:
+                precondition_literals = _literals(precondition)
+                # an action with a false precondition is never applicable.
+                if precondition_literals is None: break
+                literals[0].extend(precondition_literals[0])
+                literals[1].extend(precondition_literals[1])
+            else:
+                assert all(not e.is_conditional() and e.fluent.type.is_bool_type() and e.value.is_bool_constant() for e in action.effects), f'The greedy best-first search does not support the effects of {action.name}.'
+                add  = [e.fluent for e in action.effects if e.value.is_true()]
+                dele = [e.fluent for e in action.effects if e.value.is_false()]
+                self.actions.append((action, bits(literals[0]), bits(literals[1]), bits(add), bits(dele)))
+        goals = ([], [])
+        for goal in problem.goals:
+            literals = _literals(goal)
+            assert literals is not None, 'The goal is unsatisfiable.'
+            goals[0].extend(literals[0])
+            goals[1].extend(literals[1])
+        self.goal_pos = bits(goals[0])
+        self.goal_neg = bits(goals[1])
+        self.initial_state = bits(f for f, v in problem.initial_values.items() if v.is_bool_constant() and v.is_true())
+
+        # the delete relaxation: the actions by positive precondition atom, and the add effects per action.
+        self.pre_atoms   = [self._bits_to_atoms(pre) for _, pre, _, _, _ in self.actions]
+        self.add_atoms   = [self._bits_to_atoms(add) for _, _, _, add, _ in self.actions]
+        self.consumers_of = [[] for _ in range(len(self.atoms))]
+        for idx, pre in enumerate(self.pre_atoms):
+            for atom in pre: self.consumers_of[atom].append(idx)
+        self.goal_atoms  = self._bits_to_atoms(self.goal_pos)
+
+    def _atom(self, fluent):
+        return self.atoms.setdefault(fluent, len(self.atoms))
+
+    def _bits_to_atoms(self, state):
+        return [i for i in range(state.bit_length()) if state >> i & 1]
+
+    def relaxed_costs(self, state, combine):
+        """!
+        Returns the relaxed cost of every atom from the state (None when unreachable) and its best supporter,
+        combining the costs of an action's preconditions with combine (sum for h^add, max for h^max).
+        """
+        costs       = [None] * len(self.atoms)
+        supporters  = [None] * len(self.atoms)
+        unsatisfied = [len(pre) for pre in self.pre_atoms]
+        pre_costs   = [0] * len(self.actions)
+        heap = [(0, atom) for atom in self._bits_to_atoms(state)]
+        for _, atom in heap: costs[atom] = 0
+        def apply(idx):
+            for atom in self.add_atoms[idx]:
+                cost = pre_costs[idx] + 1
+                if costs[atom] is None or cost < costs[atom]:
+                    costs[atom], supporters[atom] = cost, idx
+                    heapq.heappush(heap, (cost, atom))
+        for idx, pre in enumerate(self.pre_atoms):
+            if len(pre) == 0: apply(idx)
+        goals_left = set(self.goal_atoms)
+        while len(heap) > 0 and len(goals_left) > 0:
+            cost, atom = heapq.heappop(heap)
+            if cost > costs[atom]: continue
+            goals_left.discard(atom)
+            for idx in self.consumers_of[atom]:
+                unsatisfied[idx] -= 1
+                pre_costs[idx] = combine(pre_costs[idx], cost)
+                if unsatisfied[idx] == 0: apply(idx)
+        return costs, supporters
+
+    def h_add(self, state):
+        costs, _ = self.relaxed_costs(state, lambda a, b: a + b)
+        if any(costs[g] is None for g in self.goal_atoms): return None
+        return sum(costs[g] for g in self.goal_atoms)
+
+    def h_max(self, state):
+        costs, _ = self.relaxed_costs(state, max)
+        if any(costs[g] is None for g in self.goal_atoms): return None
+        return max((costs[g] for g in self.goal_atoms), default=0)
+
+    def h_ff(self, state):
+        """!
+        Returns the size of the relaxed plan extracted from h^add's best supporters.
+        """
+        costs, supporters = self.relaxed_costs(state, lambda a, b: a + b)
+        if any(costs[g] is None for g in self.goal_atoms): return None
+        relaxed_plan = set()
+        stack = [g for g in self.goal_atoms if costs[g] > 0]
+        while len(stack) > 0:
+            idx = supporters[stack.pop()]
+            if idx in relaxed_plan: continue
+            relaxed_plan.add(idx)
+            stack.extend(a for a in self.pre_atoms[idx] if costs[a] > 0)
+        return len(relaxed_plan)
+
+    def is_goal(self, state):
+        return state & self.goal_pos == self.goal_pos and state & self.goal_neg == 0
+
+    def solve(self, heuristic='ff', timeout=None):
+        """!
+        Returns the plan (None when there is none) and the status of the search.
+
+        @param heuristic: ff or add.
+        @param timeout: the search time limit in seconds (None for no limit).
+        """
+        assert heuristic in gbfs_heuristics, f'Unknown heuristic {heuristic}, expected one of {gbfs_heuristics}.'
+        h = self.h_ff if heuristic == 'ff' else self.h_add
+        deadline = None if timeout is None else time.time() + timeout
+        tie = itertools.count()
+        parents = {self.initial_state: None}
+        h_init  = h(self.initial_state)
+        if h_init is None: return None, PlanGenerationResultStatus.UNSOLVABLE_PROVEN
+        open_list = [(h_init, next(tie), self.initial_state)]
+        while len(open_list) > 0:
+            if deadline is not None and time.time() >= deadline: return None, PlanGenerationResultStatus.TIMEOUT
+            _, _, state = heapq.heappop(open_list)
+            if self.is_goal(state): return self._extract_plan(parents, state), PlanGenerationResultStatus.SOLVED_SATISFICING
+            for idx, (_, pre, neg, add, dele) in enumerate(self.actions):
+                if state & pre != pre or state & neg != 0: continue
+                successor = (state & ~dele) | add
+                if successor in parents: continue
+                parents[successor] = (state, idx)
+                h_successor = h(successor)
+                # dead ends are pruned, the relaxation is safe for them.
+                if h_successor is not None: heapq.heappush(open_list, (h_successor, next(tie), successor))
+        return None, PlanGenerationResultStatus.UNSOLVABLE_PROVEN
+
+    def plan_length_lower_bound(self):
+        """!
+        Returns h^max of the initial state, an admissible estimate of the optimal plan length (None when the task
+        is unsolvable in the relaxation).
+        """
+        return self.h_max(self.initial_state)
+
+    def _extract_plan(self, parents, state):
+        actions = []
+        while parents[state] is not None:
+            state, idx = parents[state]
+            actions.append(ActionInstance(self.actions[idx][0]))
+        return SequentialPlan(list(reversed(actions)))
@@ -1,29 +1,40 @@
 import sys
 import math
+import time
 from enum import Enum
+from collections import namedtuple
 
 from unified_planning.model.metrics import Oversubscription
-from unified_planning.shortcuts import OneshotPlanner, Compiler, CompilationKind
-import unified_planning.engines.results as UPResults
+from unified_planning.shortcuts import Compiler, CompilationKind
+from unified_planning.io import PDDLReader
+from unified_planning.plans import ActionInstance, SequentialPlan
 from unified_planning.engines.results import CompilerResult
 
 import z3
 
-# Register planners.
-import up_symk
-import up_pypmt
-
 from pypmt.apis import initialize_fluents
 
 from behaviour_planning.over_domain_models.smt.bss.behaviour_space.space_encoders.basic import BehaviourSpaceSMT
 from behaviour_planning.over_domain_models.smt.bss.utilities import compute_behaviour_space_statistics_smt
+from behaviour_planning.over_domain_models.smt.bss.task_cache import task_cache
+from behaviour_planning.over_domain_models.smt.fbi.planner.budget import TimeBudget
+from behaviour_planning.over_domain_models.smt.fbi.planner.heuristic_search import GreedyBestFirstSearch
+from behaviour_planning.over_domain_models.smt.registry import seed_planners, resolve_dims
 
 class ForbidMode(Enum):
     BEHAVIOUR = 1
     PLAN      = 2
 
+# A plan generated by iter_plans: the plan lifted to the input task, its behaviour (None when the space has no
+# dimensions, behaviour.values is its key) and the seconds since the iteration started.
+PlanResult = namedtuple('PlanResult', 'plan behaviour time')
+
+def print_progress(found, forbid_mode):
+    print("Found {} till now: {}".format('behaviour(s)' if forbid_mode == ForbidMode.BEHAVIOUR else 'plan(s)', found))
+
 class ForbidBehaviourIterativeSMT:
     def __init__(self, task, bspace_cfg, planner_cfg):
+        self.start_time               = time.time()
         self.basic_task               = task
         self.base_planner             = planner_cfg
         self.solver_timeout           = bspace_cfg.get('solver-timeout-ms', 300000)
@@ -32,7 +43,15 @@ class ForbidBehaviourIterativeSMT:
         self.behaviour_only           = bspace_cfg.get('behaviours-only', False)
         self.ignore_seed_plan         = bspace_cfg.get('ignore-seed-plan', False)
         self.use_fixed_length_formula = bspace_cfg.get('use_fixed_length_formula', False)
+        # the wall-clock budget (s) of the whole run, counted from here, and the share of the behaviour discovery.
+        self.time_budget              = bspace_cfg.get('time-budget-s', None)
+        self.behaviour_budget_fraction = bspace_cfg.get('behaviour-budget-fraction', 0.8)
+        self.budget                   = TimeBudget(self.start_time, self.time_budget, self.behaviour_budget_fraction)
         self._is_oversubscription     = False
+        # the parsed/compiled tasks are reused across runs when a task-cache-dir is given.
+        self.task_cache               = task_cache(bspace_cfg)
+        # the dimensions can be given by their registered names.
+        if 'dims' in bspace_cfg: bspace_cfg['dims'] = resolve_dims(bspace_cfg['dims'])
         
         # initialise fluents.
         initialize_fluents(task)
@@ -41,8 +60,12 @@ class ForbidBehaviourIterativeSMT:
         self.compiled_task = self._compile(task, self.compilationlist)
 
         self.bspace = None
+        self.seed_plan_length = None
+        # the slack a satisficing seed plan adds to every quality bound factor, see plan_length_bound.
+        self.upper_bound_slack = 0.0
+        self.seed_plan_cache_key = None
 
-        self.log_msg = []
+        self.log_msg = [] if self.task_cache is None else list(self.task_cache.log_msg)
         self.diverse_plans = []
         self.diverse_plans_actions_sequence = set()
 
@@ -50,59 +73,159 @@ class ForbidBehaviourIterativeSMT:
         else: self._init_using_planner(self.compiled_task, bspace_cfg)
             
     def plan(self, required_plancount = sys.maxsize):
-        # Try to generate plans that are diverse in terms of behaviours.
-        self.core(ForbidMode.BEHAVIOUR, required_plancount)
-        # If we did not get enough diverse behaviours, then try to generate plans from those behaviours.
-        if (len(self.diverse_plans) < required_plancount) and\
-           (required_plancount != sys.maxsize) and\
-           (not self.behaviour_only):
-            self.core(ForbidMode.PLAN, required_plancount)
-        # return the plans to the lifted task.
-        return [self._lift_plan(p, p.behaviour) for p in self.diverse_plans]
-        # return list(map(lambda p: p.plan.replace_action_instances(self.compiled_task.map_back_action_instance), self.diverse_plans))
-    
-    def core(self, forbid_mode, required_plancount):
+        return [result.plan for result in self.iter_plans(required_plancount, progress=print_progress)]
+
+    def iter_plans(self, max_plans=sys.maxsize, deadline=None, behaviour_count=None, progress=None):
+        """!
+        Generates the diverse plans one by one as soon as they are extracted, starting with the seed plan. The
+        behaviours are forbidden first, then the plans once no unseen behaviour is left (when max_plans is given
+        and the planner is not restricted to behaviours). Stopping the iteration early releases the solvers.
+        The behaviour discovery stops at its share of the time budget (time-budget-s, behaviour-budget-fraction),
+        the plan filling runs until the end of the budget.
+
+        @param max_plans: stop once this many plans were generated.
+        @param deadline: stop once the wall-clock time (time.time()) passes it or the time budget is spent, the
+                         solver checks are cut to the time left.
+        @param behaviour_count: stop once the plans cover this many behaviours.
+        @param progress: called with the number of plans found so far and the forbid mode after every new plan.
+
+        @return PlanResult per plan.
+        """
+        start_time = time.time()
+        behaviours = set()
+        yielded    = 0
+        self.budget = TimeBudget(self.start_time, self.time_budget, self.behaviour_budget_fraction, deadline)
+        fill_plans  = max_plans != sys.maxsize and not self.behaviour_only
+        # set by core once the behaviour discovery ends unsat, i.e., every behaviour was found.
+        self.behaviours_exhausted = False
+
+        def stop():
+            if yielded >= max_plans or len(self.diverse_plans) >= max_plans: return True
+            if self.budget.expired(): return True
+            return behaviour_count is not None and len(behaviours) >= behaviour_count
+
+        def result(plan):
+            if plan.behaviour is not None: behaviours.add(plan.behaviour)
+            return PlanResult(self._lift_plan(plan, plan.behaviour), plan.behaviour, time.time() - start_time)
 
         if self.bspace is None:
             self.log_msg.append('Behaviour space could not be constructed.')
             return
 
+        try:
+            # the seed plan was found while constructing the behaviour space.
+            for plan in list(self.diverse_plans):
+                if stop(): return
+                yielded += 1
+                yield result(plan)
+            for forbid_mode in [ForbidMode.BEHAVIOUR, ForbidMode.PLAN]:
+                # If we did not get enough diverse behaviours, then try to generate plans from those behaviours.
+                if forbid_mode == ForbidMode.PLAN and not fill_plans: break
+                phase_deadline = self.budget.behaviour_deadline(not fill_plans) if forbid_mode == ForbidMode.BEHAVIOUR else self.budget.deadline
+                for plan in self.core(forbid_mode, stop, phase_deadline):
+                    yielded += 1
+                    if progress is not None: progress(len(self.diverse_plans), forbid_mode)
+                    yield result(plan)
+            if self.budget.expired(): self.log_msg.append(f'The time budget is spent, {yielded} plans were found.')
+        finally:
+            # stop the solver portfolio workers if any.
+            self.bspace.close()
+
+    def _stop_reason(self, forbid_mode, deadline, outcome=None):
+        # why the enumeration of the forbid mode stopped, the solver timeouts are told apart from unsat.
+        phase = 'behaviour discovery' if forbid_mode == ForbidMode.BEHAVIOUR else 'plan filling'
+        outcome = self.bspace.last_outcome if outcome is None else outcome
+        if self.budget.expired(deadline): return f'The {phase} stopped, its time budget is spent.'
+        if outcome == 'unsat': return f'The {phase} stopped, no unseen {"behaviour" if forbid_mode == ForbidMode.BEHAVIOUR else "plan"} is left (unsat).'
+        if outcome == 'timeout': return f'The {phase} stopped, the solver timed out.'
+        return f'The {phase} stopped, the solver returned {outcome}.'
+
+    def core(self, forbid_mode, stop, deadline=None):
+        """!
+        Generates the new plans of the forbid mode until stop() holds, the deadline passes or nothing unseen is left.
+        """
         if (forbid_mode == ForbidMode.BEHAVIOUR) and len(self.bspace.__len__()) == 0:
             # Cannot generate any behaviour for an empty space
+            self.behaviours_exhausted = True
             return
 
         if (len(self.diverse_plans) == 0) and (len(self.base_planner) != 0) and not self._is_oversubscription:
             self.log_msg.append('Seed plan invalidated the behaviour space.')
 
-        behaviours_list = []
-        plans_list      = []
-
-        for plan in self.diverse_plans:
-            if plan.behaviour is not None: behaviours_list.append(plan.behaviour)
-            if plan._z3_plan is not None:  plans_list.append(z3.Not(z3.And(plan._z3_plan), ctx=self.ctx))
-
-        assumptions = []
-        if len(behaviours_list) > 0:
-            assumptions.append(z3.Not(z3.Or(behaviours_list), ctx=self.ctx) if forbid_mode == ForbidMode.BEHAVIOUR else z3.Or(behaviours_list))
-        if len(plans_list) > 0:
-            assumptions.extend(plans_list)
-
-        while self.bspace.is_satisfiable(assumptions, self.solver_timeout, self.solver_memorylimit) and (len(self.diverse_plans) < required_plancount):
-            # Extract plan from the behaviour space.
-            plan = self.bspace.extract_plan()
-            if plan is None: break
-            # Update the diverse plan list and check that we don't have repeated plans.
-            if not self.update(plan): break
-            # Append the behaviour to the list of behaviours.
-            if forbid_mode == ForbidMode.BEHAVIOUR and plan.behaviour is not None: behaviours_list.append(plan.behaviour)
-            # Update the our assumptions.
-            assumptions = []
+        # Cut off the plans that are symmetric to other plans if the bspace is configured to do so for this mode. The
+        # found behaviours are only closed under the symmetries once every behaviour was found, otherwise the plans
+        # whose symmetric copy has an unfound behaviour would be cut off as well.
+        plan_symmetry_breaking = forbid_mode == ForbidMode.PLAN and self.behaviours_exhausted
+        if forbid_mode == ForbidMode.PLAN and not plan_symmetry_breaking and self.bspace.symmetry_breaking == 'plan':
+            self.log_msg.append('Symmetry breaking is skipped for the plan filling, the behaviour discovery did not end unsat.')
+        self.bspace.use_symmetry_breaking(plan_symmetry_breaking)
+
+        # Hand the behaviours and plans we already have to the solver.
+        self.bspace.open_blocking_scope()
+        try:
+            behaviours_list = [plan.behaviour.expression() for plan in self.diverse_plans if plan.behaviour is not None]
             if len(behaviours_list) > 0:
-                assumptions.append(z3.Not(z3.Or(behaviours_list), ctx=self.ctx) if forbid_mode == ForbidMode.BEHAVIOUR else z3.Or(behaviours_list))
-            
-            plans_list.append(z3.Not(z3.And(plan._z3_plan), ctx=self.ctx))
-            assumptions.extend(plans_list)
-            print("Found {} till now: {}".format('behaviour(s)' if forbid_mode == ForbidMode.BEHAVIOUR else 'plan(s)', len(self.diverse_plans)))
+                if forbid_mode == ForbidMode.BEHAVIOUR:
+                    for behaviour in behaviours_list: self.bspace.block(z3.Not(behaviour, ctx=self.ctx))
+                else:
+                    self.bspace.block(z3.Or(behaviours_list))
+            for plan in self.diverse_plans:
+                if plan._z3_plan is not None: self.bspace.block(z3.Not(z3.And(plan._z3_plan), ctx=self.ctx))
+
+            if forbid_mode == ForbidMode.BEHAVIOUR and self.bspace.partition is not None:
+                yield from self._core_partitioned(stop, deadline)
+                return
+
+            while not stop():
+                if self.budget.expired(deadline):
+                    self.log_msg.append(self._stop_reason(forbid_mode, deadline))
+                    break
+                if not self.bspace.is_satisfiable(self.bspace.blocking_assumptions, self.budget.check_timeout(self.solver_timeout, deadline), self.solver_memorylimit):
+                    # Nothing unseen is left for the current horizon, so unroll one more step if we can.
+                    if self.bspace.last_check == z3.unsat and self.bspace.extend_horizon(): continue
+                    if forbid_mode == ForbidMode.BEHAVIOUR and self.bspace.last_check == z3.unsat: self.behaviours_exhausted = True
+                    self.log_msg.append(self._stop_reason(forbid_mode, deadline))
+                    break
+                # Extract plan from the behaviour space.
+                plan = self.bspace.extract_plan()
+                if plan is None: break
+                # Update the diverse plan list and check that we don't have repeated plans.
+                if not self.update(plan): break
+                # Forbid the new behaviour and plan, only the new ones are handed to the solver.
+                if forbid_mode == ForbidMode.BEHAVIOUR and plan.behaviour is not None: self.bspace.block(z3.Not(plan.behaviour.expression(), ctx=self.ctx))
+                self.bspace.block(z3.Not(z3.And(plan._z3_plan), ctx=self.ctx))
+                yield plan
+        finally:
+            self.bspace.close_blocking_scope()
+
+    def _core_partitioned(self, stop, deadline):
+        # The cells are enumerated in parallel, the plans arrive in the order the workers find them.
+        while not stop():
+            if self.budget.expired(deadline):
+                self.log_msg.append(self._stop_reason(ForbidMode.BEHAVIOUR, deadline))
+                return
+            # the workers are stopped as soon as we stop consuming their plans, they cut their checks to the time left
+            # before the deadline themselves.
+            plans = self.bspace.partition.enumerate(self.bspace.blocking_assumptions, sys.maxsize, self.solver_timeout, self.solver_memorylimit, deadline)
+            try:
+                for plan in plans:
+                    if not self.update(plan): continue
+                    if plan.behaviour is not None: self.bspace.block(z3.Not(plan.behaviour.expression(), ctx=self.ctx))
+                    self.bspace.block(z3.Not(z3.And(plan._z3_plan), ctx=self.ctx))
+                    yield plan
+                    if stop() or self.budget.expired(deadline): break
+                else:
+                    # unroll one more step only once every cell is exhausted, a cell that timed out may still have behaviours.
+                    outcome = self.bspace.partition.last_outcome
+                    if outcome != 'unsat':
+                        self.log_msg.append(self._stop_reason(ForbidMode.BEHAVIOUR, deadline, outcome))
+                        return
+                    if self.bspace.extend_horizon(): continue
+                    self.behaviours_exhausted = True
+                    self.log_msg.append('The behaviour discovery stopped, every cell is exhausted.')
+                    return
+            finally:
+                plans.close()
     
     def update(self, plan):
         # Make sure that we did not get a repeated plan.
@@ -120,12 +243,9 @@ class ForbidBehaviourIterativeSMT:
         ret_logs['bspace-stats'] = compute_behaviour_space_statistics_smt(self.diverse_plans, self.bspace) if self.bspace is not None else 'bspace is None.'
         return ret_logs
 
-    def _flatten_expr(self, expr): 
-        return [expr] if not (z3.is_and(expr) or z3.is_or(expr)) else [arg for child in expr.children() for arg in self._flatten_expr(child)]
-
     def _lift_plan(self, plan, behaviour):
         plan = plan.plan.replace_action_instances(self.compiled_task.map_back_action_instance)
-        setattr(plan, 'behaviour', ' ^ '.join(list(map(lambda s : f'({str(s)})', self._flatten_expr(behaviour)))))
+        setattr(plan, 'behaviour', behaviour.pretty() if behaviour is not None else None)
         return plan
 
     def _compile(self, task, compilationlist):
@@ -135,10 +255,13 @@ class ForbidBehaviourIterativeSMT:
         task.clear_quality_metrics()
         for metric in other_metrics: task.add_quality_metric(metric)
         
-        names = [name for name, _ in compilationlist]
-        compilationkinds = [kind for _, kind in compilationlist]
-        with Compiler(names=names, compilation_kinds=compilationkinds) as compiler:
-            compiled_task = compiler.compile(task)
+        if self.task_cache is not None:
+            compiled_task = self.task_cache.compile(task, compilationlist)
+        else:
+            names = [name for name, _ in compilationlist]
+            compilationkinds = [kind for _, kind in compilationlist]
+            with Compiler(names=names, compilation_kinds=compilationkinds) as compiler:
+                compiled_task = compiler.compile(task)
 
         assert len(compiled_task.problem.actions) > 0, 'No actions in the compiled task.'
 
@@ -155,18 +278,17 @@ class ForbidBehaviourIterativeSMT:
         oversubscription_metrics = list(filter(lambda metric: isinstance(metric, Oversubscription), task.quality_metrics))
         other_metrics            = list(filter(lambda metric: not isinstance(metric, Oversubscription), task.quality_metrics))
 
-        self._is_oversubscription = len(oversubscription_metrics) > 0
-
         # remove the oversubscription metric from the task.
         task.clear_quality_metrics()
         for metric in other_metrics: task.add_quality_metric(metric)
 
         plannername   = self.base_planner.get('planner-name', None)
         plannerparams = self.base_planner
+        planner_cfg   = dict(self.base_planner)
         seedplan      = None
 
-        assert plannername in set(['symk-opt', 'SMTPlanner']), 'Unsupported planner is not defined.'        
         assert plannername is not None, 'Planner is not defined.'
+        assert plannername in seed_planners, f'Unsupported planner {plannername}, expected one of {seed_planners.names()}.'
         # remove the planner-name from the parameters.
         del plannerparams['planner-name']
 
@@ -176,34 +298,81 @@ class ForbidBehaviourIterativeSMT:
                 compilationlist.append([None if name == 'None' else name, eval(f'CompilationKind.{kind}')])
             plannerparams['compilationlist'] = compilationlist            
 
-        with OneshotPlanner(name=plannername,  params=plannerparams) as planner:
-            result   = planner.solve(task)
-            seedplan = result.plan if result.status in UPResults.POSITIVE_OUTCOMES else None
+        # the planner's backend (e.g. the up_symk engine) is only imported when it is used.
+        def solve(task): return seed_planners.get(plannername)(task, plannerparams)
+
+        # the seed plans of the same task and planner configuration are reused across runs.
+        if self.task_cache is not None:
+            seedplan, _, self.seed_plan_cache_key = self.task_cache.seed_plan(task, planner_cfg, solve)
+        else:
+            seedplan, _ = solve(task)
         
         # add the oversubscription metric back to the task.
         for metric in oversubscription_metrics: task.add_quality_metric(metric)
 
         return seedplan
 
+    def _ground_plan(self, plan):
+        """!
+        Returns the plan of the input task (or its PDDL string) with the actions of the compiled task.
+        """
+        if isinstance(plan, str): plan = PDDLReader().parse_plan_string(self.basic_task, plan)
+        grounded = {}
+        for action in self.compiled_task.problem.actions:
+            lifted = self.compiled_task.map_back_action_instance(ActionInstance(action))
+            grounded[(lifted.action.name, tuple(map(str, lifted.actual_parameters)))] = action
+        return SequentialPlan([ActionInstance(grounded[(a.action.name, tuple(map(str, a.actual_parameters)))]) for a in plan.actions])
+
+    def _seed_plan(self, task, bspace_cfg):
+        """!
+        Returns the seed plan of the compiled task, its length and whether the length is optimal: the seed-plan given
+        in the configuration, only the optimal-plan-length when given (no seed plan), or the base planner's plan
+        otherwise (not optimal for the greedy best-first search).
+        """
+        if bspace_cfg.get('seed-plan', None) is not None:
+            seedplan = self._ground_plan(bspace_cfg['seed-plan'])
+            return seedplan, len(seedplan.actions), True
+        if bspace_cfg.get('optimal-plan-length', None) is not None:
+            return None, bspace_cfg['optimal-plan-length'], True
+        # run a planner to infer the formula length.
+        is_optimal = self.base_planner.get('planner-name', None) != 'gbfs'
+        seedplan   = self._solve(task.problem)
+        return seedplan, None if seedplan is None else len(seedplan.actions), is_optimal
+
+    def plan_length_bound(self, quality_bound_factor):
+        """!
+        Returns the longest plan allowed by the quality bound factor, i.e., floor(seed plan length * (q + slack)).
+        """
+        return int(math.floor(self.seed_plan_length*(quality_bound_factor + self.upper_bound_slack)))
+
     def _init_using_planner(self, task, bspace_cfg):
 
-        # run a planner to infer the formula length.
-        seedplan = self._solve(task.problem)
+        self._is_oversubscription = any(isinstance(metric, Oversubscription) for metric in task.problem.quality_metrics)
+        seedplan, seedlength, is_optimal = self._seed_plan(task, bspace_cfg)
 
-        if seedplan is None or len(seedplan.actions) == 0:
+        if seedlength is None or seedlength == 0:
             self.log_msg.append('Seed plan could not be generated.')
             return
 
         # based on the formula length the included dimensions we need to update the upper-bound for the 
         # behaviour space and update the dimensions' additional information. 
+        self.seed_plan_length = seedlength
+
+        # a satisficing seed plan only bounds the optimal plan length from above: the upper bound gets the planner's
+        # slack on top of the quality factor and the cost dimensions start from h^max so the shorter plans are kept.
+        self.upper_bound_slack = 0.0 if is_optimal else self.base_planner.get('upper-bound-slack', 0.0)
+        optimal_length    = seedlength
+        if not is_optimal and not self._is_oversubscription:
+            optimal_length = max(1, GreedyBestFirstSearch(task.problem).plan_length_lower_bound() or 1)
+            self.log_msg.append(f'Satisficing seed plan of length {seedlength}, the optimal plan length is at least {optimal_length}.')
 
         # first infer the behaviour space upper bound based on the passed quality factor.
         quality_bound_factor      = bspace_cfg.get('quality-bound-factor', 1.0)
-        bspace_cfg['upper-bound'] = int(math.floor(len(seedplan.actions)*quality_bound_factor))
+        bspace_cfg['upper-bound'] = self.plan_length_bound(quality_bound_factor)
         assert bspace_cfg['upper-bound'] >= 1, 'The upper bound is less than or equal to zero.'
         
         # check if the quality_bound_factor is 1.0 then there is no point of having the MakespanOptimalCostSMT dimension.
-        if quality_bound_factor == 1.0 and not self._is_oversubscription:
+        if quality_bound_factor == 1.0 and is_optimal and not self._is_oversubscription:
             bspace_cfg['dims'] = list(filter(lambda x: x[0].__name__ != 'MakespanOptimalCostSMT', bspace_cfg['dims']))
 
         # now we need to update the following dimensions, if they are included in the behaviour space.
@@ -213,18 +382,25 @@ class ForbidBehaviourIterativeSMT:
         for idx, (dim_class, dim_additional_information) in enumerate(bspace_cfg['dims']):
             extra_info = {}
             if dim_class.__name__ in ['MakespanOptimalCostSMT', 'CostBoundSMT']:
-                extra_info.update({'optimal-plan-length': len(seedplan.actions), 'is-oversubscription': self._is_oversubscription})
+                extra_info.update({'optimal-plan-length': optimal_length, 'is-oversubscription': self._is_oversubscription})
                 additional_information_updates.append((idx, dim_additional_information | extra_info))
         
         for idx, dim_additional_information in additional_information_updates:
             bspace_cfg['dims'][idx][1] = dim_additional_information
         
+        # an incremental behaviour space starts from the seed plan's length and grows up to the upper bound.
+        if bspace_cfg.get('incremental-horizon', False): bspace_cfg['initial-horizon'] = seedlength
+
         # Construct the behaviour space
         self.bspace = BehaviourSpaceSMT(task, bspace_cfg)
         # Add seed plan to the the list of generated behaviours if the planning task is not oversubscription planning.
-        if not self._is_oversubscription:
+        if not self._is_oversubscription and seedplan is not None:
             plan = self.bspace.plan_behaviour(seedplan)
             if plan is not None and not self.ignore_seed_plan: self.update(plan)
+            # a cached seed plan is checked against the encoding instead of planning again, a stale one is dropped.
+            if plan is None and self.seed_plan_cache_key is not None:
+                self.log_msg.append('The cached seed plan is not valid for the encoding, the cache entry is dropped.')
+                self.task_cache.remove(self.seed_plan_cache_key)
         # Get the same context as the behaviour space.
         self.ctx = self.bspace.ctx
     
@@ -0,0 +1,23 @@
+from unified_planning.shortcuts import OneshotPlanner
+import unified_planning.engines.results as UPResults
+
+# The seed planners of the registry, each one returns the plan (None when there is none) and the planner's status.
+# The UP engines are registered by importing their packages, which is only done when the planner is used.
+
+def _oneshot(task, plannername, params):
+    with OneshotPlanner(name=plannername,  params=params) as planner:
+        result = planner.solve(task)
+    return (result.plan if result.status in UPResults.POSITIVE_OUTCOMES else None), result.status
+
+def solve_symk(task, params):
+    import up_symk
+    return _oneshot(task, 'symk-opt', params)
+
+def solve_smt_planner(task, params):
+    import up_pypmt
+    return _oneshot(task, 'SMTPlanner', params)
+
+def solve_gbfs(task, params):
+    # the greedy best-first search runs in-process on the grounded task.
+    from behaviour_planning.over_domain_models.smt.fbi.planner.heuristic_search import GreedyBestFirstSearch
+    return GreedyBestFirstSearch(task).solve(params.get('heuristic', 'ff'), params.get('search-time-limit', None))
@@ -0,0 +1,67 @@
+import time
+from collections import namedtuple
+
+from behaviour_planning.over_domain_models.smt.fbi.planner.planner import ForbidBehaviourIterativeSMT
+
+# The answer of one (q, k) pair of a sweep: the plans, the seconds and the logs a separate run would have had, i.e.,
+# the construction of the behaviour space plus the enumeration of this q up to the k-th plan.
+SweepResult = namedtuple('SweepResult', 'plans time logs')
+
+class ForbidBehaviourIterativeSession:
+    """!
+    Answers a sweep of quality bound factors (q) and plan counts (k) from one behaviour space. The task is compiled,
+    the seed plan is found and the space is encoded once for the largest q; every q is then enumerated on the same
+    solver with its plan length bound (the planner's plan_length_bound) passed as an assumption, and the plans of
+    every k are the prefix of the run for the largest k.
+    """
+    def __init__(self, task, bspace_cfg, planner_cfg, q_values):
+        assert len(q_values) > 0, 'The sweep needs at least one quality bound factor.'
+        assert not bspace_cfg.get('use_fixed_length_formula', False), 'The sweep needs a seed plan to bound the plans.'
+        self.q_values = sorted(set(q_values))
+        bspace_cfg = dict(bspace_cfg)
+        bspace_cfg['quality-bound-factor'] = self.q_values[-1]
+        # the cost bound dimensions are encoded for the largest q as well, the smaller ones are bounded by assumptions.
+        bspace_cfg['dims'] = [[dim, info | {'cost-bound-factor': self.q_values[-1]} if isinstance(info, dict) and 'cost-bound-factor' in info else info] for dim, info in bspace_cfg['dims']]
+
+        start_time   = time.time()
+        self.planner = ForbidBehaviourIterativeSMT(task, bspace_cfg, planner_cfg)
+        self.setup_time = time.time() - start_time
+        # the logs of the construction are shared by every q.
+        self.setup_logs_cnt = len(self.planner.log_msg)
+        self.seed_plans = list(self.planner.diverse_plans)
+
+    def sweep(self, k_values, progress=None):
+        """!
+        Enumerates the plans of every q (smallest first) until the largest k is reached and snapshots the plans at
+        every k. A q that has fewer plans than k gets all of its plans.
+
+        @param k_values: the numbers of plans to report.
+        @param progress: passed to iter_plans.
+
+        @return {(q, k): SweepResult}, without plans when the behaviour space could not be constructed.
+        """
+        results = {}
+        k_values = sorted(set(k_values))
+        if self.planner.bspace is None or self.planner.seed_plan_length is None:
+            return {(q, k): SweepResult([], self.setup_time, list(self.planner.log_msg)) for q in self.q_values for k in k_values}
+        for q in self.q_values:
+            # every q starts again from the seed plan and gets its own time budget.
+            self.planner.diverse_plans = list(self.seed_plans)
+            self.planner.diverse_plans_actions_sequence = set(self.seed_plans)
+            self.planner.start_time = time.time()
+            self.planner.bspace.bound_plan_length(self.planner.plan_length_bound(q))
+            q_logs_start = len(self.planner.log_msg)
+            self.planner.log_msg.append(f'Sweep: enumerating the plans of q={q}.')
+            plans, times = [], {}
+            for result in self.planner.iter_plans(k_values[-1], progress=progress):
+                plans.append(result.plan)
+                if len(plans) in k_values: times[len(plans)] = self.setup_time + result.time
+            elapsed = time.time() - self.planner.start_time
+            logs = self.planner.log_msg[:self.setup_logs_cnt] + self.planner.log_msg[q_logs_start:]
+            for k in k_values:
+                results[(q, k)] = SweepResult(plans[:k], times.get(k, self.setup_time + elapsed), logs)
+        self.planner.bspace.bound_plan_length(None)
+        return results
+
+    def logs(self):
+        return self.planner.logs()
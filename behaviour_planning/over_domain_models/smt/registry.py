@@ -0,0 +1,88 @@
+import importlib
+
+_features = 'behaviour_planning.over_domain_models.smt.bss.behaviour_features_library'
+_encoders = 'behaviour_planning.over_domain_models.smt.bss.behaviour_space.formula_encoders'
+
+class LazyRegistry:
+    """!
+    Resolves the components (dimensions, encoders, seed planners) by name and imports their modules on first use,
+    so importing the package or running a short-lived worker does not pay for the components it never uses. The
+    components are given as 'module:attribute' paths, other packages add their own through the registry's entry
+    point group, e.g. in their pyproject.toml:
+
+        [tool.poetry.plugins."behaviour_planning.dimensions"]
+        MyDimensionSMT = "my_package.dims:MyDimensionSMT"
+    """
+    def __init__(self, kind, group, paths) -> None:
+        self.kind  = kind
+        self.group = group
+        self.paths = dict(paths)
+        self.loaded = {}
+        self.entry_points_loaded = False
+
+    def _load_entry_points(self):
+        # the installed plugins are only looked up once, and only when a name is not a builtin one.
+        if self.entry_points_loaded: return
+        self.entry_points_loaded = True
+        from importlib.metadata import entry_points
+        for entry_point in entry_points(group=self.group):
+            self.paths.setdefault(entry_point.name, entry_point.value)
+
+    def register(self, name, component):
+        """!
+        Registers a component by name, either the object itself or its 'module:attribute' path.
+        """
+        if isinstance(component, str): self.paths[name] = component
+        else: self.loaded[name] = component
+
+    def get(self, name):
+        if name in self.loaded: return self.loaded[name]
+        if name not in self.paths: self._load_entry_points()
+        assert name in self.paths, f'Unknown {self.kind} {name}, expected one of {self.names()}.'
+        module, _, attribute = self.paths[name].partition(':')
+        component = importlib.import_module(module)
+        for part in filter(None, attribute.split('.')): component = getattr(component, part)
+        self.loaded[name] = component
+        return component
+
+    def names(self):
+        self._load_entry_points()
+        return sorted(set(self.paths) | set(self.loaded))
+
+    def __contains__(self, name):
+        if name in self.loaded or name in self.paths: return True
+        self._load_entry_points()
+        return name in self.paths
+
+dimensions = LazyRegistry('dimension', 'behaviour_planning.dimensions', {
+    'DimensionConstructorSMT':   f'{_features}.base:DimensionConstructorSMT',
+    'GoalPredicatesOrderingSMT': f'{_features}.goal_predicate_ordering:GoalPredicatesOrderingSMT',
+    'LandmarkPredicatesOrderingSMT': f'{_features}.landmark_predicate_ordering:LandmarkPredicatesOrderingSMT',
+    'CostBoundSMT':              f'{_features}.cost_bound_dims:CostBoundSMT',
+    'MakespanOptimalCostSMT':    f'{_features}.cost_bound_makespan_optimal:MakespanOptimalCostSMT',
+    'ResourceCountSMT':          f'{_features}.resource_count:ResourceCountSMT',
+    'FunctionsSMT':              f'{_features}.functions:FunctionsSMT',
+    'UtilityValueSMT':           f'{_features}.utility_value:UtilityValueSMT',
+    'UtilitySetSMT':             f'{_features}.utility_set:UtilitySetSMT',
+})
+
+encoders = LazyRegistry('encoder', 'behaviour_planning.encoders', {
+    'seq':    f'{_encoders}.seq_encoder:EncoderSequential',
+    'forall': f'{_encoders}.seq_encoder:EncoderForall',
+    'r2e':    f'{_encoders}.r2e_encoder:EncoderRelaxed2Exists',
+    'qfuf':   f'{_encoders}.qfuf_encoder:EncoderSequentialQFUF',
+})
+
+# A seed planner is called with the grounded problem and the base planner's parameters, it returns the plan
+# (None when there is none) and the planner's status.
+seed_planners = LazyRegistry('seed planner', 'behaviour_planning.seed_planners', {
+    'symk-opt':   'behaviour_planning.over_domain_models.smt.fbi.planner.seed_planners:solve_symk',
+    'SMTPlanner': 'behaviour_planning.over_domain_models.smt.fbi.planner.seed_planners:solve_smt_planner',
+    'gbfs':       'behaviour_planning.over_domain_models.smt.fbi.planner.seed_planners:solve_gbfs',
+})
+
+def resolve_dims(dims_cfg):
+    """!
+    Returns the dimensions' configuration with the dimensions given by name replaced by their classes.
+    """
+    return [[dimensions.get(dim) if isinstance(dim, str) else dim, info] for dim, info in dims_cfg]
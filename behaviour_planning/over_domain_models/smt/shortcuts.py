@@ -1,15 +1,32 @@
-from behaviour_planning.over_domain_models.smt.bss.behaviour_features_library.base import DimensionConstructorSMT
-from behaviour_planning.over_domain_models.smt.bss.behaviour_features_library.goal_predicate_ordering import GoalPredicatesOrderingSMT
-from behaviour_planning.over_domain_models.smt.bss.behaviour_features_library.cost_bound_dims import CostBoundSMT
-from behaviour_planning.over_domain_models.smt.bss.behaviour_features_library.cost_bound_makespan_optimal import MakespanOptimalCostSMT
-from behaviour_planning.over_domain_models.smt.bss.behaviour_features_library.resource_count import ResourceCountSMT
-from behaviour_planning.over_domain_models.smt.bss.behaviour_features_library.functions import FunctionsSMT
-from behaviour_planning.over_domain_models.smt.bss.behaviour_features_library.utility_value import UtilityValueSMT
-from behaviour_planning.over_domain_models.smt.bss.behaviour_features_library.utility_set import UtilitySetSMT
+import importlib
 
-from behaviour_planning.over_domain_models.smt.bss.behaviour_space.space_encoders.basic import BehaviourSpaceSMT
-from behaviour_planning.over_domain_models.smt.bss.behaviour_count.behaviour_count import BehaviourCountSMT
+from behaviour_planning.over_domain_models.smt.registry import dimensions, encoders, seed_planners, resolve_dims
 
-from behaviour_planning.over_domain_models.smt.bss.utilities import compute_behaviour_space_statistics_smt
+# The shortcuts are imported on first access (PEP 562), so importing this module does not import z3, pypmt or the
+# planners; the dimensions come from the registry and include the ones of the installed plugins.
+_shortcuts = {
+    'BehaviourSpaceSMT':                      'behaviour_planning.over_domain_models.smt.bss.behaviour_space.space_encoders.basic',
+    'BehaviourCountSMT':                      'behaviour_planning.over_domain_models.smt.bss.behaviour_count.behaviour_count',
+    'compute_behaviour_space_statistics_smt': 'behaviour_planning.over_domain_models.smt.bss.utilities',
+    'ForbidBehaviourIterativeSMT':            'behaviour_planning.over_domain_models.smt.fbi.planner.planner',
+    'ForbidBehaviourIterativeSession':        'behaviour_planning.over_domain_models.smt.fbi.planner.session',
+}
 
-from behaviour_planning.over_domain_models.smt.fbi.planner.planner import ForbidBehaviourIterativeSMT
+__all__ = [
+    'DimensionConstructorSMT', 'GoalPredicatesOrderingSMT', 'LandmarkPredicatesOrderingSMT', 'CostBoundSMT',
+    'MakespanOptimalCostSMT', 'ResourceCountSMT', 'FunctionsSMT', 'UtilityValueSMT', 'UtilitySetSMT',
+    *_shortcuts, 'dimensions', 'encoders', 'seed_planners', 'resolve_dims',
+]
+
+def __getattr__(name):
+    if name in _shortcuts:
+        value = getattr(importlib.import_module(_shortcuts[name]), name)
+    elif name in dimensions:
+        value = dimensions.get(name)
+    else:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -107,6 +107,7 @@ def read_raw_results(resultsdir):
             'plans': [] if plans is None else plans,
             'behaviour-count': getkeyvalue(data, 'behaviour-count'),
             'execution-time': execution_time,
+            'cardinality-encoding': getkeyvalue(data, 'cardinality-encoding'),
             'file-instance-key': file_key_instance
         }
 
@@ -242,6 +243,24 @@ def generate_summary_tables(raw_results):
     }
 
 
+def generate_cardinality_encoding_tables(raw_results):
+    # Compare the cardinality encodings per domain: coverage and the mean execution time over the instances
+    # every encoding solved, the winner is the encoding with the highest coverage then the lowest time.
+    _entries = defaultdict(lambda: defaultdict(dict))
+    for e in raw_results:
+        if e['cardinality-encoding'] is None: continue
+        _entries[e['domain']][e['cardinality-encoding']][(e['instance'], e['q'], e['k'])] = e['execution-time']
+
+    _tables = {}
+    for domain, encodings in sorted(_entries.items()):
+        common_instances = set.intersection(*[set(instances.keys()) for instances in encodings.values()])
+        _tables[domain] = {encoding: {
+            'coverage': len(instances),
+            'execution-time-common-instances': statistics.mean(instances[i] for i in common_instances) if len(common_instances) > 0 else None
+        } for encoding, instances in sorted(encodings.items())}
+        _tables[domain]['winner'] = min(encodings.keys(), key=lambda encoding: (-_tables[domain][encoding]['coverage'], _tables[domain][encoding]['execution-time-common-instances'] or 0))
+    return _tables
+
 def generate_plots(resutls, dumpdir):
     os.makedirs(dumpdir, exist_ok=True)
 
@@ -541,6 +560,9 @@ def main():
     with open(os.path.join(outputdir, 'summary_tables.json'), 'w') as f:
         json.dump(stats_table, f, indent=4)
 
+    with open(os.path.join(outputdir, 'cardinality_encoding_tables.json'), 'w') as f:
+        json.dump(generate_cardinality_encoding_tables(deepcopy(raw_results)), f, indent=4)
+
     pass
 
 
@@ -0,0 +1,70 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from behaviour_planning.over_domain_models.smt.bss.behaviour_features_library.parsers import parse_info_file, clear_parsed_files, _parser
+
+# One line of every kind, the function lines alternate their bucketing to cover the optional token.
+_lines = {
+    'resource': lambda i: f'(:resource rover{i} 100 0 5)',
+    'function': lambda i: f'(:function fuel(rover{i}) 0 100 2{" log" if i % 2 else ""})',
+}
+
+def write_file(dirname, kind, size):
+    path = os.path.join(dirname, f'{kind}-{size}.txt')
+    with open(path, 'w') as f:
+        f.write('\n'.join(_lines[kind](i) for i in range(size)) + '\n')
+    return path
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+def main(args):
+    report = {}
+    with tempfile.TemporaryDirectory() as dirname:
+        for kind in args.kinds:
+            for size in args.sizes:
+                path = write_file(dirname, kind, size)
+                def cold():
+                    # rebuilds the grammar's parser as well.
+                    _parser.cache_clear()
+                    clear_parsed_files()
+                    parse_info_file(path, kind)
+                def reparse():
+                    # the parser is kept, only the file is parsed again.
+                    clear_parsed_files()
+                    parse_info_file(path, kind)
+                def touched():
+                    # a new modification time invalidates the memoized file.
+                    os.utime(path, ns=(time.time_ns(), time.time_ns()))
+                    parse_info_file(path, kind)
+                def warm():
+                    parse_info_file(path, kind)
+                assert len(parse_info_file(path, kind)) == size, f'Expected {size} entries in {path}.'
+                cases = {'cold': cold, 'reparse': reparse, 'touched': touched, 'warm': warm}
+                for name, fn in cases.items():
+                    times = timed(fn, args.repeat)
+                    report.setdefault(kind, {}).setdefault(str(size), {})[name] = {'median-s': statistics.median(times), 'min-s': min(times), 'max-s': max(times)}
+                    print(f'{kind:10s} {size:8d} {name:8s} median {statistics.median(times):.4f}s min {min(times):.4f}s max {max(times):.4f}s')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the parsing time of the resource and function files.")
+    parser.add_argument('--sizes', type=int, nargs='*', required=False, default=[1000, 10000, 100000], help='Number of lines of the generated files.')
+    parser.add_argument('--kinds', nargs='*', required=False, default=['resource', 'function'], help='The kinds of files to parse.')
+    parser.add_argument('--repeat', type=int, required=False, default=5, help='Number of runs per case.')
+    parser.add_argument('--output', type=str, required=False, default=None, help='Path of the json report.')
+    main(parser.parse_args())
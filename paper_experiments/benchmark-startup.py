@@ -0,0 +1,75 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# Every entry is run in a fresh interpreter, so the time is the cold import cost a worker/CLI call pays.
+startup_cases = {
+    'registry':          'import behaviour_planning.over_domain_models.smt.registry',
+    'shortcuts':         'import behaviour_planning.over_domain_models.smt.shortcuts',
+    'cli-help':          'from behaviour_planning.over_domain_models.smt.fbi.cmd.bplanningcli import main\ntry: main(["--help"])\nexcept SystemExit: pass',
+    'dimension':         'from behaviour_planning.over_domain_models.smt.shortcuts import GoalPredicatesOrderingSMT',
+    'behaviour-space':   'from behaviour_planning.over_domain_models.smt.shortcuts import BehaviourSpaceSMT',
+    'planner':           'from behaviour_planning.over_domain_models.smt.shortcuts import ForbidBehaviourIterativeSMT',
+    'encoder-seq':       'from behaviour_planning.over_domain_models.smt.registry import encoders\nencoders.get("seq")',
+    'symk-engine':       'import up_symk',
+}
+
+# Times the case's code inside the fresh interpreter, i.e., without the interpreter's own startup.
+_timed = """
+import time, sys, os
+start = time.perf_counter()
+sys.stdout = open(os.devnull, 'w')
+exec(compile({code!r}, '<startup>', 'exec'))
+sys.stdout = sys.__stdout__
+print(time.perf_counter() - start)
+"""
+
+# the cases import the package from the repository's root.
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure(code, repeat):
+    """!
+    Returns the import times (s) of the code over repeat fresh interpreters, or the error of the last run.
+    """
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', _timed.format(code=code)], capture_output=True, text=True, cwd=_root)
+        if result.returncode != 0: return None, result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f'exit code {result.returncode}'
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+    return times, None
+
+def main(args):
+    cases  = {name: code for name, code in startup_cases.items() if len(args.cases) == 0 or name in args.cases}
+    report = {}
+    for name, code in cases.items():
+        times, error = measure(code, args.repeat)
+        if times is None:
+            report[name] = {'error': error}
+            print(f'{name:20s} failed: {error}')
+            continue
+        report[name] = {'median-s': statistics.median(times), 'min-s': min(times), 'max-s': max(times), 'times-s': times}
+        print(f'{name:20s} median {statistics.median(times):.3f}s min {min(times):.3f}s max {max(times):.3f}s')
+        # the slowest modules of one run, from python's own import timer.
+        if args.importtime:
+            result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, cwd=_root)
+            rows = []
+            for line in result.stderr.splitlines():
+                if not line.startswith('import time:') or 'cumulative' in line: continue
+                _, cumulative, module = line[len('import time:'):].split('|')
+                rows.append((int(cumulative), module.strip()))
+            report[name]['slowest-imports'] = [[module, cumulative/1e6] for cumulative, module in sorted(rows, reverse=True)[:args.importtime]]
+            for module, cumulative in report[name]['slowest-imports']: print(f'{"":22s}{cumulative:.3f}s {module}')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the cold import time of the package's entry points.")
+    parser.add_argument('--repeat', type=int, required=False, default=5, help='Number of fresh interpreters per case.')
+    parser.add_argument('--cases', nargs='*', required=False, default=[], help=f'The cases to run, out of {list(startup_cases)} (all by default).')
+    parser.add_argument('--importtime', type=int, required=False, default=0, help='Also list the N slowest imports of every case (python -X importtime).')
+    parser.add_argument('--output', type=str, required=False, default=None, help='Path of the json report.')
+    main(parser.parse_args())
@@ -1574,6 +1574,10 @@ timelimit_map = {
     'symk': '00:45:00',
 }   
 
+# the planners that can answer all the (q, k) pairs of an instance in one sweep task, and the time limit of a sweep.
+sweep_planners  = ['fbi-smt', 'fbi-smt-naive']
+sweep_timelimit = '04:00:00'
+
 def wrap_cmd(taskname, cmd, timelimt, memorylimit, slurmdumpdir):
     return f"""#!/bin/bash
 #SBATCH --job-name={taskname}
@@ -1714,6 +1718,8 @@ def arg_parser():
     parser.add_argument('--planning-tasks-dir', type=str, required=True, help='Directory containing planning tasks.')
     parser.add_argument('--resources-dir', type=str, required=False, default='', help='Directory containing resource files for tasks.')
     parser.add_argument('--planning-type', type=str, required=False, default='classical', help='Type of planning tasks to consider (classical/oversubscription/numerical).')
+    parser.add_argument('--task-cache-dir', type=str, required=False, default=None, help='Directory to cache the parsed and grounded tasks across the jobs.')
+    parser.add_argument('--sweep', action='store_true', help='Run all the q/k values of an instance in one task for the fbi planners (one results file per q/k).')
     return parser
 
 def wrap_tasks_in_slurm_scripts(tasks, slurmdumpdir, timelimit='00:30:00', memorylimit='16G'):
@@ -1739,11 +1745,11 @@ def wrap_tasks_in_slurm_scripts(tasks, slurmdumpdir, timelimit='00:30:00', memor
         cmd.append(f"python {scriptfile} --taskfile {taskfile} --outputdir {resultsdir}")
         cmd.append(f"deactivate")
         cmd = " && ".join(cmd)
-        slurm_script = wrap_cmd(task['filename'].replace('.json',''), cmd, timelimit_map[task['planner']], memorylimit, slurmdumpdir)
+        slurm_script = wrap_cmd(task['filename'].replace('.json',''), cmd, sweep_timelimit if task.get('sweep', False) else timelimit_map[task['planner']], memorylimit, slurmdumpdir)
         slurm_scripts.append((task['filename'].replace('.json',''), slurm_script))
     return set(slurm_scripts)
 
-def generate_tasks(planning_tasks_dir, resources_dir, sandboxdir, planning_type):
+def generate_tasks(planning_tasks_dir, resources_dir, sandboxdir, planning_type, sweep=False, task_cache_dir=None):
     _tasks = []
     ru_info_dumps = os.path.join(sandboxdir, 'resource-usage-dumps')
     os.makedirs(ru_info_dumps, exist_ok=True)
@@ -1770,11 +1776,18 @@ def generate_tasks(planning_tasks_dir, resources_dir, sandboxdir, planning_type)
         case _:
             q_list = []
 
+    k_list   = [5,10,100,1000]
     taskinfo = set()
     for task in parse_planning_tasks(planning_tasks_dir, resources_dir, ru_info_dumps, selected_instances):
+        task = task | {'task-cache-dir': task_cache_dir}
+        if sweep:
+            for planner in filter(lambda p: p in sweep_planners, planners):
+                _tasks.append(task | { 'sandbox-dir' : sandboxdir, 'planning-type': planning_type, 'planner' : planner, 'q': max(q_list), 'k-plans': max(k_list), 'sweep': True, 'q-values': q_list, 'k-values': k_list, 'filename': f"sweep-{planning_type}-{task['ipc_year']}-{task['domainname']}-{task['instanceno']}-{planner}.json"})
+                taskinfo.add(f"({task['ipc_year']}, {task['domainname']}, {task['instanceno']})")
         for q in q_list:
-            for k in [5,10,100,1000]:
-                for planner in planners:                
+            for k in k_list:
+                for planner in planners:
+                    if sweep and planner in sweep_planners: continue
                     _tasks.append(task | { 'sandbox-dir' : sandboxdir, 'planning-type': planning_type, 'planner' : planner, 'q': q, 'k-plans': k, 'filename': f"{q}-{k}-{planning_type}-{task['ipc_year']}-{task['domainname']}-{task['instanceno']}-{planner}.json"})
                     taskinfo.add(f"({task['ipc_year']}, {task['domainname']}, {task['instanceno']})")
     
@@ -1795,7 +1808,7 @@ def main():
 
     print(f"Generating SLURM scripts for planning tasks in {planning_tasks_dir} with resources from {resources_dir} and planning type {planning_type}...")
 
-    slurm_scripts = wrap_tasks_in_slurm_scripts(generate_tasks(planning_tasks_dir, resources_dir, sandbox_dir, planning_type), slurmdumpdir)
+    slurm_scripts = wrap_tasks_in_slurm_scripts(generate_tasks(planning_tasks_dir, resources_dir, sandbox_dir, planning_type, args.sweep, args.task_cache_dir), slurmdumpdir)
 
     for idx, (taskname, script) in enumerate(slurm_scripts):
         with open(os.path.join(slurmdumpdir, f"{idx}_{taskname}.sh"), 'w') as f:
@@ -25,6 +25,8 @@ from behaviour_planning.over_domain_models.smt.bss.behaviour_count.behaviour_cou
 from behaviour_planning.over_domain_models.smt.bss.behaviour_count.behaviour_counter_simulator import GoalPredicatesOrderingSimulator, MakespanOptimalCostSimulator, ResourceCountSimulator, UtilityValueSimulator, FunctionsSimulator
 
 from behaviour_planning.over_domain_models.smt.fbi.planner.planner import ForbidBehaviourIterativeSMT
+from behaviour_planning.over_domain_models.smt.fbi.planner.session import ForbidBehaviourIterativeSession
+from behaviour_planning.over_domain_models.smt.bss.task_cache import task_cache
 
 def convert_smt_dims_to_simulator_dims(dims):
     sim_dims = []
@@ -46,6 +48,12 @@ def add_utility_values(task):
     task.add_quality_metric(up.model.metrics.Oversubscription(goals, task.environment))
     return goals
 
+def parse_task(taskdetails):
+    # the parsed tasks are reused across jobs when the task has a task-cache-dir.
+    cache = task_cache(taskdetails)
+    if cache is None: return PDDLReader().parse_problem(taskdetails['domainfile'], taskdetails['problemfile'])
+    return cache.parse(taskdetails['domainfile'], taskdetails['problemfile'])
+
 def construct_task_details_info(taskdetails):
     return {
             'domain' : os.path.basename(os.path.dirname(taskdetails['domainfile-name'])) + '/' + os.path.basename(taskdetails['domainfile-name']),
@@ -86,17 +94,14 @@ def select_plans_using_bspace_smt(taskdetails, dims, planlist, compilation_list,
         "dims": dims,
         "run-plan-validation": False,
         "disable-after-goal-state-actions": False,
-        "select-k": taskdetails['k-plans']
+        "select-k": taskdetails['k-plans'],
+        "task-cache-dir": taskdetails.get('task-cache-dir', None)
     }
     bspace = BehaviourCountSMT(taskdetails['domainfile'], taskdetails['problemfile'], bspace_cfg, planlist, is_oversubscription_planning, compilation_list)
     return bspace, bspace.selected_plans(taskdetails['k-plans'])
 
 
-def run_fbi(taskdetails, dims, compilation_list):
-    task = PDDLReader().parse_problem(taskdetails['domainfile'], taskdetails['problemfile'])
-    k = taskdetails['k-plans']
-    q = taskdetails['q']
-
+def fbi_params(taskdetails, dims, compilation_list):
     base_planner_cfg = {}
 
     if taskdetails['planning-type'] == 'numerical':
@@ -119,22 +124,22 @@ def run_fbi(taskdetails, dims, compilation_list):
         "fbi-planner-type": "ForbidBehaviourIterativeSMT",
         "base-planner-cfg": base_planner_cfg,
         "bspace-cfg": {
-            "quality-bound-factor" : q,
+            "quality-bound-factor" : taskdetails['q'],
             "encoder": "seq",
             "solver-timeout-ms": 600000,
             "solver-memorylimit-mb": 16000,
             "dims": [] if 'naive' in taskdetails['planner'] else dims,
             "compliation-list": compilation_list,
             "run-plan-validation": False,
-            "disable-after-goal-state-actions": False
+            "disable-after-goal-state-actions": False,
+            "cardinality-encoding": taskdetails.get('cardinality-encoding', 'pb'),
+            "task-cache-dir": taskdetails.get('task-cache-dir', None)
         }
     }
+    return _params
 
-    # If the planning task is oversubscription, we add the utility dimension by default.
-    _goals  = add_utility_values(task) if taskdetails['planning-type'] == 'oversubscription' else {}
-    planner = ForbidBehaviourIterativeSMT(task, _params['bspace-cfg'], _params['base-planner-cfg'])
-    plans   = planner.plan(k)
-    dims = convert_smt_dims_to_simulator_dims(dims)
+def fbi_results(taskdetails, task, dims, planner, plans, _goals, logs=None):
+    dims = convert_smt_dims_to_simulator_dims(deepcopy(dims))
     # If the planning task is oversub update the addinfo
     if taskdetails['planning-type'] == 'oversubscription':
         for idx, (dclass, addinfo) in enumerate(dims):
@@ -143,7 +148,36 @@ def run_fbi(taskdetails, dims, compilation_list):
 
     bspace, selected_plans = select_plans_using_bspace_simulator(taskdetails, task, dims, plans)
     results = construct_results_file(taskdetails, task, selected_plans)
-    return results | {'logs': planner.log_msg} | {'oversubscription-goals': {str(g): u for g, u in _goals.items()}}
+    # report the cardinality encoding that was used (i.e., the one auto picked) to compare them per domain.
+    cardinality_encoding = planner.bspace.encoder.cardinality_encoding if planner.bspace is not None else None
+    return results | {'logs': planner.log_msg if logs is None else logs} | {'oversubscription-goals': {str(g): u for g, u in _goals.items()}} | {'cardinality-encoding': cardinality_encoding}
+
+def run_fbi(taskdetails, dims, compilation_list):
+    task = parse_task(taskdetails)
+    _params = fbi_params(taskdetails, dims, compilation_list)
+
+    # If the planning task is oversubscription, we add the utility dimension by default.
+    _goals  = add_utility_values(task) if taskdetails['planning-type'] == 'oversubscription' else {}
+    planner = ForbidBehaviourIterativeSMT(task, _params['bspace-cfg'], _params['base-planner-cfg'])
+    plans   = planner.plan(taskdetails['k-plans'])
+    return fbi_results(taskdetails, task, dims, planner, plans, _goals)
+
+def run_fbi_sweep(taskdetails, dims, compilation_list):
+    """
+    Answers all the (q, k) pairs of a sweep task from one behaviour space, returns the results per (q, k).
+    """
+    task = parse_task(taskdetails)
+    _params = fbi_params(taskdetails, dims, compilation_list)
+
+    _goals  = add_utility_values(task) if taskdetails['planning-type'] == 'oversubscription' else {}
+    session = ForbidBehaviourIterativeSession(task, _params['bspace-cfg'], _params['base-planner-cfg'], taskdetails['q-values'])
+    sweep   = session.sweep(taskdetails['k-values'])
+    ret_details = {}
+    for (q, k), result in sweep.items():
+        _taskdetails = taskdetails | {'q': q, 'k-plans': k}
+        # every (q, k) only gets the logs of the construction and its own q.
+        ret_details[(q, k)] = fbi_results(_taskdetails, task, dims, session.planner, result.plans, _goals, result.logs) | {'total-time-seconds': result.time}
+    return ret_details
 
 def run_fi(taskdetails, dims, compilation_list):
     tmpdir = os.path.join(taskdetails['sandbox-dir'], 'tmp', taskdetails['filename'].replace('.json',''))
@@ -186,7 +220,7 @@ def run_fi(taskdetails, dims, compilation_list):
                     if not plan in planlist: planlist.append(plan)
             _planlist_str_cpy = planlist[:]
             planlist = list(set(planlist))
-            task = PDDLReader().parse_problem(taskdetails['domainfile'], taskdetails['problemfile'])
+            task = parse_task(taskdetails)
             # generated_results = os.path.join(taskdetails['sandbox-dir'], 'fi-solved-instances')
             # os.makedirs(generated_results, exist_ok=True)
             # _solved_task_details = construct_task_details_info(taskdetails) | {'found-plans': planlist}
@@ -206,17 +240,22 @@ def run_fi(taskdetails, dims, compilation_list):
 def run_symk(taskdetails, dims, compilation_list):
     tmpdir = os.path.join(taskdetails['sandbox-dir'], 'tmp', taskdetails['filename'].replace('.json',''))
     os.makedirs(tmpdir, exist_ok=True)
-    task = PDDLReader().parse_problem(taskdetails['domainfile'], taskdetails['problemfile'])
+    task = parse_task(taskdetails)
     k = taskdetails['k-plans']
     q = taskdetails['q']
 
     planlist = []
-    with tempfile.TemporaryDirectory(dir=tmpdir) as tmpdirname:        
-        with OneshotPlanner(name="symk-opt") as planner:
-            result = planner.solve(task)
-            plan = result.plan
-            assert plan is not None, "No plan found by symk"
-            cost_bound = int(len(plan.actions) * q)
+    def solve(task):
+        with tempfile.TemporaryDirectory(dir=tmpdir) as tmpdirname:        
+            with OneshotPlanner(name="symk-opt") as planner:
+                result = planner.solve(task)
+        return result.plan, result.status
+
+    # the optimal plan of the same task is reused across the q/k jobs.
+    cache = task_cache(taskdetails)
+    plan, _ = solve(task) if cache is None else cache.seed_plan(task, {'planner-name': 'symk-opt'}, solve)[:2]
+    assert plan is not None, "No plan found by symk"
+    cost_bound = int(len(plan.actions) * q)
 
     _goals  = {}
     if taskdetails['planning-type'] == 'oversubscription':
@@ -268,11 +307,15 @@ def solve(taskname, args):
         compilation_list += [["up_disjunctive_conditions_remover", CompilationKind.DISJUNCTIVE_CONDITIONS_REMOVING]]
     # Apply these compilations and write the problem to a file to deal with with -,_ mistmatch.
 
-    _original_task = PDDLReader().parse_problem(taskdetails['domainfile'], taskdetails['problemfile'])
+    _original_task = parse_task(taskdetails)
     names = [name for name, _ in compilation_list]
     compilationkinds = [kind for _, kind in compilation_list]
-    with Compiler(names=names, compilation_kinds=compilationkinds) as compiler:
-        compiled_task = compiler.compile(_original_task)
+    cache = task_cache(taskdetails)
+    if cache is not None:
+        compiled_task = cache.compile(_original_task, compilation_list)
+    else:
+        with Compiler(names=names, compilation_kinds=compilationkinds) as compiler:
+            compiled_task = compiler.compile(_original_task)
 
     _task_writer   = PDDLWriter(compiled_task.problem)
     renamed_domainfile  = os.path.join(tmpdir, 'renamed-domain.pddl')
@@ -314,9 +357,12 @@ def solve(taskname, args):
             else:
                 dims += [[ResourceCountSMT, taskdetails['resources']]]
 
-    ret_details = {}
+    ret_details   = {}
+    sweep_details = None
     start_time = time.time()
     match taskdetails['planner']:
+        case 'fbi-smt-naive' | 'fbi-smt' if taskdetails.get('sweep', False):
+            sweep_details = run_fbi_sweep(taskdetails, dims, compilation_list)
         case 'fbi-smt-naive' | 'fbi-smt':
             ret_details = run_fbi(taskdetails,  dims, compilation_list)
         case 'fi-bc':
@@ -328,10 +374,11 @@ def solve(taskname, args):
     end_time = time.time()
     ret_details['total-time-seconds'] = end_time - start_time
 
-    outputpath = os.path.join(args.outputdir, f'{taskname}-results.json')
-    if len(ret_details) == 0: return
-    with open(outputpath, 'w') as f:
-        json.dump(ret_details, f, indent=4)
+    # a sweep writes one results file per (q, k), named like the results file of the separate task.
+    outputs = {taskname: ret_details} if sweep_details is None else {taskname.replace('sweep', f'{q}-{k}', 1): details for (q, k), details in sweep_details.items()}
+    for name, details in outputs.items():
+        with open(os.path.join(args.outputdir, f'{name}-results.json'), 'w') as f:
+            json.dump(details, f, indent=4)
     
     # delete created files.
     if os.path.exists(taskdetails['domainfile']):